@@ -0,0 +1,115 @@
+import numpy as np
+from matrix import ResponseMatrix, option_layout, answer_lookups, probabilities, entropy
+
+# running option counts for response streams
+# counts are kept in the flat option numbering of ResponseMatrix, so every
+# statistic of the current state costs O(options), however many responses
+# have been seen
+
+
+class FrequencyAggregator:
+    """
+    Accumulates per-question option counts from single responses or ResponseMatrix chunks. Aggregators of the same
+    survey, e.g. built from different HIT batches, merge with +.
+    """
+
+    def __init__(self, survey, counts=None, num_respondents=0):
+        self.survey = survey
+        self.questions = list(survey.questions)
+        (self.option_counts, self.option_ptr, self.option_question) = option_layout(self.questions)
+        self.counts = np.zeros(self.option_ptr[-1], dtype=np.int64) if counts is None else \
+            np.array(counts, dtype=np.int64)
+        assert(len(self.counts) == self.option_ptr[-1])
+        self.num_respondents = num_respondents
+        self.__lookups = None
+
+    def add(self, response):
+        """
+        Counts one response: a dict mapping questions (or quids) to (option, qpos, opos) tuples, or to options (or
+        oids).
+        """
+        if self.__lookups is None:
+            self.__lookups = answer_lookups(self.survey)
+        (qindex, oindex) = self.__lookups
+        for (q, val) in response.items():
+            i = qindex[q]
+            o = val[0] if type(val) in [tuple, list] else val
+            self.counts[self.option_ptr[i] + oindex[i][o]] += 1
+        self.num_respondents += 1
+        return self
+
+    def add_matrix(self, m):
+        """Counts every response in a ResponseMatrix of the same survey"""
+        assert(m.questions == self.questions)
+        self.counts += m.frequencies()
+        self.num_respondents += len(m)
+        return self
+
+    def update(self, responses):
+        """Counts a ResponseMatrix, or a list of dict responses"""
+        if isinstance(responses, ResponseMatrix):
+            return self.add_matrix(responses)
+        for response in responses:
+            self.add(response)
+        return self
+
+    def __add__(self, other):
+        assert(other.questions == self.questions)
+        return FrequencyAggregator(self.survey, self.counts + other.counts,
+                                   self.num_respondents + other.num_respondents)
+
+    def __iadd__(self, other):
+        assert(other.questions == self.questions)
+        self.counts += other.counts
+        self.num_respondents += other.num_respondents
+        return self
+
+    def frequencies(self):
+        """Returns a copy of the flat option counts"""
+        return self.counts.copy()
+
+    def probabilities(self):
+        """Returns the flat empirical option probabilities"""
+        return probabilities(self.counts, self.option_question, len(self.questions))
+
+    def entropy(self):
+        """Returns the sum over questions of the entropy, in bits, of the empirical option distribution"""
+        return entropy(self.probabilities())
+
+    def least_popular_mask(self, diff):
+        """
+        Marks each question's least popular options: sorting a question's options by count, they are the options before
+        the first one whose count is below diff times the next count. Questions without such a gap have none.
+
+        :param diff: The ratio of counts that separates the least popular options from the rest
+        :return: A flat boolean array over options
+        """
+        mask = np.zeros(len(self.counts), dtype=bool)
+        for i in range(len(self.questions)):
+            lo, hi = self.option_ptr[i], self.option_ptr[i + 1]
+            order = np.argsort(self.counts[lo:hi], kind="mergesort")
+            ranked = self.counts[lo:hi][order]
+            gaps = np.flatnonzero(ranked[:-1] < ranked[1:] * diff)
+            if len(gaps):
+                mask[lo + order[:gaps[0] + 1]] = True
+        return mask
+
+    def least_popular(self, diff):
+        """
+        Returns the least popular options in the format of evaluation.get_least_popular_options: a dict mapping each
+        question that has any to a list of (option, count) pairs, least popular first.
+        """
+        mask = self.least_popular_mask(diff)
+        least_popular = {}
+        for (i, q) in enumerate(self.questions):
+            lo = self.option_ptr[i]
+            opts = [(q.options[j], int(self.counts[lo + j])) for j in range(len(q.options)) if mask[lo + j]]
+            if opts:
+                least_popular[q] = sorted(opts, key = lambda t : t[1])
+        return least_popular
+
+    def to_map(self, values=None):
+        """Converts flat per-option values, the counts by default, to a dict of dicts keyed by question, then option"""
+        values = (self.counts if values is None else np.asarray(values)).tolist()
+        return {q: {o: values[self.option_ptr[i] + j] for (j, o) in enumerate(q.options)}
+                for (i, q) in enumerate(self.questions)}
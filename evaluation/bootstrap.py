@@ -0,0 +1,141 @@
+import hashlib
+import math
+import multiprocessing
+import os
+import numpy as np
+from scipy.stats import norm
+
+# bootstrap intervals over per-respondent statistics
+# the statistic of each respondent is computed once; resamples are drawn as
+# rows of a (B, N) matrix of indices into those values, a chunk of rows at a
+# time, so memory is bounded by chunk_size rather than by B * N
+# resamples are drawn in blocks of block_size, each from its own random
+# stream spawned from the caller's seed, so blocks can go to any number of
+# worker processes and still give the same statistics
+
+B = 2000
+chunk_size = 1 << 22 # index matrix entries held at once
+block_size = 250 # resamples per random stream
+
+
+def root_entropy(seed=None):
+    """Returns an int to spawn streams from: the seed itself, a draw from a RandomState, or fresh OS entropy"""
+    if seed is None:
+        return int(os.urandom(16).encode("hex"), 16)
+    if isinstance(seed, np.random.RandomState):
+        return int(seed.randint(0, 2 ** 31 - 1))
+    return int(seed)
+
+
+def spawn(seed, n):
+    """
+    Derives n independent seeds from one, like numpy's SeedSequence.spawn: child i is seeded with a hash of the root
+    entropy and i, so it does not depend on how many children are spawned or which process uses them.
+
+    :param seed: An int, a RandomState, or None for fresh entropy
+    :param n: The number of seeds
+    :return: A list of uint32 arrays, each usable as a RandomState seed
+    """
+    root = root_entropy(seed)
+    return [np.frombuffer(hashlib.sha256("%d:%d" % (root, i)).digest(), dtype=np.uint32) for i in range(n)]
+
+
+def get_n_jobs(n_jobs):
+    """Returns the number of processes to use; n_jobs below 1 means one per CPU"""
+    return multiprocessing.cpu_count() if n_jobs is None or n_jobs < 1 else n_jobs
+
+
+def __reduce(stat, samples):
+    try:
+        return np.asarray(stat(samples, axis=1), dtype=float)
+    except TypeError:
+        # stat does not take an axis
+        return np.array([stat(row) for row in samples], dtype=float)
+
+
+def __draw(values, b, stat, seed, chunk):
+    """Computes stat over b resamples of values drawn from one random stream"""
+    rng = np.random.RandomState(seed)
+    n = len(values)
+    rows = max(1, chunk // n)
+    out = np.empty(b)
+    for start in range(0, b, rows):
+        stop = min(b, start + rows)
+        out[start:stop] = __reduce(stat, values[rng.randint(0, n, size=(stop - start, n))])
+    return out
+
+
+__worker__ = {}
+
+
+def __init_worker(values, stat, chunk):
+    __worker__.update(values=values, stat=stat, chunk=chunk)
+
+
+def __draw_in_worker(args):
+    (b, seed) = args
+    return __draw(__worker__["values"], b, __worker__["stat"], seed, __worker__["chunk"])
+
+
+def resample(values, b=B, stat=np.average, rng=None, chunk=chunk_size, n_jobs=1):
+    """
+    Computes stat over b bootstrap resamples of values. For a given int seed the result is the same whatever n_jobs is.
+
+    :param values: A 1-d array of per-respondent statistics
+    :param b: The number of resamples
+    :param stat: The statistic of a resample; called with axis=1 on a block of resamples when it accepts an axis. It
+        must be picklable, e.g. a module level function, when n_jobs is not 1.
+    :param rng: An int seed, a RandomState to draw a seed from, or None
+    :param chunk: The largest number of indices drawn at once, per process
+    :param n_jobs: The number of worker processes; below 1 means one per CPU
+    :return: An array of b statistics
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        raise ValueError("Cannot bootstrap an empty sample")
+    sizes = [min(block_size, b - start) for start in range(0, b, block_size)]
+    tasks = zip(sizes, spawn(rng, len(sizes)))
+    n_jobs = min(get_n_jobs(n_jobs), len(tasks))
+    if n_jobs <= 1:
+        blocks = [__draw(values, size, stat, seed, chunk) for (size, seed) in tasks]
+    else:
+        pool = multiprocessing.Pool(n_jobs, __init_worker, (values, stat, chunk))
+        try:
+            blocks = pool.map(__draw_in_worker, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    return np.concatenate(blocks) if blocks else np.empty(0)
+
+
+def percentile_interval(stats, alpha):
+    """Returns the two-sided 1 - alpha percentile interval of bootstrap statistics"""
+    data = np.sort(stats)
+    lo = int(math.floor((alpha / 2.0) * len(data)))
+    hi = min(int(math.floor((1.0 - (alpha / 2.0)) * len(data))), len(data) - 1)
+    return (data[lo], data[hi])
+
+
+def normal_interval(stats, alpha):
+    """Returns the two-sided 1 - alpha interval of a normal fit to bootstrap statistics"""
+    z = norm.ppf(1.0 - alpha / 2.0)
+    mean, std = np.average(stats), np.std(stats)
+    return (mean - z * std, mean + z * std)
+
+
+def interval(values, alpha, stat=np.average, normal=False, b=B, rng=None, chunk=chunk_size, n_jobs=1):
+    """
+    Returns a two-sided 1 - alpha bootstrap interval for stat of values.
+
+    :param values: A 1-d array of per-respondent statistics
+    :param alpha: The significance level
+    :param stat: The statistic of a resample
+    :param normal: Whether to fit a normal to the bootstrap statistics rather than take percentiles
+    :param b: The number of resamples
+    :param rng: An int seed, a RandomState to draw a seed from, or None
+    :param chunk: The largest number of indices drawn at once, per process
+    :param n_jobs: The number of worker processes; below 1 means one per CPU
+    :return: (lo, hi)
+    """
+    stats = resample(values, b, stat, rng, chunk, n_jobs)
+    return normal_interval(stats, alpha) if normal else percentile_interval(stats, alpha)
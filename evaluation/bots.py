@@ -0,0 +1,122 @@
+import math, sys
+import numpy as np
+
+# vectorized bot and lazy respondent detection over a ResponseMatrix
+#
+# the unordered detector counts each respondent's answers among the least
+# popular options, compiled once into a boolean mask over the flat options.
+#
+# the ordered detector groups questions into stages by their number of
+# options. for every stage of more than one question, it counts how often a
+# respondent chose the option shown at each position, and compares each pair
+# of mirrored positions (j, m - j - 1) with a Chernoff bound: a respondent
+# choosing positions without regard to content lands on either side of the
+# pair equally often.
+
+
+def least_popular_counts(m, mask):
+    """ returns, for every respondent, the number of their answers that are
+    marked in mask, a flat boolean array over options (see
+    FrequencyAggregator.least_popular_mask)"""
+    codes = m.codes()
+    answered = codes >= 0
+    hits = np.zeros(codes.shape, dtype=bool)
+    hits[answered] = mask[codes[answered]]
+    return hits.sum(axis=1)
+
+def least_popular_mu(m, mask):
+    """ returns the number of marked answers expected from a respondent who
+    chooses uniformly at random: the sum over questions of the fraction of
+    their options that are marked"""
+    return float(np.sum(mask / m.option_counts[m.option_question].astype(float)))
+
+def stages(m):
+    """ returns a list of (size, question indices) for each number of options
+    shared by more than one question, in increasing size"""
+    by_size = {}
+    for (i, size) in enumerate(m.option_counts.tolist()):
+        by_size.setdefault(size, []).append(i)
+    return [(size, np.array(qs)) for (size, qs) in sorted(by_size.items()) if size > 1 and len(qs) > 1]
+
+def position_counts(m, questions, size):
+    """ returns a (respondents, size) array counting, for each respondent, the
+    answers among questions whose option was shown at each position"""
+    n = len(m)
+    opos = m.opos[:, questions]
+    valid = (m.answers[:, questions] >= 0) & (opos >= 0) & (opos < size)
+    rows = np.nonzero(valid)[0]
+    return np.bincount(rows * size + opos[valid], minlength=n * size).reshape(n, size)
+
+def chernoff_test(hict, loct, alpha):
+    """ returns (flagged, x, bound): whether the larger of each pair of counts
+    exceeds (1 + delta) times its expectation under an even split, the larger
+    count, and the bound. pairs with no answers are never flagged."""
+    n = hict + loct
+    mu = 0.5 * n
+    delta = np.zeros(mu.shape)
+    np.divide(3 * math.log(alpha), -mu, out=delta, where=mu > 0)
+    np.sqrt(delta, out=delta)
+    x = np.maximum(hict, loct)
+    bound = (1 + delta) * mu
+    return (n > 0) & (x >= bound), x, bound
+
+def ordered_position_tests(m, alpha):
+    """ returns a list of (size, counts, flagged, x, bound), one for each
+    stage, where counts is the stage's position counts and the others are
+    (respondents, size // 2) arrays over mirrored position pairs"""
+    tests = []
+    for (size, questions) in stages(m):
+        counts = position_counts(m, questions, size)
+        half = size // 2
+        hict = counts[:, :half]
+        loct = counts[:, ::-1][:, :half]
+        flagged, x, bound = chernoff_test(hict, loct, alpha)
+        tests.append((size, counts, flagged, x, bound))
+    return tests
+
+def ordered_position_bots(m, alpha, report=None):
+    """
+    Classifies every respondent in a ResponseMatrix by their choice of option
+    positions; a respondent is flagged if any mirrored pair of positions, in any
+    stage, fails the Chernoff test.
+
+    :param m: A ResponseMatrix
+    :param alpha: The probability of flagging a respondent who chooses positions evenly, for each pair
+    :param report: Optional hook called as report(row, details) for every flagged
+        respondent; see position_details
+    :return: A boolean array over respondents
+    """
+    tests = ordered_position_tests(m, alpha)
+    bots = np.zeros(len(m), dtype=bool)
+    for (_, _, flagged, _, _) in tests:
+        bots |= flagged.any(axis=1)
+    if report is not None:
+        for row in np.flatnonzero(bots):
+            report(row, position_details(tests, row))
+    return bots
+
+def position_details(tests, row):
+    """ returns, for one respondent, a dict mapping option positions to their
+    counts (as "x >= bound" for the larger count of a flagged pair), and the
+    key 'total' to the total count compared. later stages overwrite earlier
+    ones."""
+    details = {'total' : 0}
+    for (size, counts, flagged, x, bound) in tests:
+        for j in range(size // 2):
+            (hi, lo) = (j, size - j - 1)
+            hict, loct = counts[row, hi], counts[row, lo]
+            if hict + loct == 0:
+                continue
+            details[hi], details[lo] = str(hict), str(loct)
+            if flagged[row, j]:
+                larger = hi if hict > loct else lo
+                details[larger] = "%d >= %f" % (x[row, j], bound[row, j])
+            details['total'] += hict + loct
+    return details
+
+def html_report(out=sys.stdout):
+    """ returns a report hook that writes an html table row for each flagged respondent"""
+    def report(row, details):
+        out.write("<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%d</td>\n" %
+                  (details.get(0, ""), details.get(1, ""), details.get(2, ""), details.get(3, ""), details['total']))
+    return report
@@ -0,0 +1,145 @@
+from collections import namedtuple
+import numpy as np
+from scipy.stats import beta, poisson
+import bootstrap
+from matrix import MISSING
+
+# breakoff analysis over the qpos column of a ResponseMatrix
+#
+# a respondent's breakoff point is the last question they answered: the one
+# shown at their largest qpos. questions are shown at consecutive positions
+# from 0, so a respondent whose last position is p reached every position up
+# to p. the hazard at position p is the fraction of respondents reaching p
+# who stop there.
+#
+# questions are compared with a positional baseline: a question is expected
+# to be abandoned as often as the positions it was shown at are, so the
+# expected number of breakoffs at a question is the sum of the hazard at the
+# position each respondent saw it. lift is observed over expected breakoffs;
+# questions abandoned more than their positions explain have lift above 1.
+
+PositionBreakoff = namedtuple("PositionBreakoff", ["counts", "reached", "hazard", "low", "high"])
+"""
+Arrays over positions: the number of respondents whose last answer was shown at each position, the number who reached
+it, and the hazard, counts / reached, with the bounds of its confidence interval.
+"""
+
+QuestionBreakoff = namedtuple("QuestionBreakoff", ["counts", "answered", "expected", "lift", "low", "high", "pvalue"])
+"""
+Arrays over questions: the number of respondents whose last answer was to each question, the number who answered it,
+the number of breakoffs expected from the positions it was shown at, lift = counts / expected, the confidence interval
+of the breakoff rate counts / answered, and the one-sided p-value of seeing at least counts breakoffs when expected are
+expected.
+"""
+
+methods = ["exact", "bootstrap"]
+
+
+def last_answered(m):
+    """
+    Finds each respondent's breakoff point.
+
+    :param m: A ResponseMatrix
+    :return: (position, question) int arrays over respondents: the largest qpos answered and the question shown there,
+        or MISSING for respondents without positioned answers
+    """
+    qpos = np.where(m.answers != MISSING, m.qpos, MISSING)
+    question = np.argmax(qpos, axis=1) if m.num_questions() else np.zeros(len(m), dtype=np.int64)
+    position = qpos[np.arange(len(m)), question] if m.num_questions() else np.full(len(m), MISSING)
+    question = np.where(position == MISSING, MISSING, question)
+    return position.astype(np.int64), question.astype(np.int64)
+
+
+def binomial_interval(k, n, alpha):
+    """Returns the Clopper-Pearson interval of k successes in n trials, elementwise; nan where n is 0"""
+    k, n = np.asarray(k, dtype=float), np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low = np.where(k > 0, beta.ppf(alpha / 2, k, n - k + 1), 0.0)
+        high = np.where(k < n, beta.ppf(1 - alpha / 2, k + 1, n - k), 1.0)
+    empty = n == 0
+    return np.where(empty, np.nan, low), np.where(empty, np.nan, high)
+
+
+def __rng(rng):
+    return rng if isinstance(rng, np.random.RandomState) else np.random.RandomState(bootstrap.spawn(rng, 1)[0])
+
+
+def __hazard(counts):
+    # respondents reaching a position are those who stopped there or later
+    reached = np.cumsum(counts[..., ::-1], axis=-1)[..., ::-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return reached, counts / reached.astype(float)
+
+
+def by_position(m, alpha=0.05, method="exact", B=bootstrap.B, rng=None):
+    """
+    Computes the breakoff hazard at every position.
+
+    :param m: A ResponseMatrix
+    :param alpha: The significance level of the intervals
+    :param method: "exact" for Clopper-Pearson intervals, or "bootstrap" for percentile intervals over B multinomial
+        resamples of the respondents' breakoff positions
+    :param B: The number of bootstrap resamples
+    :param rng: A RandomState or seed for the bootstrap
+    :return: PositionBreakoff
+    """
+    position, _ = last_answered(m)
+    position = position[position != MISSING]
+    size = max(m.num_questions(), position.max() + 1 if len(position) else 0)
+    counts = np.bincount(position, minlength=size)
+    reached, hazard = __hazard(counts)
+    if method == "exact":
+        low, high = binomial_interval(counts, reached, alpha)
+    elif method == "bootstrap":
+        total = counts.sum()
+        samples = __rng(rng).multinomial(total, counts / float(max(total, 1)), size=B)
+        _, hazards = __hazard(samples)
+        with np.errstate(invalid="ignore"):
+            low, high = np.nanpercentile(hazards, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+        low[reached == 0], high[reached == 0] = np.nan, np.nan
+    else:
+        raise ValueError("Unknown interval method %s; expected one of %s" % (method, methods))
+    return PositionBreakoff(counts, reached, hazard, low, high)
+
+
+def by_question(m, alpha=0.05, method="exact", B=bootstrap.B, rng=None, positions=None):
+    """
+    Computes breakoff counts at every question and their lift over the positional baseline.
+
+    :param m: A ResponseMatrix
+    :param alpha: The significance level of the intervals
+    :param method: "exact" for Clopper-Pearson intervals, or "bootstrap" for percentile intervals over B binomial
+        resamples of each question's breakoffs
+    :param B: The number of bootstrap resamples
+    :param rng: A RandomState or seed for the bootstrap
+    :param positions: The PositionBreakoff of m, if already computed
+    :return: QuestionBreakoff
+    """
+    positions = by_position(m, alpha) if positions is None else positions
+    _, question = last_answered(m)
+    num_questions = m.num_questions()
+    counts = np.bincount(question[question != MISSING], minlength=num_questions)
+    answered = m.answered() & (m.qpos != MISSING)
+    exposed = answered.sum(axis=0)
+    hazard = np.nan_to_num(positions.hazard)
+    expected = np.where(answered, hazard[np.where(answered, m.qpos, 0)], 0.0).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = counts / expected
+    if method == "exact":
+        low, high = binomial_interval(counts, exposed, alpha)
+    elif method == "bootstrap":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(exposed > 0, counts / exposed.astype(float), 0.0)
+            rates = __rng(rng).binomial(exposed, rate, size=(B, num_questions)) / exposed.astype(float)
+        low, high = np.percentile(rates, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    else:
+        raise ValueError("Unknown interval method %s; expected one of %s" % (method, methods))
+    pvalue = np.where(expected > 0, poisson.sf(counts - 1, expected), np.where(counts > 0, 0.0, 1.0))
+    return QuestionBreakoff(counts, exposed, expected, lift, low, high, pvalue)
+
+
+def rank(questions):
+    """Returns the question indices of a QuestionBreakoff in decreasing order of lift, questions without breakoffs
+    last"""
+    lift = np.where(np.isnan(questions.lift), -np.inf, questions.lift)
+    return np.argsort(-lift, kind="mergesort")
@@ -0,0 +1,126 @@
+from __init__ import *
+import cPickle as pickle
+import hashlib, json, os, shutil, tempfile
+import numpy as np
+import loadHITs
+import make_survey
+from matrix import ResponseMatrix
+# on-disk cache of parsed surveys and HIT results
+# each entry is keyed by the fingerprint of its source file: (path, size,
+# mtime, parser version). a results entry is a directory with one numbered
+# subdirectory per chunk of the file, each holding .npy arrays, which are
+# memory mapped on load, plus the worker ids, assignment ids and times as
+# json. chunks are written as they are parsed, so a file is never held in
+# memory in full. results entries also include the survey's key, since the
+# question numbering comes from the survey.
+
+cache_dir = os.path.join(home, ".surveyman", "cache")
+__arrays = ["answers", "qpos", "opos"]
+# bumped when the layout of results entries changes
+__layout = 2
+
+def fingerprint(filename, version):
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    return hashlib.sha1("%s:%d:%r:%s" % (path, st.st_size, st.st_mtime, version)).hexdigest()
+
+def __entry(directory, key):
+    return os.path.join(directory or cache_dir, key[:2], key)
+
+def __publish(tmp, path):
+    # entries appear atomically; a concurrent writer of the same entry wins
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, True)
+        else:
+            os.remove(tmp)
+
+def load_survey(source, directory=None):
+    """ returns the parsed survey in a source csv, parsing only if the file
+    has changed since it was cached. the survey's cache_key is set."""
+    key = fingerprint(source, "survey:%d" % make_survey.parser_version)
+    path = __entry(directory, key) + ".pickle"
+    if os.path.exists(path):
+        with open(path, "rb") as fp:
+            survey = pickle.load(fp)
+    else:
+        survey = make_survey.parse(source)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        (fd, tmp) = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as fp:
+            pickle.dump(survey, fp, pickle.HIGHEST_PROTOCOL)
+        __publish(tmp, path)
+    survey.cache_key = key
+    return survey
+
+def __load_array(filename):
+    try:
+        return np.load(filename, mmap_mode="r")
+    except ValueError:
+        # empty arrays cannot be mapped
+        return np.load(filename)
+
+def __read_chunk(path, survey):
+    arrays = [__load_array(os.path.join(path, name + ".npy")) for name in __arrays]
+    with open(os.path.join(path, "ids.json")) as fp:
+        ids = json.load(fp)
+    return ResponseMatrix(survey, *arrays, worker_ids=ids["worker_ids"], assignment_ids=ids["assignment_ids"],
+                          times=ids["times"])
+
+def __read_entry(path, survey):
+    for name in sorted(os.listdir(path), key=int):
+        yield __read_chunk(os.path.join(path, name), survey)
+
+def __write_chunk(path, m):
+    os.mkdir(path)
+    for name in __arrays:
+        np.save(os.path.join(path, name + ".npy"), getattr(m, name))
+    with open(os.path.join(path, "ids.json"), "w") as fp:
+        json.dump({"worker_ids" : m.worker_ids, "assignment_ids" : m.assignment_ids, "times" : m.times}, fp)
+
+def stream_from_dir(dirname, survey, newParse=False, directory=None, processes=1, chunk_size=10000):
+    """ yields the ResponseMatrix chunks of the results csvs in dirname, in
+    file order: memory mapped from the cache for unchanged files, and parsed
+    (in a pool of processes, when more than one) otherwise. parsed chunks
+    are cached as they are yielded, so at most a few chunks are held in
+    memory at once. survey must come from load_survey."""
+    files = loadHITs.hit_files(dirname)
+    paths = [__entry(directory, fingerprint(f, "hits:%d:%d:%s:%s" % (loadHITs.parser_version, __layout, newParse,
+                                                                     survey.cache_key)))
+             for f in files]
+    stale = [f for (f, path) in zip(files, paths) if not os.path.isdir(path)]
+    parsed = loadHITs.read_files(stale, survey, newParse, chunk_size, processes)
+    pending = next(parsed, None)
+    for (f, path) in zip(files, paths):
+        if os.path.isdir(path):
+            for m in __read_entry(path, survey):
+                yield m
+            continue
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(path))
+        try:
+            n = 0
+            # files without any responses get an entry without chunks
+            while pending is not None and pending[0] == f:
+                __write_chunk(os.path.join(tmp, str(n)), pending[1])
+                n += 1
+                yield pending[1]
+                pending = next(parsed, None)
+        except BaseException:
+            shutil.rmtree(tmp, True)
+            raise
+        __publish(tmp, path)
+
+def load_matrix(dirname, survey, newParse=False, directory=None, processes=1, chunk_size=10000):
+    """ loads a directory of results csvs into a single ResponseMatrix, through
+    the cache. unlike stream_from_dir, this copies every response into
+    memory."""
+    return ResponseMatrix.concatenate(survey, stream_from_dir(dirname, survey, newParse, directory, processes,
+                                                              chunk_size))
+
+def clear(directory=None):
+    shutil.rmtree(directory or cache_dir, True)
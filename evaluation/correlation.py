@@ -1 +1,186 @@
-import scipy.stats.spearman
+from collections import namedtuple
+import numpy as np
+from scipy.stats import norm, t as student_t
+from matrix import MISSING
+
+# rank correlations between every pair of questions at once
+#
+# answers are coded as ordinal values, one value per option. respondents who
+# skipped either question of a pair are left out of that pair, as spearmanr
+# and kendalltau would do given only the jointly answered rows. ranks within
+# each pair's rows follow from how many of those rows hold each coded value,
+# and those counts come from products of (respondents x questions) indicator
+# matrices, one per value -- so the whole matrix takes a few matrix products
+# per pair of values instead of a loop over question pairs and respondents.
+# the joint count of each pair of values is folded into running sums as soon
+# as it is computed, so at most (values x questions x questions) is held.
+
+Correlation = namedtuple("Correlation", ["questions", "rho", "pvalue", "n"])
+"""
+The questions correlated, as indices into the ResponseMatrix, and (questions, questions) arrays of the correlation
+coefficient, its two-sided p-value, and the number of respondents who answered both questions.
+"""
+
+max_levels = 32
+
+
+def code_options(m, coding):
+    """
+    Applies coding once per option.
+
+    :param m: A ResponseMatrix
+    :param coding: A function of (question, option) returning the option's ordinal value, or None to treat answers
+        choosing the option as missing
+    :return: A flat float array over options, with nan for None
+    """
+    values = [coding(q, o) for q in m.questions for o in q.options]
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def coded_matrix(m, coding, questions=None):
+    """Returns the (respondents, questions) coded answers, with nan where an answer is missing or not coded"""
+    values = code_options(m, coding)
+    codes = m.codes()
+    if questions is not None:
+        codes = codes[:, questions]
+    coded = np.full(codes.shape, np.nan)
+    answered = codes != MISSING
+    coded[answered] = values[codes[answered]]
+    return coded
+
+
+def __level_indicators(coded):
+    levels = np.unique(coded[~np.isnan(coded)])
+    if len(levels) > max_levels:
+        raise ValueError("%d distinct coded values; at most %d are supported" % (len(levels), max_levels))
+    return [(coded == level).astype(float) for level in levels]
+
+
+def __marginal_counts(indicators, present):
+    """Returns counts[v][i, j], the number of rows with the v-th value for i, where j is answered"""
+    return [k.T.dot(present) for k in indicators]
+
+
+def __within_pair_ranks(counts):
+    """
+    Given counts[v][i, j], the number of rows answering both i and j where i has the v-th value, returns the average
+    rank of the v-th value of i among those rows.
+    """
+    ranks = []
+    below = np.zeros(counts[0].shape)
+    for k in counts:
+        ranks.append(below + (k + 1.0) / 2.0)
+        below = below + k
+    return ranks
+
+
+def __exact_diagonal(coefficient, pvalue, spread):
+    # a question correlates perfectly with itself, unless all its answers are tied
+    i = np.arange(len(coefficient))
+    defined = np.diagonal(spread) > 0
+    coefficient[i, i] = np.where(defined, 1.0, np.nan)
+    pvalue[i, i] = np.where(defined, 0.0, np.nan)
+
+
+def spearman(coded):
+    """
+    Computes Spearman's rho between every pair of columns of coded, over the rows where both are present.
+
+    :param coded: A (respondents, questions) float array of ordinal values, with nan for missing
+    :return: (rho, pvalue, n) arrays of shape (questions, questions)
+    """
+    present = (~np.isnan(coded)).astype(float)
+    indicators = __level_indicators(coded)
+    n = present.T.dot(present)
+    counts = __marginal_counts(indicators, present)
+    ranks = __within_pair_ranks(counts)
+    mean = (n + 1.0) / 2.0
+    sq = sum(k * r * r for (k, r) in zip(counts, ranks)) - n * mean * mean
+    cross = np.zeros(n.shape)
+    for v in range(len(ranks)):
+        for w in range(v, len(ranks)):
+            # the (w, v) term is the transpose of the (v, w) term
+            term = ranks[v] * ranks[w].T * indicators[v].T.dot(indicators[w])
+            cross += term if v == w else term + term.T
+    cov = cross - n * mean * mean
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = cov / np.sqrt(sq * sq.T)
+        rho = np.clip(rho, -1.0, 1.0)
+        tstat = rho * np.sqrt((n - 2) / ((1.0 + rho) * (1.0 - rho)))
+        pvalue = 2 * student_t.sf(np.abs(tstat), n - 2)
+    __exact_diagonal(rho, pvalue, sq)
+    pvalue[np.abs(rho) == 1.0] = 0.0
+    return rho, pvalue, n
+
+
+def __concordance(indicators):
+    """
+    Counts the concordant and discordant pairs of rows for every pair of columns. Values of the first column are taken
+    from the highest down; above[w] and below[w] hold the joint counts seen so far, with a value above (below) the w-th
+    for the second column.
+    """
+    levels = len(indicators)
+    shape = (indicators[0].shape[1],) * 2
+    concordant, discordant = np.zeros(shape), np.zeros(shape)
+    above = [np.zeros(shape) for _ in range(levels)]
+    below = [np.zeros(shape) for _ in range(levels)]
+    for v in reversed(range(levels)):
+        joint = [indicators[v].T.dot(k) for k in indicators]
+        for w in range(levels):
+            concordant += joint[w] * above[w]
+            discordant += joint[w] * below[w]
+        suffix = np.zeros(shape)
+        for w in reversed(range(levels)):
+            above[w] += suffix
+            suffix = suffix + joint[w]
+        prefix = np.zeros(shape)
+        for w in range(levels):
+            below[w] += prefix
+            prefix = prefix + joint[w]
+    return concordant, discordant
+
+
+def kendall(coded):
+    """
+    Computes Kendall's tau-b between every pair of columns of coded, over the rows where both are present. The p-values
+    use the normal approximation with the variance corrected for ties, as kendalltau does.
+
+    :param coded: A (respondents, questions) float array of ordinal values, with nan for missing
+    :return: (tau, pvalue, n) arrays of shape (questions, questions)
+    """
+    present = (~np.isnan(coded)).astype(float)
+    indicators = __level_indicators(coded)
+    n = present.T.dot(present)
+    concordant, discordant = __concordance(indicators)
+    # counts[v, i, j]: rows with value v for i, where j is answered; the ties of j are the transposes
+    counts = np.array(__marginal_counts(indicators, present))
+    pairs = n * (n - 1) / 2.0
+    ties = np.sum(counts * (counts - 1) / 2.0, axis=0)
+    ties0 = np.sum(counts * (counts - 1) * (counts - 2), axis=0)
+    ties1 = np.sum(counts * (counts - 1) * (2 * counts + 5), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tau = (concordant - discordant) / np.sqrt((pairs - ties) * (pairs - ties.T))
+        tau = np.clip(tau, -1.0, 1.0)
+        var = (n * (n - 1) * (2 * n + 5) - ties1 - ties1.T) / 18.0 + \
+            2 * ties * ties.T / (n * (n - 1)) + ties0 * ties0.T / (9 * n * (n - 1) * (n - 2))
+        pvalue = 2 * norm.sf(np.abs(concordant - discordant) / np.sqrt(var))
+    __exact_diagonal(tau, pvalue, pairs - ties)
+    return tau, pvalue, n
+
+
+methods = {"spearman": spearman, "kendall": kendall}
+
+
+def correlation_matrix(m, coding, questions=None, method="spearman"):
+    """
+    Correlates the coded answers to every pair of questions.
+
+    :param m: A ResponseMatrix
+    :param coding: A function of (question, option) returning the option's ordinal value, or None
+    :param questions: Optional indices of the questions to correlate; by default all of them
+    :param method: "spearman" or "kendall"
+    :return: Correlation
+    """
+    questions = np.arange(m.num_questions()) if questions is None else np.asarray(questions, dtype=int)
+    rho, pvalue, n = methods[method](coded_matrix(m, coding, questions))
+    return Correlation(questions, rho, pvalue, n.astype(np.int64))
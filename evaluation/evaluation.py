@@ -3,7 +3,12 @@ import csv, os, sys
 import numpy as np
 import matplotlib.pyplot as pyplot
 import math
-from survey.objects import *
+from objects import *
+from matrix import ResponseMatrix, as_matrix, option_layout, probabilities
+import bootstrap
+import breakoff
+import bots
+from aggregate import FrequencyAggregator
 # first evaluate bot detection
 # want to compare expected number of catch questions, percent bots, ability to catch
 # maybe want to vary by the number of profiles (corresponds to clusters)
@@ -12,37 +17,35 @@ def bias(q1, q2):
     pass
 
 def entropy(survey, responses):
-    emp_prob = empirical_prob(frequency(survey, responses))
-    ent = 0.0
-    for q in emp_prob.keys():
-        for p in emp_prob[q].values():
-            if p > 0:
-                ent += p * (math.log(p) / math.log(2))
-    return -ent
+    return as_matrix(survey, responses).entropy()
 
 
 
 def frequency(survey, responses):
-    """ responses needs to be a single list"""
-    freqs = {q : {o : 0 for o in q.options} for q in survey.questions}
-    for response in responses:
-        for q in response.keys():
-            o = response[q][0]
-            freqs[q][o] += 1
-    return freqs
+    """ responses needs to be a single list, or a ResponseMatrix"""
+    m = as_matrix(survey, responses)
+    return m.to_map(m.frequencies())
 
 def empirical_prob(fmap):
-    probs = {q : {o : 0 for o in list(fmap[q].keys())} for q in list(fmap.keys())}
-    for q in list(fmap.keys()):
-        total = sum(fmap[q].values()) # should be equal to the total number of respondents if we don't permit breakoff
-        for o in list(fmap[q].keys()):
-            if total == 0:
-                probs[q][o] = 0.0
-            else:
-                probs[q][o] = float(fmap[q][o]) / float(total)
-    return probs
+    """ fmap is a frequency map, as made by frequency, or a ResponseMatrix.
+    returns the probability of each option among the answers to its question
+    as a dict map; options of unanswered questions get 0"""
+    if isinstance(fmap, ResponseMatrix):
+        return fmap.to_map(fmap.probabilities())
+    questions = list(fmap.keys())
+    (_, _, option_question) = option_layout(questions)
+    counts = [fmap[q][o] for q in questions for o in q.options]
+    values = iter(probabilities(counts, option_question, len(questions)).tolist())
+    return {q : {o : next(values) for o in q.options} for q in questions}
+
+def flat_probs(m, pmap):
+    # pmap may already be a flat array, as made by ResponseMatrix.probabilities
+    return pmap if isinstance(pmap, np.ndarray) else m.flatten_pmap(pmap)
 
 def log_likelihood(response, pmap):
+    """ given a ResponseMatrix, returns the log likelihood of every respondent as an array"""
+    if isinstance(response, ResponseMatrix):
+        return response.log_likelihoods(flat_probs(response, pmap))
     likelihood = 0.0
     for q in list(response.keys()):
         o = response[q][0]
@@ -50,40 +53,32 @@ def log_likelihood(response, pmap):
     return likelihood
 
 def ind_entropy(response, pmap):
+    """ given a ResponseMatrix, returns the entropy of every respondent as an array"""
+    if isinstance(response, ResponseMatrix):
+        return response.ind_entropies(flat_probs(response, pmap))
     ent = 0.0
     for q in list(response.keys()):
         o = response[q][0]
         ent -= pmap[q][o] * math.log(pmap[q][o]) / math.log(2)
     return ent
 
-def make_bootstrap_interval(survey, responses, alpha, method, stat=np.average, parametric=True):
-    B = 2000
-    pmap = empirical_prob(frequency(survey, responses))
-    #stats = [method(r, pmap) for r in responses]
-    bootstrap_sample = [np.random.choice(responses, len(responses), replace=True) for _ in range(B)]
-    bootstrap_stat = [[method(r,pmap) for r in s] for s in bootstrap_sample]
-    data = sorted([stat(bss) for bss in bootstrap_stat])
-    if parametric:
-        bs_mean = np.average([np.average(samp) for samp in bootstrap_stat])
-        bs_std = np.std([np.average(samp) for samp in bootstrap_stat])
-        return (bs_mean - 2*bs_std, bs_mean + 2*bs_std)
+def make_bootstrap_interval(survey, responses, alpha, method, stat=np.average, parametric=True, B=bootstrap.B, rng=None, n_jobs=1):
+    """ method is computed once per respondent; only the indices are resampled, in n_jobs processes"""
+    if method in [log_likelihood, ind_entropy]:
+        m = as_matrix(survey, responses)
+        values = method(m, m.probabilities())
     else:
-        aindex = int(math.floor((alpha / 2.0)*len(responses)))
-        bindex = int(math.floor((1.0 - (alpha / 2.0))*len(responses)))
-        return (data[aindex], data[bindex])
+        m = as_matrix(survey, responses)
+        pmap = empirical_prob(m)
+        if isinstance(responses, ResponseMatrix):
+            responses = m.to_responses()
+        values = [method(r, pmap) for r in responses]
+    return bootstrap.interval(values, alpha, stat=stat, normal=parametric, b=B, rng=rng, n_jobs=n_jobs)
     
 
 def get_least_popular_options(survey, responses, diff):
-    fmap = frequency(survey, responses)
-    least_popular = {}
-    for q in list(fmap.keys()):
-        optfreqs = list(fmap[q].items())
-        optfreqs = sorted(optfreqs, key = lambda t : t[1])
-        for (i, j) in [(k, k+1) for k in range(len(optfreqs)-1)]:
-            if optfreqs[i][1] < optfreqs[j][1]*diff:
-                least_popular[q] = optfreqs[:j]
-                break
-    print("Number of questions with least popular options : %d" % len([opts for opts in list(least_popular.values()) if len(opts)!=0]))
+    least_popular = FrequencyAggregator(survey).update(responses).least_popular(diff)
+    print("Number of questions with least popular options : %d" % len(least_popular))
     return least_popular
 
 def get_mu(survey, least_popular_options):
@@ -105,16 +100,24 @@ def num_least_popular(response, lpo):
             n += 1
     return n
 
+def least_popular_classify(survey, responses, delta, diff):
+    """ returns (mu, alpha, counts): the number of least popular answers
+    expected of a bot, the probability that a bot gives fewer, and each
+    respondent's number of least popular answers"""
+    m = as_matrix(survey, responses)
+    mask = FrequencyAggregator(survey).add_matrix(m).least_popular_mask(diff)
+    mu = bots.least_popular_mu(m, mask)
+    alpha = pow(math.e, (- delta * mu) / (2 + delta))
+    print("Expect %f least popular answers for a bot; bots will answer fewer than this with probability %f" % (mu, alpha))
+    return mu, alpha, bots.least_popular_counts(m, mask)
+
 def bot_lazy_responses_entropy(survey, responses, alpha, worker_ids):
-    emp_prob = empirical_prob(frequency(survey, responses))
-    lo, hi = make_bootstrap_interval(survey, responses, alpha, ind_entropy, parametric=False)
+    m = as_matrix(survey, responses)
+    lo, hi = make_bootstrap_interval(survey, m, alpha, ind_entropy, parametric=False)
     print "entropy bounds: " , hi, lo
-    classifications = []
-    for response in responses:
-        ent = ind_entropy(response, emp_prob)
-        print ent, len(response), ent > hi 
-        classifications.append((response, ent > hi, ent))
-    return classifications
+    ents = ind_entropy(m, m.probabilities())
+    rows = range(len(m)) if isinstance(responses, ResponseMatrix) else responses
+    return [(response, ent > hi, ent) for (response, ent) in zip(rows, ents.tolist())]
 
 
 def detect_variants(q1, q2, responses):
@@ -122,66 +125,19 @@ def detect_variants(q1, q2, responses):
     
 
 def bot_lazy_responses_unordered(survey, responses, delta, diff):
-    lpo = get_least_popular_options(survey, responses, diff)
-    mu = get_mu(survey, lpo)
-    alpha = pow(math.e, (- delta * mu) / (2 + delta))
-    print("Expect %f least popular answers for a bot; bots will answer fewer than this with probability %f" % (mu, alpha))
-    classifications = []
-    for response in responses:
-        n = num_least_popular(response, lpo)
-        classifications.append((response, n >= round(mu), n))        
-    return classifications
-
-def bot_lazy_responses_ordered(survey, responses, alpha, workerids):
-    # create mapping of total number of options
-    stages = {}
-    for question in survey.questions:
-        m = len(question.options)
-        if m not in stages:
-            stages[m] = []
-        stages[m].append(question)
-    classifications = []
-    for (i, response) in enumerate(responses):
-        workerid = workerids[i]
-        this_classification = []
-        stuff_to_print = {0: "", 1 : "", 2 : "", 3 : "", 4 : 0}
-        for (m, questions) in stages.items():
-            if m > 1 and len(questions) > 1:
-                #print([(j, m-j-1) for j in range(int(math.floor(m/2)))])
-                for (hi, lo) in [(j, m - j - 1) for j in range(int(math.floor(m/2)))]:
-                    hict = len([opos for (_, (_, _, opos)) in [(q, tupe) for (q, tupe) in response.items() if q in questions] if int(opos) == hi])
-                    #print("Number at stage %d, position %d: %d" % (m, hi, hict))
-                    loct = len([opos for (_, (_, _, opos)) in [(q, tupe) for (q, tupe) in response.items() if q in questions] if int(opos) == lo])
-                    #print("Number at stage %d, position %d: %d" % (m, lo, loct))
-                    n = hict + loct
-                    if n == 0:
-                        continue
-                    mu = 0.5 * n
-                    delta = math.sqrt((3 * math.log(alpha)) / (- mu))
-                    x = {True : hict, False : loct}[hict > loct]
-                    b = (1 + delta) * mu
-                    c = x >= (1 + delta) * mu
-                    if x >= b:
-                        if hict > loct:
-                            stuff_to_print[hi] = "%d >= %f" % (x,b)
-                            stuff_to_print[lo] = str(loct)
-                        else :
-                            stuff_to_print[hi] = str(hict)
-                            stuff_to_print[lo] = "%d >= %f" % (x,b)
-                    else :
-                        stuff_to_print[hi] = str(hict)
-                        stuff_to_print[lo] = str(loct)
-                    stuff_to_print[4] += hict + loct                        
-                    #print("If %d >= %f : Bot? %s, workerid: %s, amazon reviews?: %s\n" % (x, b, c, workerid, amazon(workerid)))
-                    this_classification.append((response, x >= (1 + delta) * mu, n))
-        if any([t[1] for t in this_classification]):
-            print "<tr><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%d</td>" % (stuff_to_print[0], stuff_to_print[1], stuff_to_print[2], stuff_to_print[3], stuff_to_print[4])
-        # policy for deciding bots for each question length? what's
-        # the probability of making an incorrect classification?
-        # will probably want a discount factor over these things
-        # for now, just return that it's a bot if one is true
-        classifications.append((response, any([t[1] for t in this_classification]), workerid))
-    return classifications
+    mu, _, counts = least_popular_classify(survey, responses, delta, diff)
+    rows = range(len(counts)) if isinstance(responses, ResponseMatrix) else responses
+    return [(response, n >= round(mu), n) for (response, n) in zip(rows, counts.tolist())]
+
+def bot_lazy_responses_ordered(survey, responses, alpha, workerids, report=None):
+    """ classifies respondents by the positions of the options they chose; see
+    bots.ordered_position_bots. report is an optional hook for flagged
+    respondents, e.g. bots.html_report(). given a ResponseMatrix, the first
+    element of each classification is the respondent's row."""
+    m = as_matrix(survey, responses)
+    flags = bots.ordered_position_bots(m, alpha, report)
+    rows = range(len(m)) if isinstance(responses, ResponseMatrix) else responses
+    return [(response, bool(isbot), workerid) for (response, isbot, workerid) in zip(rows, flags, workerids)]
 
 def amazon(workerid):
     return True
@@ -216,26 +172,6 @@ def make_plot(data, title, filename):
     #pyplot.show()
     fig.savefig(filename)
 
-# def now_with_my_thing(clusters):
-#     n=10
-#     m=5
-#     s1 = Survey([Question("", [Option("") for _ in range(m)], qtypes["radio"], shuffle=True) for _ in range(n)])
-#     data = []
-#     for i in range(1,10):
-#         sub_data = []
-#         for j in range(100):
-#             bots, nots = sample(s1, make_profiles(s1, clusters), 100, i/10.0)
-#             classifications = classify2(s1, bots, nots, 1.0, 0.75)
-#             (false_negative, false_positive) = analyze_classifications(classifications)
-#             sub_data.append((float(false_negative) / float(len(bots)) , float(false_positive) / float(len(nots)), i/10.0))
-#         data.append(sub_data)
-#     return data
-
-def run_this():
-    make_plot(now_with_my_thing(1), "Bots answer >= expected min questions", "balls_n_bins_1_cluster.png")
-    make_plot(generate_bots_v_humans(classify_humans_as_outliers, 1), "Humans are outliers; 1 cluster of humans", "humans_outliers_1_cluster.png")
-    make_plot(generate_bots_v_humans(classify_bots_as_outliers, 1), "Bots are outliers; 1 cluster of humans", "bots_outliers_1_cluster.png")
-
 # now simulate breakoff 
 # hypothesis : when breakoff is permitted, people will stop around a clustered point according to their personal utility function
 # we believe that this point follows a normal distribution. 
@@ -264,38 +200,22 @@ def make_breakoff_profiles(s, n):
     print(len(profiles))
     return profiles
 
-def breakoff_frequency_by_question(survey, responses):
-    breakoff = {q.quid : 0 for q in survey.questions}
-    for response in responses:
-        questions_by_index = sorted(list(response.items()), key = lambda x : int(x[1][1]))
-        breakoff[questions_by_index[-1][0].quid] += 1
-    return breakoff
-
-def breakoff_frequency_by_position(survey, responses):
-    # 0-indexed
-    breakoff = {i : 0 for i in range(len(survey.questions))}
-    for response in responses:
-        breakoff[len(response)-1] += 1
-    return breakoff
-
-
-def get_interval(samp, alpha, norm=False):
-    B = 2000
-    bootstrap_sample = [sorted(np.random.choice(samp, len(samp), replace=True)) for _ in range(B)]
-    bootstrap_means = [np.average(samp) for samp in bootstrap_sample]
-    bootstrap_mean = np.average(bootstrap_means)
-    if norm :
-        bootstrap_std = np.std(bootstrap_means)
-        a, b = bootstrap_mean - 2.0*bootstrap_std, bootstrap_mean + 2.0*bootstrap_std
-    else :
-        hi = int(math.ceil((1-alpha)*len(bootstrap_means)))
-        lo = int(math.floor(alpha*len(bootstrap_means)))
-        a = sorted(bootstrap_means)[lo]
-        b = sorted(bootstrap_means)[hi]
-    return (a, b)
+def get_interval(samp, alpha, norm=False, B=bootstrap.B, rng=None, n_jobs=1):
+    # alpha is the mass in each tail
+    return bootstrap.interval(samp, 2.0 * alpha, normal=norm, b=B, rng=rng, n_jobs=n_jobs)
     
 def identify_breakoff_questions(survey, responses, alpha):
-    fmap1 = breakoff_frequency_by_position(survey, responses)
-    fmap2 = breakoff_frequency_by_question(survey, responses)
-    return (fmap1, fmap2)
-
+    """ returns (bad_pos, bad_q): a dict mapping each position to the number
+    of respondents who broke off there, and a list of the questions where
+    respondents broke off significantly more often than the positions they
+    were shown at explain, at level alpha, in decreasing order of lift. each
+    is a dict with the question's quid, its lift as 'score', the number of
+    breakoffs and the p-value."""
+    m = as_matrix(survey, responses)
+    positions = breakoff.by_position(m, alpha)
+    questions = breakoff.by_question(m, alpha, positions=positions)
+    bad_pos = dict(enumerate(positions.counts.tolist()))
+    bad_q = [{'question' : m.questions[i].quid, 'score' : float(questions.lift[i]),
+              'count' : int(questions.counts[i]), 'pvalue' : float(questions.pvalue[i])}
+             for i in breakoff.rank(questions) if questions.pvalue[i] < alpha]
+    return (bad_pos, bad_q)
@@ -1,103 +1,255 @@
 from __init__ import *
-import csv, os, sys
+import ast, collections, csv, itertools, os, re, sys
+import multiprocessing
+import numpy as np
 import make_survey
 import evaluation
 import json
+from matrix import ResponseMatrix, MISSING
 # read in files in a directory
 # parse into a map
 # analyze
 
+parser_version = 1 # bump when parsing changes, to invalidate cached results
+
 universal_headers = ['HitId','HitTitle','Annotation','AssignmentId','WorkerId','Status','AcceptTime','SubmitTime']
 
 def get_survey(source_csv):
     return make_survey.parse(source_csv)
 
-def setValue(newParse, ans, qrows_lookup, orows_lookup, response, time):
+# answer cells hold a component id of the form prefix_row_column, naming the
+# source csv row of the chosen option, along with the question and option
+# positions: either as a literal dict (the new format) or as id;qpos;opos
+__oid = re.compile(r"^[^_]*_(\d+)_\d+$")
+__dict_oid = re.compile(r"""['"]oid['"]\s*:\s*u?['"]([^'"]*)['"]""")
+__dict_qpos = re.compile(r"""['"]qpos['"]\s*:\s*u?['"]?(-?\d+)""")
+__dict_opos = re.compile(r"""['"]opos['"]\s*:\s*u?['"]?(-?\d+)""")
+__number = re.compile(r"^\s*-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$")
+
+def __literal_answer(ans):
+    # slow path for dicts the regular expressions do not recognize
+    try:
+        obj = ast.literal_eval(ans)
+        return (obj["oid"], obj["qpos"], obj["opos"])
+    except (ValueError, SyntaxError, TypeError, KeyError):
+        return None
+
+def parse_answer(ans, newParse=False):
+    """ returns (row, qpos, opos) for an answer, a float for a timing value, or None for anything else.
+    never evaluates the cell."""
     if newParse:
-        try:
-            obj = eval(ans)
-            if type(obj) == dict:
-                qpos = obj["qpos"]
-                opos = obj["opos"]
-                (_, r, c) = obj["oid"].split("_")
-                q = qrows_lookup[int(r)]
-                o = orows_lookup[int(r)]
-                response['Answers'][q] = (o, qpos, opos)
-                return 
-            elif type(obj) in [int, float]:
-                time.append(obj)
-                return
-        except SyntaxError:
-            #print ans
-            return 
-        except NameError:
-            #print ans
-            return
-        except TypeError:
-            print ans
+        if ans.startswith('{'):
+            oid, qpos, opos = __dict_oid.search(ans), __dict_qpos.search(ans), __dict_opos.search(ans)
+            if oid and qpos and opos:
+                found = (oid.group(1), qpos.group(1), opos.group(1))
+            else:
+                found = __literal_answer(ans)
+                if found is None:
+                    return None
+            row = __oid.match(str(found[0]))
+            return (int(row.group(1)), int(found[1]), int(found[2])) if row else None
+        elif __number.match(ans):
+            return float(ans)
+        return None
     else:
         try:
             (joid, qpos, opos) = ans.split(';')
+            row = __oid.match(joid)
+            return (int(row.group(1)), int(qpos), int(opos)) if row else None
         except ValueError:
-            return 
-        opos = eval(opos)
-        qpos = eval(qpos)
-        (_, r, c) = joid.split("_")
-        q = qrows_lookup[int(r)]
-        o = orows_lookup[int(r)]
-        response['Answers'][q] = (o, qpos, opos)
+            return None
 
+def row_maps(survey):
+    """ returns int32 arrays mapping source csv rows to question indices and to
+    option indices within their question, with MISSING for other rows"""
+    rows = [r for q in survey.questions for r in q.sourceRows] + \
+        [o.sourceCellId[0] for q in survey.questions for o in q.options]
+    row_question = np.full(max(rows) + 1 if rows else 0, MISSING, dtype=np.int32)
+    row_option = np.full(len(row_question), MISSING, dtype=np.int32)
+    for (i, question) in enumerate(survey.questions):
+        for row in question.sourceRows:
+            assert(row_question[row] == MISSING)
+            row_question[row] = i
+        for (j, o) in enumerate(question.options):
+            (row, _) = o.sourceCellId
+            assert(row_option[row] == MISSING)
+            row_option[row] = j
+    return row_question, row_option
 
+memo_size = 1 << 16 # distinct answer cells remembered per file
 
-def load_from_dir (dirname, survey, newParse=False):
-    # model responses as lists, rather than SurveyResponse objects, as
-    # in the evaluation namespace
+def hit_files(dirname):
+    return [os.path.join(dirname, filename) for filename in sorted(os.listdir(dirname))
+            if 'csv' in filename and "#" not in filename]
 
-    qrows_lookup = {}
-    orows_lookup = {}
-    for question in survey.questions:
-        for row in question.sourceRows:
-            assert(row not in qrows_lookup)
-            qrows_lookup[row] = question
-        for o in question.options:
-            (row, _) = o.sourceCellId
-            assert(row not in orows_lookup)
-            orows_lookup[row] = o
+def chunk_offsets(filename, chunk_size=10000):
+    """ returns the file offsets at which each chunk of chunk_size
+    respondents of a results csv starts, without parsing any answers. a
+    line ends a row unless it leaves a quoted field open."""
+    offsets = []
+    with open(filename, "rU") as fp:
+        # readline, unlike iteration, keeps tell() exact
+        readline = fp.readline
+        if not readline():
+            return offsets
+        rows, quoted, offset = 0, False, fp.tell()
+        while True:
+            line = readline()
+            if not line:
+                return offsets
+            if not quoted and rows % chunk_size == 0:
+                offsets.append(offset)
+            if line.count('"') % 2:
+                quoted = not quoted
+            if not quoted:
+                rows += 1
+            offset = fp.tell()
 
-    header = True
-    responses = []
-    for filename in os.listdir(dirname):
-        if 'csv' not in filename or "#" in filename : 
-            continue
-        reader = csv.reader(open(dirname+"/"+filename, "rU"))
-        # the user response - should have entries for each question
-        times = []
-        for row in reader:
-            if header:
-                headers = row
-                header = False
-            else:
+def read_file(filename, row_question, row_option, num_questions, newParse=False, chunk_size=10000, offset=None,
+              parsed=None):
+    """ parses one results csv, yielding (answers, qpos, opos, worker_ids,
+    assignment_ids, times) tuples of at most chunk_size respondents. given
+    an offset from chunk_offsets, parses only the chunk starting there.
+    parsed memoizes answer cells, and may be shared between calls."""
+    # plain lists index faster than arrays one element at a time
+    row_question, row_option = row_question.tolist(), row_option.tolist()
+    num_rows = len(row_question)
+    skip = len(universal_headers)
+    parsed = {} if parsed is None else parsed
+    with open(filename, "rU") as fp:
+        reader = csv.reader(fp)
+        headers = next(reader, None)
+        if headers is None:
+            return
+        # header positions are resolved once per file
+        worker_col = headers.index('WorkerId')
+        assignment_col = headers.index('AssignmentId')
+        if offset is not None:
+            fp.seek(offset)
+        while True:
+            # (respondent, question, option, qpos, opos) for every answer in the chunk
+            cells = ([], [], [], [], [])
+            worker_ids, assignment_ids, times = [], [], []
+            n = 0
+            for row in reader:
+                worker_ids.append(row[worker_col])
+                assignment_ids.append(row[assignment_col])
                 time = []
-                response = {}
-                response['WorkerId'] = row[headers.index('WorkerId')]
-                response['AssignmentId'] = row[headers.index('AssignmentId')]
-                response['Answers'] = {}
-                answers = row[len(universal_headers):]
-                    # add actual answers - will be a list of ids
-                for ans in answers:
-                    setValue(newParse, ans, qrows_lookup, orows_lookup, response, time)
-#                    print o, qpos, opos, response['Answers'][q]
-                responses.append(response)
+                for ans in row[skip:]:
+                    # the same cells recur across respondents, so parses are memoized
+                    try:
+                        val = parsed[ans]
+                    except KeyError:
+                        if len(parsed) >= memo_size:
+                            parsed.clear()
+                        val = parsed[ans] = parse_answer(ans, newParse)
+                    if type(val) is tuple:
+                        r = val[0]
+                        if r >= num_rows or row_question[r] == MISSING:
+                            raise KeyError(r)
+                        cells[0].append(n)
+                        cells[1].append(row_question[r])
+                        cells[2].append(row_option[r])
+                        cells[3].append(val[1])
+                        cells[4].append(val[2])
+                    elif val is not None:
+                        time.append(val)
                 times.append(time)
-        header = True
+                n += 1
+                if n == chunk_size:
+                    break
+            if n == 0:
+                return
+            answers = np.full((n, num_questions), MISSING, dtype=np.int32)
+            qpos = np.full((n, num_questions), MISSING, dtype=np.int32)
+            opos = np.full((n, num_questions), MISSING, dtype=np.int32)
+            # later answers to the same question overwrite earlier ones
+            index = (cells[0], cells[1])
+            answers[index] = cells[2]
+            qpos[index] = cells[3]
+            opos[index] = cells[4]
+            yield (answers, qpos, opos, worker_ids, assignment_ids, times)
+            if n < chunk_size or offset is not None:
+                return
+
+__worker__ = {}
+
+def __init_worker(*args):
+    # row_question, row_option, num_questions, newParse, chunk_size
+    __worker__['args'] = args
+    __worker__['parsed'] = {}
+
+def __read_in_worker(task):
+    (filename, offset) = task
+    chunks = list(read_file(filename, *__worker__['args'], offset=offset, parsed=__worker__['parsed']))
+    return chunks[0] if chunks else None
+
+def __tasks(files, chunk_size):
+    for filename in files:
+        for offset in chunk_offsets(filename, chunk_size):
+            yield (filename, offset)
+
+def read_files(files, survey, newParse=False, chunk_size=10000, processes=1):
+    """ yields (filename, ResponseMatrix) pairs for the chunks of each results
+    csv, of at most chunk_size respondents, in file order. with processes > 1
+    chunks are parsed in a process pool. at most 2 * processes chunks are
+    submitted ahead of the one being yielded, so memory stays bounded by the
+    chunk size however large the files are."""
+    row_question, row_option = row_maps(survey)
+    args = (row_question, row_option, len(survey.questions), newParse, chunk_size)
+    if processes > 1 and files:
+        pool = multiprocessing.Pool(processes, __init_worker, args)
+        try:
+            pending = collections.deque()
+            tasks = __tasks(files, chunk_size)
+            while True:
+                for task in itertools.islice(tasks, 2 * processes - len(pending)):
+                    pending.append((task[0], pool.apply_async(__read_in_worker, (task,))))
+                if not pending:
+                    break
+                (filename, result) = pending.popleft()
+                chunk = result.get()
+                if chunk is not None:
+                    yield filename, ResponseMatrix(survey, *chunk)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for filename in files:
+            for chunk in read_file(filename, *args):
+                yield filename, ResponseMatrix(survey, *chunk)
+
+def stream_from_dir(dirname, survey, newParse=False, chunk_size=10000, processes=1):
+    """ yields the responses in a directory of results csvs as ResponseMatrix
+    chunks; see read_files"""
+    for (_, chunk) in read_files(hit_files(dirname), survey, newParse, chunk_size, processes):
+        yield chunk
+
+def load_matrix(dirname, survey, newParse=False, chunk_size=10000, processes=1):
+    """ loads a directory of results csvs into a single ResponseMatrix"""
+    return ResponseMatrix.concatenate(survey, stream_from_dir(dirname, survey, newParse, chunk_size, processes))
+
+def responses_from_matrix(m):
+    # model responses as lists, rather than SurveyResponse objects, as
+    # in the evaluation namespace
+    return [{'WorkerId' : workerid, 'AssignmentId' : assignmentid, 'Answers' : answers}
+            for (workerid, assignmentid, answers) in zip(m.worker_ids, m.assignment_ids, m.to_responses())]
+
+def load_from_dir (dirname, survey, newParse=False, processes=1):
+    responses = []
+    times = []
+    for chunk in stream_from_dir(dirname, survey, newParse, processes=processes):
+        responses.extend(responses_from_matrix(chunk))
+        times.extend(chunk.times)
     return responses, times
 
                     
 if __name__ == "__main__":
     source = sys.argv[1] #'data/SMLF5.csv'
     hitDir = sys.argv[2] #'/Users/etosch/Desktop/phonology2/'
-    survey = get_survey(source)
-    responses = load_from_dir(hitDir, survey)
+    import cache
+    survey = cache.load_survey(source)
+    responses = responses_from_matrix(cache.load_matrix(hitDir, survey))
     responses_by_id = [{ q.quid : (o.oid, a, b) for (q, (o, a, b)) in response['Answers'].items() } for response in responses]
     bad_pos, bad_q = evaluation.identify_breakoff_questions(survey, responses_by_id, 0.05)
     bad_qs = [ q for q in survey.questions if q.quid in [bq['question'] for bq in bad_q]]
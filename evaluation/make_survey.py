@@ -2,11 +2,12 @@
 # ignoring branching for now
 
 from __init__ import *
-from survey.objects import *
+from objects import *
 import csv
 
 # positions of the headers
 QUESTION, OPTIONS, RESOURCE, BLOCK, EXCLUSIVE, RANDOMIZE, FREETEXT, ORDERED, BRANCH, CORRELATE = [None]*10
+parser_version = 1 # bump when parsing changes, to invalidate cached surveys
 trues = ['true', 't', 'y', 'yes', '1']
 falses = ['false', 'f', 'n', 'no', '0']
 
@@ -0,0 +1,237 @@
+import numpy as np
+
+# dense response storage for the evaluation code
+# a response set is a respondents x questions grid of option indices, with
+# MISSING wherever a respondent did not answer; qpos and opos record the
+# position at which the question, and the chosen option, were shown
+
+MISSING = -1
+
+
+def option_layout(questions):
+    """
+    Numbers the options of questions in one flat sequence.
+
+    :param questions: A list of questions
+    :return: (option_counts, option_ptr, option_question) int64 arrays: the number of options of each question, the
+        offset of each question's first option (plus the total at the end), and the question of each option
+    """
+    option_counts = np.array([len(q.options) for q in questions], dtype=np.int64)
+    option_ptr = np.zeros(len(questions) + 1, dtype=np.int64)
+    np.cumsum(option_counts, out=option_ptr[1:])
+    return option_counts, option_ptr, np.repeat(np.arange(len(questions)), option_counts)
+
+
+def answer_lookups(survey):
+    """
+    Returns (qindex, oindex): a dict mapping questions and quids to question indices, and a list with, for each
+    question, a dict mapping its options and oids to option indices.
+    """
+    qindex = {}
+    oindex = []
+    for (i, q) in enumerate(survey.questions):
+        qindex[q] = qindex[q.quid] = i
+        lookup = {}
+        for (j, o) in enumerate(q.options):
+            lookup[o] = lookup[o.oid] = j
+        oindex.append(lookup)
+    return qindex, oindex
+
+
+def probabilities(counts, option_question, num_questions):
+    """
+    Normalizes flat option counts within each question; options of questions with no answers get probability 0.
+
+    :param counts: Flat option counts
+    :param option_question: The question of each option, as made by option_layout
+    :param num_questions: The number of questions
+    :return: A flat float array
+    """
+    counts = np.asarray(counts)
+    totals = np.bincount(option_question, weights=counts, minlength=num_questions)[option_question]
+    probs = np.zeros(len(counts))
+    np.divide(counts, totals, out=probs, where=totals > 0)
+    return probs
+
+
+def entropy(probs):
+    """Returns the sum over questions of the entropy, in bits, of flat option probabilities"""
+    p = probs[probs > 0]
+    return -np.sum(p * np.log2(p))
+
+
+class ResponseMatrix:
+    """
+    Encodes a set of responses to a survey as int32 arrays of shape (respondents, questions).
+
+    - answers[r, q] is the index of the chosen option in survey.questions[q].options, or MISSING.
+    - qpos[r, q] and opos[r, q] are the positions at which the question and the chosen option were shown, or MISSING.
+    - worker_ids, assignment_ids and times, when known, are lists with one entry per respondent; times holds the list
+      of timing values recorded for the respondent.
+
+    Options are also numbered in one flat sequence: the options of question q are numbered
+    ``option_ptr[q]:option_ptr[q+1]``. Counts and probabilities are flat arrays in that numbering.
+    """
+
+    def __init__(self, survey, answers, qpos=None, opos=None, worker_ids=None, assignment_ids=None, times=None):
+        self.survey = survey
+        self.questions = list(survey.questions)
+        self.answers = np.asarray(answers, dtype=np.int32).reshape(-1, len(self.questions))
+        shape = self.answers.shape
+        self.qpos = np.full(shape, MISSING, dtype=np.int32) if qpos is None else np.asarray(qpos, dtype=np.int32)
+        self.opos = np.full(shape, MISSING, dtype=np.int32) if opos is None else np.asarray(opos, dtype=np.int32)
+        assert(self.qpos.shape == shape and self.opos.shape == shape)
+        self.worker_ids = worker_ids
+        self.assignment_ids = assignment_ids
+        self.times = times
+        (self.option_counts, self.option_ptr, self.option_question) = option_layout(self.questions)
+
+    @classmethod
+    def from_responses(cls, survey, responses, worker_ids=None, assignment_ids=None):
+        """
+        Builds a matrix from the dict responses used elsewhere in the evaluation code.
+
+        :param survey: The survey the responses answer
+        :param responses: A list of dicts mapping questions (or quids) to (option, qpos, opos) tuples, or to options
+            (or oids)
+        :param worker_ids: Optional list of worker ids, one per response
+        :param assignment_ids: Optional list of assignment ids, one per response
+        :return: ResponseMatrix
+        """
+        (qindex, oindex) = answer_lookups(survey)
+        shape = (len(responses), len(survey.questions))
+        answers = np.full(shape, MISSING, dtype=np.int32)
+        qpos = np.full(shape, MISSING, dtype=np.int32)
+        opos = np.full(shape, MISSING, dtype=np.int32)
+        for (r, response) in enumerate(responses):
+            for (q, val) in response.items():
+                i = qindex[q]
+                if type(val) in [tuple, list]:
+                    answers[r, i] = oindex[i][val[0]]
+                    if len(val) == 3:
+                        qpos[r, i] = int(val[1])
+                        opos[r, i] = int(val[2])
+                else:
+                    answers[r, i] = oindex[i][val]
+        return cls(survey, answers, qpos, opos, worker_ids, assignment_ids)
+
+    @classmethod
+    def concatenate(cls, survey, matrices):
+        """
+        Stacks matrices for the same survey, e.g. the chunks produced by loadHITs.stream_from_dir.
+
+        :param survey: The survey the responses answer
+        :param matrices: A list of ResponseMatrix
+        :return: ResponseMatrix
+        """
+        matrices = list(matrices)
+        if not matrices:
+            return cls(survey, np.zeros((0, len(survey.questions)), dtype=np.int32), worker_ids=[], assignment_ids=[],
+                       times=[])
+
+        def join(attr):
+            if any(getattr(m, attr) is None for m in matrices):
+                return None
+            return [x for m in matrices for x in getattr(m, attr)]
+
+        return cls(survey, np.concatenate([m.answers for m in matrices]), np.concatenate([m.qpos for m in matrices]),
+                   np.concatenate([m.opos for m in matrices]), join("worker_ids"), join("assignment_ids"),
+                   join("times"))
+
+    def __len__(self):
+        return self.answers.shape[0]
+
+    def num_respondents(self):
+        return self.answers.shape[0]
+
+    def num_questions(self):
+        return self.answers.shape[1]
+
+    def num_options(self):
+        return int(self.option_ptr[-1])
+
+    def answered(self):
+        """Returns a boolean (respondents, questions) mask of the cells that hold an answer"""
+        return self.answers != MISSING
+
+    def codes(self):
+        """Returns the flat option number of every answer, with MISSING where there is none"""
+        return np.where(self.answered(), self.answers + self.option_ptr[:-1], MISSING)
+
+    def take(self, rows):
+        """
+        Returns a new matrix holding the given respondents.
+
+        :param rows: An index array or boolean mask over respondents
+        :return: ResponseMatrix
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        worker_ids = None if self.worker_ids is None else [self.worker_ids[r] for r in rows]
+        assignment_ids = None if self.assignment_ids is None else [self.assignment_ids[r] for r in rows]
+        times = None if self.times is None else [self.times[r] for r in rows]
+        return ResponseMatrix(self.survey, self.answers[rows], self.qpos[rows], self.opos[rows], worker_ids,
+                              assignment_ids, times)
+
+    def to_responses(self):
+        """Converts back to a list of dicts mapping questions to (option, qpos, opos) tuples"""
+        responses = []
+        for r in range(len(self)):
+            response = {}
+            for i in np.flatnonzero(self.answers[r] != MISSING):
+                q = self.questions[i]
+                response[q] = (q.options[self.answers[r, i]], int(self.qpos[r, i]), int(self.opos[r, i]))
+            responses.append(response)
+        return responses
+
+    def frequencies(self):
+        """Returns the number of times each option was chosen, as a flat int64 array"""
+        codes = self.codes()
+        return np.bincount(codes[codes != MISSING], minlength=self.num_options())
+
+    def probabilities(self, counts=None):
+        """
+        Returns the empirical probability of each option among the answers to its question, as a flat float array.
+        Options of questions nobody answered have probability 0.
+
+        :param counts: Optional flat counts to use instead of this matrix's frequencies
+        """
+        counts = self.frequencies() if counts is None else counts
+        return probabilities(counts, self.option_question, self.num_questions())
+
+    def entropy(self, probs=None):
+        """Returns the sum over questions of the entropy, in bits, of the empirical option distribution"""
+        return entropy(self.probabilities() if probs is None else probs)
+
+    def __answer_probs(self, probs):
+        """Returns the probability of each answer, with 1 where there is none, so logs of missing cells vanish"""
+        codes = self.codes()
+        return np.where(codes != MISSING, probs[np.maximum(codes, 0)], 1.0)
+
+    def log_likelihoods(self, probs=None):
+        """Returns the negative log likelihood of each respondent's answers, as an array of length respondents"""
+        probs = self.probabilities() if probs is None else probs
+        return -np.sum(np.log(self.__answer_probs(probs)), axis=1)
+
+    def ind_entropies(self, probs=None):
+        """Returns each respondent's contribution, in bits, to the entropy of the answers they gave"""
+        p = self.__answer_probs(self.probabilities() if probs is None else probs)
+        return -np.sum(p * np.log2(p), axis=1)
+
+    def flatten_pmap(self, pmap):
+        """Converts a dict pmap, as made by evaluation.empirical_prob, to a flat probability array"""
+        return np.array([pmap[q][o] for q in self.questions for o in q.options], dtype=float)
+
+    def to_map(self, values):
+        """Converts a flat per-option array back to a dict of dicts keyed by question, then option"""
+        values = np.asarray(values).tolist()
+        return {q: {o: values[self.option_ptr[i] + j] for (j, o) in enumerate(q.options)}
+                for (i, q) in enumerate(self.questions)}
+
+
+def as_matrix(survey, responses):
+    """Returns responses as a ResponseMatrix, converting a list of dict responses if necessary"""
+    if isinstance(responses, ResponseMatrix):
+        return responses
+    return ResponseMatrix.from_responses(survey, responses)
@@ -1,59 +1,39 @@
 from __init__ import *
 from loadHITs import *
-from scipy.stats import spearmanr
+import cache
+import correlation
+from matrix import as_matrix
+from respondents import RespondentIndex, answer_mask
 import matplotlib.pyplot as plt
 import numpy as np
 
 
 #correlation
-def get_corr_for_suffix(suffix, responses):
-
-    retval = {} # tuple of questions that maps to spearmanr
-
-    for q1 in survey.questions:
-        
-        if q1.quid in word_quid_map:
-            (w1, s1) = word_quid_map[q1.quid]
-            if s1 != suffix:
-                continue
-        else: 
-            continue
-
+coding = {'definitely' : { True : 1, False : 4 },
+          'probably' : { True : 2, False : 3}}
+
+def code_option(q, o):
+    # options read "<definitely|probably> <word>-<suffix>"; coded once per option
+    if q.quid not in word_quid_map or ' ' not in o.otext:
+        return None
+    (w, s) = word_quid_map[q.quid]
+    (adj, chunk) = o.otext.split(' ')
+    (w1, s1) = chunk.split('-')
+    assert(w==w1)
+    return coding[adj][s.startswith('a')]
+
+def get_corr_for_suffix(suffix, responses, method="spearman"):
+
+    m = as_matrix(survey, responses)
+    questions = [i for (i, q) in enumerate(m.questions) if q.quid in word_quid_map and word_quid_map[q.quid][1] == suffix]
+    corr = correlation.correlation_matrix(m, code_option, questions, method)
+
+    retval = {} # tuple of questions that maps to (rho, p)
+    for (a, i) in enumerate(corr.questions):
+        q1 = m.questions[i]
         retval[q1] = {}
-
-        for q2 in survey.questions:
-            
-            if q2.quid in word_quid_map:
-                (w2, s2) = word_quid_map[q2.quid]
-                if s2 != suffix:
-                    continue
-            else: 
-                continue
-
-            q1aleft = s1.startswith('a')
-            q2aleft = s2.startswith('a')
-            obs1 = []
-            obs2 = []
-            coding = {'definitely' : { True : 1, False : 4 },
-                      'probably' : { True : 2, False : 3}}
-
-            for response in responses:
-                if q1 in response and q2 in response:
-                    q1resp = response[q1]
-                    q2resp = response[q2]
-                else:
-                    continue
-                (adj1, chunk1) = q1resp[0].otext.split(' ')
-                (adj2, chunk2) = q2resp[0].otext.split(' ')
-                (w11, s11) = chunk1.split('-')
-                (w22, s22) = chunk2.split('-')
-                assert(w1==w11)
-                assert(w2==w22)
-                obs1.append(coding[adj1][q1aleft])
-                obs2.append(coding[adj2][q2aleft])
-                
-            retval[q1][q2] = spearmanr(obs1, obs2)
-        
+        for (b, j) in enumerate(corr.questions):
+            retval[q1][m.questions[j]] = (corr.rho[a, b], corr.pvalue[a, b])
     return retval
 
 def make_subplot(ax, data, column_labels, row_labels, title):
@@ -104,11 +84,12 @@ if __name__ == "__main__":
 
     colormap = plt.cm.cool
 
-    survey = get_survey(source)
+    survey = cache.load_survey(source)
     print hitDir, hitDir.endswith("3")
-    responses, times = load_from_dir(hitDir, survey, hitDir.endswith("3"))
-    print("Total number of responses", len(responses))
-    print("Total number of unique respondents", len(set([r['WorkerId'] for r in responses])))
+    m = cache.load_matrix(hitDir, survey, hitDir.endswith("3"))
+    times = m.times
+    print("Total number of responses", len(m))
+    print("Total number of unique respondents", RespondentIndex(m).num_workers())
 
     word_quid_map = {}
     for q in survey.questions:
@@ -121,18 +102,18 @@ if __name__ == "__main__":
     # remove non-native english speakers
     q_native_speaker = [q for q in survey.questions if 7 in q.sourceRows][0]
     o_native_speaker = [o for o in q_native_speaker.options if o.otext == 'Yes'][0]
-    responses = [r for r in responses if q_native_speaker in r['Answers'] and r['Answers'][q_native_speaker][0] == o_native_speaker]
-    print("Total number of native speaker responses:", len(responses))
+    m = m.take(answer_mask(m, q_native_speaker, [o_native_speaker]))
+    print("Total number of native speaker responses:", len(m))
 
     # data for plotting with minimal filters
-    prelim_thon = get_data(get_corr_for_suffix('thon', [ r['Answers'] for r in responses]))
+    prelim_thon = get_data(get_corr_for_suffix('thon', m))
      # make_subplot(plt.subplot(1,2,1) \
     #              , np.array([[spear for (q2, (spear, p)) in corrs] for (_, corrs) in prelim_thon]) \
     #              , [word_quid_map[q.quid][0] for q in [qq for (qq, _) in prelim_thon]] \
     #              , [word_quid_map[qqq.quid][0] for (qqq, _) in prelim_thon[1][1]] \
     #              , "")
 
-    prelim_licious = get_data(get_corr_for_suffix('licious', [ r['Answers'] for r in responses]))
+    prelim_licious = get_data(get_corr_for_suffix('licious', m))
     # make_subplot(plt.subplot(1,2,2) \
     #              , np.array([[spear for (q2, (spear, p)) in corrs] for (_, corrs) in prelim_licious]) \
     #              , [word_quid_map[q.quid][0] for q in [qq for (qq, _) in prelim_licious]] \
@@ -145,9 +126,8 @@ if __name__ == "__main__":
     # plt.savefig("correlation1", dpi=100, pad_inches=0.5)
 
     # remove repeaters
-    workers = [r['WorkerId'] for r in responses]
-    unique_workers = [r['WorkerId'] for r in responses if len([s for s in workers if s == r['WorkerId']])==1]
-    responses = [r for r in responses if r['WorkerId'] in unique_workers]
+    m = m.take(RespondentIndex(m).dedup("unique"))
+    responses = responses_from_matrix(m)
     print("Total number of unique native English speaking respondents:", len(responses))
         
     print("Entropy before removing bots:", evaluation.entropy(survey,[r['Answers'] for r in responses]))
@@ -240,11 +220,10 @@ if __name__ == "__main__":
 
     #breakoff analysis
     #bad_pos, bad_q = evaluation.identify_breakoff_questions(survey, [{ q.quid : (o.oid, a, b) for (q, (o, a, b)) in response.items() } for response in responses], 0.05)
-    bad_pos, bad_q = evaluation.identify_breakoff_questions(survey, responses, 0.05)
-    bad_qs = [ q for q in survey.questions if q.quid in [bq['question'] for bq in bad_q]]
+    bad_pos, bad_q = evaluation.identify_breakoff_questions(survey, [r for (r, _) in responses], 0.05)
     print "Position (Length) & Count\\ \hline\\"
     for (k,v) in sorted(bad_pos.items(), key = lambda tupe : tupe[1]):
-        print "%s&%d\\" % (str(word_quid_map[k.quid]), text, v)
-    print "\hline\\\nQuestion & Count\\ \hline\\"
-    for (k,v) in sorted(bad_q.items(), key = lambda tupe : tupe[1]):
-        print "%s&%d\\" % (str(word_quid_map[k.quid]), text, v)
+        print "%d&%d\\" % (k, v)
+    print "\hline\\\nQuestion & Count & Lift\\ \hline\\"
+    for bq in bad_q:
+        print "%s&%d&%f\\" % (str(word_quid_map.get(bq['question'], bq['question'])), bq['count'], bq['score'])
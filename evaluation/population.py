@@ -0,0 +1,113 @@
+import math
+import numpy as np
+from matrix import ResponseMatrix, option_layout
+
+# simulated populations of bots and profiled humans, drawn in a few
+# vectorized steps straight into ResponseMatrix form
+#
+# a profile gives, for every question, a preferred option and the
+# probability of choosing it; otherwise one of the question's other options
+# is chosen uniformly. bots choose uniformly among all options.
+
+
+def get_rng(seed=None):
+    """Returns a RandomState, passing through one that is given, seeding a new one otherwise"""
+    if isinstance(seed, np.random.RandomState):
+        return seed
+    return np.random.RandomState(seed)
+
+
+class Profiles:
+    """
+    n profiles of respondents to a survey, as (profiles, questions) arrays: preferred holds the index of each
+    profile's preferred option for each question, and prob the probability of choosing it.
+    """
+
+    def __init__(self, survey, preferred, prob):
+        self.survey = survey
+        self.preferred = np.asarray(preferred, dtype=np.int32)
+        self.prob = np.asarray(prob, dtype=float)
+        assert(self.preferred.shape == self.prob.shape)
+
+    def __len__(self):
+        return len(self.preferred)
+
+    @classmethod
+    def random(cls, survey, n, rng=None):
+        """
+        Draws n profiles. A profile prefers a uniformly chosen option of each question, with a probability uniform in
+        (1/m, 1), where m is the number of options.
+        """
+        rng = get_rng(rng)
+        (option_counts, _, _) = option_layout(survey.questions)
+        preferred = np.floor(rng.random_sample((n, len(option_counts))) * option_counts).astype(np.int32)
+        equal_prob = 1.0 / option_counts
+        prob = equal_prob + rng.random_sample((n, len(option_counts))) * (1 - equal_prob)
+        return cls(survey, preferred, prob)
+
+    @classmethod
+    def from_dicts(cls, survey, profile_list):
+        """Converts profiles made by simulation.profile, dicts mapping quids to (oid, prob)"""
+        preferred = np.zeros((len(profile_list), len(survey.questions)), dtype=np.int32)
+        prob = np.zeros(preferred.shape)
+        for (j, q) in enumerate(survey.questions):
+            oindex = dict((o.oid, k) for (k, o) in enumerate(q.options))
+            for (i, profile) in enumerate(profile_list):
+                (oid, p) = profile[q.quid]
+                preferred[i, j] = oindex[oid]
+                prob[i, j] = p
+        return cls(survey, preferred, prob)
+
+    def to_dicts(self):
+        """Converts to the dict profiles of simulation.profile"""
+        qs = self.survey.questions
+        return [dict((q.quid, (q.options[pref[j]].oid, p[j])) for (j, q) in enumerate(qs))
+                for (pref, p) in zip(self.preferred.tolist(), self.prob.tolist())]
+
+
+def __matrix(survey, answers):
+    # questions and options are presented in survey order, so each option is
+    # shown at its own index; opos gets its own array all the same, so that
+    # edits to one do not show up in the other
+    qpos = np.empty_like(answers)
+    qpos[:] = np.arange(answers.shape[1], dtype=np.int32)
+    return ResponseMatrix(survey, answers, qpos, answers.copy())
+
+
+def sample_bots(survey, n, rng=None):
+    """Returns a ResponseMatrix of n bots answering every question uniformly at random"""
+    rng = get_rng(rng)
+    (option_counts, _, _) = option_layout(survey.questions)
+    answers = np.floor(rng.random_sample((n, len(option_counts))) * option_counts).astype(np.int32)
+    return __matrix(survey, answers)
+
+
+def sample_humans(profiles, n, rng=None):
+    """
+    Returns a ResponseMatrix of n humans, each following a profile drawn uniformly, with repeats, from profiles.
+    """
+    rng = get_rng(rng)
+    (option_counts, _, _) = option_layout(profiles.survey.questions)
+    who = rng.randint(0, len(profiles), n)
+    preferred = profiles.preferred[who]
+    shape = preferred.shape
+    # an index among the other options, shifted past the preferred one
+    other = np.floor(rng.random_sample(shape) * (option_counts - 1)).astype(np.int32)
+    other += other >= preferred
+    answers = np.where(rng.random_sample(shape) < profiles.prob[who], preferred, other).astype(np.int32)
+    return __matrix(profiles.survey, answers)
+
+
+def sample(profiles, size, percent_bots, rng=None):
+    """
+    Simulates a population of size respondents, of which floor(size * percent_bots) are bots.
+
+    :param profiles: Profiles of the humans
+    :param size: The number of respondents
+    :param percent_bots: The fraction of bots
+    :param rng: A RandomState or seed
+    :return: (bots, humans) ResponseMatrix pair
+    """
+    rng = get_rng(rng)
+    num_bots = int(math.floor(size * percent_bots))
+    return (sample_bots(profiles.survey, num_bots, rng), sample_humans(profiles, size - num_bots, rng))
@@ -0,0 +1,117 @@
+import numpy as np
+from matrix import MISSING
+
+# lookups from workers and assignments to the rows of a ResponseMatrix, and
+# row filters that run in time linear in the number of respondents
+
+policies = ["first", "last", "unique"]
+
+
+class RespondentIndex:
+    """
+    Groups the rows of a ResponseMatrix by WorkerId and by AssignmentId. Each worker is numbered in order of first
+    appearance; worker_codes holds the number of every row's worker. The rows of worker w are
+    ``worker_rows[worker_ptr[w]:worker_ptr[w+1]]``, in row order.
+    """
+
+    def __init__(self, m):
+        assert(m.worker_ids is not None)
+        self.matrix = m
+        codes = {}
+        self.worker_codes = np.fromiter((codes.setdefault(w, len(codes)) for w in m.worker_ids), dtype=np.int64,
+                                        count=len(m))
+        self.workers = [None] * len(codes)
+        for (w, code) in codes.items():
+            self.workers[code] = w
+        self.__worker_lookup = codes
+        self.worker_counts = np.bincount(self.worker_codes, minlength=len(codes))
+        self.worker_ptr = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(self.worker_counts, out=self.worker_ptr[1:])
+        self.worker_rows = np.argsort(self.worker_codes, kind="mergesort")
+        self.__assignment_lookup = None
+
+    def num_workers(self):
+        return len(self.workers)
+
+    def rows_for_worker(self, worker_id):
+        """Returns the rows of a worker's responses, in row order; empty for an unknown worker"""
+        code = self.__worker_lookup.get(worker_id)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.worker_rows[self.worker_ptr[code]:self.worker_ptr[code + 1]]
+
+    def rows_for_assignment(self, assignment_id):
+        """Returns the rows of an assignment's responses; empty for an unknown assignment"""
+        if self.__assignment_lookup is None:
+            assert(self.matrix.assignment_ids is not None)
+            lookup = {}
+            for (row, a) in enumerate(self.matrix.assignment_ids):
+                lookup.setdefault(a, []).append(row)
+            self.__assignment_lookup = lookup
+        return np.array(self.__assignment_lookup.get(assignment_id, []), dtype=np.int64)
+
+    def repeats(self):
+        """Returns a boolean mask of the rows whose worker has more than one response"""
+        return self.worker_counts[self.worker_codes] > 1
+
+    def dedup(self, policy="first"):
+        """
+        Returns a boolean mask over rows keeping at most one response per worker.
+
+        :param policy: "first" keeps each worker's first response, "last" their last, and "unique" drops every
+            response of workers who responded more than once
+        :return: A boolean array over rows
+        """
+        if policy == "unique":
+            return ~self.repeats()
+        if policy not in policies:
+            raise ValueError("Unknown dedup policy %s; expected one of %s" % (policy, policies))
+        n = len(self.worker_codes)
+        rows = np.arange(n)
+        keep = np.full(self.num_workers(), n if policy == "first" else -1, dtype=np.int64)
+        (np.minimum if policy == "first" else np.maximum).at(keep, self.worker_codes, rows)
+        mask = np.zeros(n, dtype=bool)
+        mask[keep] = True
+        return mask
+
+
+def __question_index(m, question):
+    if isinstance(question, (int, long, np.integer)):
+        return int(question)
+    for (i, q) in enumerate(m.questions):
+        if q is question or q.quid == question:
+            return i
+    raise KeyError(question)
+
+
+def __option_index(q, option):
+    if isinstance(option, (int, long, np.integer)):
+        return int(option)
+    for (j, o) in enumerate(q.options):
+        if o is option or o.oid == option:
+            return j
+    raise KeyError(option)
+
+
+def answer_mask(m, question, options):
+    """
+    Returns a boolean mask of the rows that answered question with one of options.
+
+    :param m: A ResponseMatrix
+    :param question: A question, quid, or question index
+    :param options: A list of options, oids, or option indices of the question
+    :return: A boolean array over rows
+    """
+    i = __question_index(m, question)
+    allowed = np.zeros(len(m.questions[i].options), dtype=bool)
+    allowed[[__option_index(m.questions[i], o) for o in options]] = True
+    answers = m.answers[:, i]
+    mask = np.zeros(len(m), dtype=bool)
+    answered = answers != MISSING
+    mask[answered] = allowed[answers[answered]]
+    return mask
+
+
+def answered_mask(m, question):
+    """Returns a boolean mask of the rows that answered question"""
+    return m.answers[:, __question_index(m, question)] != MISSING
@@ -1,3 +1,9 @@
+import math, random
+import numpy as np
+from evaluation import *
+import population
+from population import Profiles
+
 def profile(s):
     """ Takes in a survey and returns a profile of a respondent. A profile of a respondent is a map of questions to preferred answer. A respondent with this profile will answer the given question with some probability in the range (1/m, 1), where m is the number of options. The respondent will choose any of the other responses with equal probability."""
     preferences = {}
@@ -8,45 +14,23 @@ def profile(s):
         preferences[q.quid] = (preference.oid , prob)
     return preferences
 
-def make_profiles(s, n):
-    return [profile(s) for _ in range(n)]
+def make_profiles(s, n, rng=None):
+    """ Returns n profiles, drawn together; see population.Profiles.random"""
+    return Profiles.random(s, n, rng).to_dicts()
 
-def sample(s, profile_list, size, percent_bots):
-    num_bots = int(math.floor(size * percent_bots))
-    num_people = size - num_bots
-    bot_responses = []
-    not_responses = []
-    for _ in range(num_bots):
-        bot_responses.append({q.quid : np.random.choice(q.options, 1, replace=True)[0].oid for q in s.questions})
-    for _ in range(num_people):
-        # sample from the profile list ; profiles can have repeats
-        profile = np.random.choice(profile_list, 1, replace=True)[0]
-        response = {}
-        for q in s.questions:
-            # see if we should grab the preferred response
-            (oid, likelihood) = profile[q.quid]
-            if random.random() < likelihood:
-                response[q.quid] = oid
-            else:
-                # randomly sample from the remaining options
-                other_opts = [o for o in q.options if o.oid != oid]
-                response[q.quid] = np.random.choice(other_opts, 1, replace=True)[0].oid
-        not_responses.append(response)
-    return (bot_responses, not_responses)
+def sample(s, profile_list, size, percent_bots, rng=None):
+    """ Simulates size respondents, floor(size * percent_bots) of them bots.
+    profile_list is a population.Profiles, or a list of profiles as made by
+    profile. Returns a (bots, nots) pair of ResponseMatrix objects."""
+    if not isinstance(profile_list, Profiles):
+        profile_list = Profiles.from_dicts(s, profile_list)
+    return population.sample(profile_list, size, percent_bots, rng)
 
 def emma_classify(survey, bots, nots, delta, diff):
-    lpo = get_least_popular_options(survey, bots+nots, diff)
-    mu = get_mu(survey, lpo)
-    alpha = pow(math.e, (- delta * mu) / (2 + delta))
-    print("Expect %f least popular answers for a bot; bots will answer fewer than this with probability %f" % (mu, alpha))
-    classifications = []
-    for response in bots:
-        n = num_least_popular(response, lpo)
-        classifications.append((True, n >= round(mu), n))
-    for response in nots:
-        n = num_least_popular(response, lpo)
-        classifications.append((False, n >= round(mu), n))
-    return classifications
+    m = ResponseMatrix.concatenate(survey, [as_matrix(survey, bots), as_matrix(survey, nots)])
+    mu, _, counts = least_popular_classify(survey, m, delta, diff)
+    isbot = [True] * len(bots) + [False] * len(nots)
+    return [(b, n >= round(mu), n) for (b, n) in zip(isbot, counts.tolist())]
 
 def emery_classify(survey, bots, nots, delta):
     pass
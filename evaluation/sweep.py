@@ -0,0 +1,134 @@
+import hashlib, itertools, json, multiprocessing, os
+import numpy as np
+import bootstrap
+import population
+from objects import *
+from simulation import analyze_classifications
+
+# parameter sweeps for the bot detection experiments
+#
+# a sweep runs a number of simulated trials for every cell of a parameter
+# grid. each cell is seeded from the sweep's seed and the cell itself, so
+# cells can run in any order, in any process, and still give the same
+# results. only the false negative and false positive rates of each trial are
+# kept, and every finished cell is written to its own checkpoint file, so a
+# sweep that is interrupted picks up at the first unfinished cell.
+
+# cell parameters used to simulate a population; the others are passed to the
+# classifier
+simulation_params = ["questions", "options", "clusters", "size", "percent_bots"]
+
+
+def grid(**axes):
+    """ returns the cells of the grid spanned by the lists of values in axes,
+    as a list of dicts"""
+    names = sorted(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*[axes[name] for name in names])]
+
+def cell_key(cell, classify, trials, seed):
+    """ returns a name identifying a cell's results"""
+    spec = {"cell": cell, "classify": "%s.%s" % (classify.__module__, classify.__name__), "trials": trials,
+            "seed": seed}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True)).hexdigest()
+
+def flat_survey(questions, options):
+    return Survey([Question("", [Option("") for _ in range(options)], qtypes["radio"], shuffle=True)
+                   for _ in range(questions)])
+
+def bot_trial(cell, classify, seed):
+    """ simulates the population of a cell and classifies it, returning the
+    (false negative, false positive) rates. classify is called as
+    classify(survey, bots, nots, **params) with the cell's parameters that are
+    not in simulation_params."""
+    rng = np.random.RandomState(seed)
+    s = flat_survey(cell["questions"], cell["options"])
+    profiles = population.Profiles.random(s, cell["clusters"], rng)
+    bots, nots = population.sample(profiles, cell["size"], cell["percent_bots"], rng)
+    params = {k: v for (k, v) in cell.items() if k not in simulation_params}
+    (false_negatives, false_positives) = analyze_classifications(classify(s, bots, nots, **params))
+    return (float(false_negatives) / len(bots) if len(bots) else 0.0,
+            float(false_positives) / len(nots) if len(nots) else 0.0)
+
+def run_cell(args):
+    """ runs every trial of a cell, returning (key, list of rates)"""
+    (key, cell, classify, trials, seed) = args
+    cell_seed = int(hashlib.sha256("%d:%s" % (seed, key)).hexdigest(), 16)
+    return (key, [bot_trial(cell, classify, s) for s in bootstrap.spawn(cell_seed, trials)])
+
+def __checkpoint(directory, key):
+    return os.path.join(directory, key + ".json")
+
+def __write_checkpoint(directory, key, cell, results):
+    filename = __checkpoint(directory, key)
+    with open(filename + ".tmp", "w") as f:
+        json.dump({"cell": cell, "results": results}, f)
+    # rename is atomic, so a checkpoint is never seen half written
+    os.rename(filename + ".tmp", filename)
+
+def __read_checkpoint(directory, key):
+    filename = __checkpoint(directory, key)
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as f:
+        return [tuple(r) for r in json.load(f)["results"]]
+
+def run(cells, classify, trials=100, seed=0, directory=None, processes=1):
+    """
+    Runs trials for every cell of a sweep.
+
+    :param cells: A list of parameter dicts, e.g. from grid; each needs the keys in simulation_params
+    :param classify: A module level function called as classify(survey, bots, nots, **params), returning a list of
+        (isbot, classified_as_bot, ...) tuples, as simulation.emma_classify does
+    :param trials: The number of trials per cell
+    :param seed: An int; the trials of a cell are seeded from it and the cell
+    :param directory: Optional directory of checkpoint files; cells found there are not run again
+    :param processes: The number of worker processes; below 1 means one per CPU
+    :return: A list of (cell, results) pairs in the order of cells, where results is a list of (false negative rate,
+        false positive rate) pairs, one per trial
+    """
+    keys = [cell_key(cell, classify, trials, seed) for cell in cells]
+    done = {}
+    if directory is not None:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        for key in keys:
+            results = __read_checkpoint(directory, key)
+            if results is not None:
+                done[key] = results
+    todo = [(key, cell, classify, trials, seed) for (key, cell) in zip(keys, cells) if key not in done]
+    processes = bootstrap.get_n_jobs(processes)
+    pool = multiprocessing.Pool(processes) if processes > 1 and len(todo) > 1 else None
+    try:
+        finished = pool.imap_unordered(run_cell, todo) if pool else itertools.imap(run_cell, todo)
+        cells_by_key = dict(zip(keys, cells))
+        for (key, results) in finished:
+            done[key] = results
+            if directory is not None:
+                __write_checkpoint(directory, key, cells_by_key[key], results)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return [(cell, done[key]) for (key, cell) in zip(keys, cells)]
+
+def table(results, x="percent_bots", **fixed):
+    """
+    Arranges sweep results for evaluation.make_plot: one list per value of the parameter x, in increasing order, of
+    (false negative rate, false positive rate, x) tuples over the trials of every cell with that value. Only cells whose
+    parameters match those in fixed are included.
+    """
+    by_x = {}
+    for (cell, rs) in results:
+        if all(cell[k] == v for (k, v) in fixed.items()):
+            by_x.setdefault(cell[x], []).extend((fn, fp, cell[x]) for (fn, fp) in rs)
+    return [by_x[v] for v in sorted(by_x)]
+
+if __name__ == "__main__":
+    import sys
+    from simulation import emma_classify
+    from evaluation import make_plot
+    directory = sys.argv[1] if len(sys.argv) > 1 else "sweep"
+    cells = grid(questions=[10], options=[5], clusters=[1], size=[100], percent_bots=[i / 10.0 for i in range(1, 10)],
+                 delta=[1.0], diff=[0.75])
+    results = run(cells, emma_classify, 100, 0, directory, 0)
+    make_plot(table(results, clusters=1), "Bots answer >= expected min questions", "balls_n_bins_1_cluster.png")
@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from fixtures import flat_survey, random_responses, frequency, empirical_prob, entropy
+from matrix import ResponseMatrix
+from aggregate import FrequencyAggregator
+
+
+# the dict based code least_popular replaced
+
+def get_least_popular_options(fmap, diff):
+    least_popular = {}
+    for q in list(fmap.keys()):
+        optfreqs = sorted(list(fmap[q].items()), key = lambda t : t[1])
+        for (i, j) in [(k, k+1) for k in range(len(optfreqs)-1)]:
+            if optfreqs[i][1] < optfreqs[j][1]*diff:
+                least_popular[q] = optfreqs[:j]
+                break
+    return least_popular
+
+
+class FrequencyAggregatorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.survey = flat_survey([2, 3, 4, 5])
+        self.responses = random_responses(self.survey, 200, np.random.RandomState(1))
+        self.fmap = frequency(self.survey, self.responses)
+
+    def test_matches_dicts(self):
+        agg = FrequencyAggregator(self.survey).update(self.responses)
+        self.assertEqual(agg.to_map(), self.fmap)
+        pmap = empirical_prob(self.fmap)
+        probs = agg.to_map(agg.probabilities())
+        for q in self.survey.questions:
+            for o in q.options:
+                self.assertAlmostEqual(probs[q][o], pmap[q][o])
+        self.assertAlmostEqual(agg.entropy(), entropy(pmap))
+
+    def test_least_popular(self):
+        agg = FrequencyAggregator(self.survey).update(self.responses)
+        for diff in [0.5, 0.75, 0.9, 1.0]:
+            expected = get_least_popular_options(self.fmap, diff)
+            found = agg.least_popular(diff)
+            self.assertEqual(set(found), set(expected))
+            for q in expected:
+                self.assertEqual(sorted(found[q]), sorted(expected[q]))
+
+    def test_chunks_and_merges(self):
+        whole = FrequencyAggregator(self.survey).update(self.responses)
+        m = ResponseMatrix.from_responses(self.survey, self.responses)
+        a = FrequencyAggregator(self.survey).update(m.take(np.arange(0, 120)))
+        b = FrequencyAggregator(self.survey).update(self.responses[120:])
+        self.assertEqual((a + b).to_map(), whole.to_map())
+        a += b
+        self.assertEqual(a.frequencies().tolist(), whole.frequencies().tolist())
+        self.assertEqual(a.num_respondents, 200)
+        self.assertEqual(whole.frequencies().tolist(), m.frequencies().tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import bootstrap
+
+
+def median(samples, axis=None):
+    return np.median(samples, axis=axis)
+
+
+class BootstrapTests(unittest.TestCase):
+
+    def setUp(self):
+        self.values = np.random.RandomState(0).normal(3.0, 1.0, 300)
+
+    def test_reproducible(self):
+        a = bootstrap.interval(self.values, 0.05, b=500, rng=7)
+        self.assertEqual(a, bootstrap.interval(self.values, 0.05, b=500, rng=7))
+        self.assertEqual(a, bootstrap.interval(self.values, 0.05, b=500, rng=7, chunk=1000))
+        self.assertEqual(a, bootstrap.interval(self.values, 0.05, b=500, rng=7, n_jobs=2))
+        self.assertNotEqual(a, bootstrap.interval(self.values, 0.05, b=500, rng=8))
+        b = bootstrap.interval(self.values, 0.05, b=500, rng=np.random.RandomState(3))
+        self.assertEqual(b, bootstrap.interval(self.values, 0.05, b=500, rng=np.random.RandomState(3)))
+
+    def test_interval(self):
+        (lo, hi) = bootstrap.interval(self.values, 0.05, b=1000, rng=1)
+        self.assertLess(lo, np.average(self.values))
+        self.assertGreater(hi, np.average(self.values))
+        (nlo, nhi) = bootstrap.interval(self.values, 0.05, normal=True, b=1000, rng=1)
+        self.assertAlmostEqual(nlo, lo, delta=0.05)
+        self.assertAlmostEqual(nhi, hi, delta=0.05)
+        (mlo, mhi) = bootstrap.interval(self.values, 0.05, stat=median, b=1000, rng=1)
+        self.assertLess(mlo, np.median(self.values))
+        self.assertGreater(mhi, np.median(self.values))
+
+    def test_processes(self):
+        a = bootstrap.resample(self.values, 600, rng=7)
+        self.assertTrue(np.array_equal(a, bootstrap.resample(self.values, 600, rng=7, n_jobs=2)))
+        self.assertTrue(np.array_equal(a, bootstrap.resample(self.values, 600, rng=7, n_jobs=0)))
+        self.assertEqual(bootstrap.interval(self.values, 0.05, stat=median, b=500, rng=1),
+                         bootstrap.interval(self.values, 0.05, stat=median, b=500, rng=1, n_jobs=2))
+
+    def test_resample(self):
+        stats = bootstrap.resample(self.values, 600, rng=2)
+        self.assertEqual(len(stats), 600)
+        # blocks come from their own streams, so fewer resamples are a prefix
+        self.assertTrue(np.array_equal(bootstrap.resample(self.values, 250, rng=2), stats[:250]))
+        self.assertRaises(ValueError, bootstrap.resample, [], 10)
+
+    def test_spawn(self):
+        seeds = bootstrap.spawn(5, 4)
+        self.assertEqual([s.tolist() for s in bootstrap.spawn(5, 2)], [s.tolist() for s in seeds[:2]])
+        self.assertEqual(len(set(tuple(s) for s in seeds)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
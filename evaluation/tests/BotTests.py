@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from fixtures import flat_survey
+from matrix import ResponseMatrix
+from aggregate import FrequencyAggregator
+import bots
+
+
+class BotTests(unittest.TestCase):
+
+    def setUp(self):
+        self.survey = flat_survey([4] * 12)
+        self.long_survey = flat_survey([4] * 40)
+
+    def test_least_popular(self):
+        # everyone but the last two respondents chooses option 0 or 1
+        answers = np.vstack([np.tile([[0] * 12, [1] * 12], (10, 1)), [[2] * 12, [3] * 12]])
+        m = ResponseMatrix(self.survey, answers.astype(np.int32))
+        mask = FrequencyAggregator(self.survey).update(m).least_popular_mask(0.5)
+        self.assertEqual(bots.least_popular_counts(m, mask).tolist(), [0] * 20 + [12, 12])
+        self.assertAlmostEqual(bots.least_popular_mu(m, mask), 12 * 0.5)
+
+    def test_ordered_positions(self):
+        rng = np.random.RandomState(4)
+        opos = rng.randint(0, 4, (30, 40)).astype(np.int32)
+        # the first respondent always chooses the first option shown
+        opos[0] = 0
+        m = ResponseMatrix(self.long_survey, opos, np.tile(np.arange(40, dtype=np.int32), (30, 1)), opos)
+        self.assertEqual(bots.stages(m)[0][0], 4)
+        reported = []
+        flagged = bots.ordered_position_bots(m, 0.05, lambda row, details: reported.append((row, details)))
+        self.assertTrue(flagged[0])
+        self.assertLess(flagged.sum(), 5)
+        self.assertEqual(reported[0][0], 0)
+        self.assertEqual(reported[0][1]['total'], 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from scipy.stats import beta, poisson
+from fixtures import flat_survey
+from matrix import ResponseMatrix, MISSING
+import breakoff
+
+_ = MISSING
+
+
+class BreakoffTests(unittest.TestCase):
+
+    def setUp(self):
+        # respondents stop at positions 2, 1, 0 and 2; the last answered nothing
+        qpos = [[0, 1, 2],
+                [1, 0, _],
+                [_, _, 0],
+                [0, 2, 1],
+                [_, _, _]]
+        answers = [[0 if p != MISSING else MISSING for p in row] for row in qpos]
+        self.m = ResponseMatrix(flat_survey([2, 2, 2]), answers, qpos, answers)
+
+    def test_last_answered(self):
+        (position, question) = breakoff.last_answered(self.m)
+        self.assertEqual(position.tolist(), [2, 1, 0, 2, MISSING])
+        self.assertEqual(question.tolist(), [2, 0, 2, 1, MISSING])
+
+    def test_by_position(self):
+        p = breakoff.by_position(self.m)
+        self.assertEqual(p.counts.tolist(), [1, 1, 2])
+        self.assertEqual(p.reached.tolist(), [4, 3, 2])
+        self.assertTrue(np.allclose(p.hazard, [0.25, 1 / 3.0, 1.0]))
+        self.assertAlmostEqual(p.low[0], beta.ppf(0.025, 1, 4))
+        self.assertAlmostEqual(p.high[0], beta.ppf(0.975, 2, 3))
+        self.assertEqual(p.high[2], 1.0)
+
+    def test_by_question(self):
+        q = breakoff.by_question(self.m)
+        self.assertEqual(q.counts.tolist(), [1, 1, 2])
+        self.assertEqual(q.answered.tolist(), [3, 3, 3])
+        # the hazards at the positions each question was shown at
+        expected = [0.25 + 1 / 3.0 + 0.25, 1 / 3.0 + 0.25 + 1.0, 1.0 + 0.25 + 1 / 3.0]
+        self.assertTrue(np.allclose(q.expected, expected))
+        self.assertTrue(np.allclose(q.lift, np.array([1, 1, 2]) / np.array(expected)))
+        self.assertTrue(np.allclose(q.pvalue, poisson.sf(np.array([0, 0, 1]), expected)))
+        self.assertAlmostEqual(q.low[2], beta.ppf(0.025, 2, 2))
+        self.assertEqual(breakoff.rank(q).tolist(), [2, 0, 1])
+
+    def test_bootstrap(self):
+        a = breakoff.by_position(self.m, method="bootstrap", B=200, rng=1)
+        b = breakoff.by_position(self.m, method="bootstrap", B=200, rng=1)
+        self.assertTrue(np.allclose(a.low, b.low) and np.allclose(a.high, b.high))
+        self.assertTrue((a.low <= a.hazard).all() and (a.hazard <= a.high).all())
+        q = breakoff.by_question(self.m, method="bootstrap", B=200, rng=1)
+        self.assertTrue(np.allclose(q.low, breakoff.by_question(self.m, method="bootstrap", B=200, rng=1).low))
+        self.assertRaises(ValueError, breakoff.by_position, self.m, method="wald")
+
+    def test_empty(self):
+        m = ResponseMatrix(flat_survey([2, 2]), np.zeros((0, 2), dtype=np.int32))
+        p = breakoff.by_position(m)
+        self.assertEqual(p.counts.tolist(), [0, 0])
+        self.assertTrue(np.isnan(p.low).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os, time
+import unittest
+from LoadTests import HitFileTests
+import cache
+
+
+class CacheTests(HitFileTests):
+
+    def test_cache(self):
+        directory = os.path.join(self.directory, "cache")
+        source = os.path.join(self.directory, "survey.csv")
+        survey = cache.load_survey(source, directory)
+        self.assertEqual(cache.load_survey(source, directory).cache_key, survey.cache_key)
+        fresh = list(cache.stream_from_dir(self.hits, survey, True, directory, 2, 10))
+        self.assertEqual([len(m) for m in fresh], [10, 10, 3, 10, 10, 4, 10, 10, 5])
+        cached = list(cache.stream_from_dir(self.hits, survey, True, directory, 1, 10))
+        for (a, b) in zip(fresh, cached):
+            self.assertEqual(a.answers.tolist(), b.answers.tolist())
+            self.assertEqual((a.worker_ids, a.times), (b.worker_ids, b.times))
+        self.check(cache.load_matrix(self.hits, survey, True, directory), sum(self.expected, []))
+        # a changed file is parsed again; an abandoned stream caches nothing
+        later = time.time() + 10
+        os.utime(os.path.join(self.hits, "r1.csv"), (later, later))
+        stream = cache.stream_from_dir(self.hits, survey, True, directory, 1, 10)
+        for _ in range(4):
+            next(stream)
+        stream.close()
+        entries = sum(len(dirs) for (_, dirs, _) in os.walk(directory))
+        self.check(cache.load_matrix(self.hits, survey, True, directory, chunk_size=10), sum(self.expected, []))
+        self.assertEqual(sum(len(dirs) for (_, dirs, _) in os.walk(directory)), entries + 4)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from scipy.stats import spearmanr, kendalltau
+from fixtures import flat_survey
+from matrix import ResponseMatrix, MISSING
+import correlation
+
+
+def coding(q, o):
+    return q.options.index(o)
+
+
+class CorrelationTests(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.survey = flat_survey([4, 4, 5, 3, 6])
+        n = 120
+        base = rng.randint(0, 3, n)
+        answers = np.column_stack([np.minimum(base + rng.randint(0, 2, n), len(q.options) - 1)
+                                   for q in self.survey.questions]).astype(np.int32)
+        answers[rng.random_sample(answers.shape) < 0.15] = MISSING
+        self.m = ResponseMatrix(self.survey, answers)
+
+    def compare(self, method, scipy_method):
+        c = correlation.correlation_matrix(self.m, coding, method=method)
+        coded = correlation.coded_matrix(self.m, coding)
+        for i in range(len(c.questions)):
+            for j in range(len(c.questions)):
+                if i == j:
+                    continue
+                both = ~np.isnan(coded[:, i]) & ~np.isnan(coded[:, j])
+                (rho, pvalue) = scipy_method(coded[both, i], coded[both, j])
+                self.assertEqual(c.n[i, j], both.sum())
+                self.assertAlmostEqual(c.rho[i, j], rho)
+                self.assertAlmostEqual(c.pvalue[i, j], pvalue)
+
+    def test_spearman(self):
+        self.compare("spearman", spearmanr)
+
+    def test_kendall(self):
+        self.compare("kendall", kendalltau)
+
+    def test_subset_and_uncoded(self):
+        skip_last = lambda q, o: None if o is q.options[-1] else coding(q, o)
+        c = correlation.correlation_matrix(self.m, skip_last, questions=[1, 3])
+        coded = correlation.coded_matrix(self.m, skip_last, [1, 3])
+        both = ~np.isnan(coded).any(axis=1)
+        self.assertEqual(c.n[0, 1], both.sum())
+        self.assertAlmostEqual(c.rho[0, 1], spearmanr(coded[both, 0], coded[both, 1])[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
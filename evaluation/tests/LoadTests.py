@@ -0,0 +1,129 @@
+import csv, os, shutil, tempfile
+import unittest
+import numpy as np
+from fixtures import write_survey_csv
+from matrix import MISSING
+import loadHITs
+import surveyman.examples.example_survey as example
+import surveyman.survey.simulator as simulator
+
+
+class HitFileTests(unittest.TestCase):
+    """ writes a survey and a directory of results csvs, remembering the
+    answers written"""
+
+    option_counts = [2, 3, 4]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        source = os.path.join(self.directory, "survey.csv")
+        write_survey_csv(source, self.option_counts)
+        self.survey = loadHITs.get_survey(source)
+        self.hits = os.path.join(self.directory, "hits")
+        os.mkdir(self.hits)
+        rng = np.random.RandomState(0)
+        # (answers, qpos, opos) per respondent, by file
+        self.expected = []
+        for f in range(3):
+            rows = []
+            with open(os.path.join(self.hits, "r%d.csv" % f), "w") as fp:
+                writer = csv.writer(fp)
+                writer.writerow(loadHITs.universal_headers + ["Answer.q%d" % i for i in range(3)] + ["time"])
+                for r in range(23 + f):
+                    # some HIT titles span lines
+                    title = 'a "quoted"\nmultiline title' if r % 3 == 0 else "title"
+                    row = ["hit", title, "", "A%d_%d" % (f, r), "W%d" % (r % 7), "Submitted", "", ""]
+                    answers, qpos, opos = [], [], []
+                    for (i, q) in enumerate(self.survey.questions):
+                        if rng.random_sample() < 0.2:
+                            row.append("")
+                            answers.append(MISSING), qpos.append(MISSING), opos.append(MISSING)
+                            continue
+                        j = rng.randint(len(q.options))
+                        (source_row, column) = q.options[j].sourceCellId
+                        row.append(repr({'oid': "comp_%d_%d" % (source_row, column), 'qpos': i, 'opos': 2 - i}))
+                        answers.append(j), qpos.append(i), opos.append(2 - i)
+                    row.append("%d.5" % r)
+                    writer.writerow(row)
+                    rows.append((answers, qpos, opos))
+            self.expected.append(rows)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, True)
+
+    def check(self, m, rows):
+        self.assertEqual(m.answers.tolist(), [a for (a, _, _) in rows])
+        self.assertEqual(m.qpos.tolist(), [q for (_, q, _) in rows])
+        self.assertEqual(m.opos.tolist(), [o for (_, _, o) in rows])
+
+
+class LoadTests(HitFileTests):
+
+    def test_parse_answer(self):
+        self.assertEqual(loadHITs.parse_answer("{'oid': 'comp_3_2', 'qpos': 1, 'opos': 0}", True), (3, 1, 0))
+        self.assertEqual(loadHITs.parse_answer('{"opos": "2", "qpos": 4, "oid": "comp_5_2"}', True), (5, 4, 2))
+        self.assertEqual(loadHITs.parse_answer("comp_3_2;1;0"), (3, 1, 0))
+        self.assertEqual(loadHITs.parse_answer("3.5", True), 3.5)
+        self.assertIsNone(loadHITs.parse_answer("__import__('os')", True))
+        self.assertIsNone(loadHITs.parse_answer("comp_x;1;0"))
+
+    def test_read_files(self):
+        files = loadHITs.hit_files(self.hits)
+        self.assertEqual([len(loadHITs.chunk_offsets(f, 5)) for f in files], [5, 5, 5])
+        serial = list(loadHITs.read_files(files, self.survey, True, chunk_size=5))
+        parallel = list(loadHITs.read_files(files, self.survey, True, chunk_size=5, processes=2))
+        self.assertEqual([f for (f, _) in serial], [f for (f, _) in parallel])
+        self.assertEqual([len(m) for (_, m) in serial], [5, 5, 5, 5, 3, 5, 5, 5, 5, 4, 5, 5, 5, 5, 5])
+        for ((_, a), (_, b)) in zip(serial, parallel):
+            self.assertEqual(a.answers.tolist(), b.answers.tolist())
+            self.assertEqual((a.assignment_ids, a.times), (b.assignment_ids, b.times))
+        m = loadHITs.load_matrix(self.hits, self.survey, True, chunk_size=5, processes=2)
+        self.check(m, sum(self.expected, []))
+        self.assertEqual(m.worker_ids[:8], ["W0", "W1", "W2", "W3", "W4", "W5", "W6", "W0"])
+        self.assertEqual(m.times[:2], [[0.5], [1.5]])
+
+    def test_load_from_dir(self):
+        (responses, times) = loadHITs.load_from_dir(self.hits, self.survey, True)
+        self.assertEqual(len(responses), 72)
+        self.assertEqual(responses[1]['AssignmentId'], "A0_1")
+        (answers, qpos, opos) = self.expected[0][1]
+        for (i, q) in enumerate(self.survey.questions):
+            if answers[i] == MISSING:
+                self.assertNotIn(q, responses[1]['Answers'])
+            else:
+                self.assertEqual(responses[1]['Answers'][q], (q.options[answers[i]], qpos[i], opos[i]))
+
+
+class SimulatedHitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, True)
+
+    def test_round_trip(self):
+        compiled = example.create_survey().compile()
+        models = [(0.7, simulator.Respondent(breakoff=0.05)), (0.3, simulator.PositionRespondent(-1))]
+        chunks = list(simulator.simulate(compiled, models, 250, seed=1, chunk_size=100))
+        source = os.path.join(self.directory, "survey.csv")
+        with open(source, "w") as fp:
+            simulator.write_csv(compiled, fp)
+        hits = os.path.join(self.directory, "hits")
+        os.mkdir(hits)
+        with open(os.path.join(hits, "results.csv"), "w") as fp:
+            simulator.write_hits(compiled, chunks, fp)
+        survey = loadHITs.get_survey(source)
+        self.assertEqual([len(q.options) for q in survey.questions],
+                         [len(compiled.question_options(q)) for q in range(compiled.num_questions())])
+        m = loadHITs.load_matrix(hits, survey, True, chunk_size=60, processes=2)
+        self.assertEqual(len(m), 250)
+        for (name, array) in [("answers", m.answers), ("qpos", m.qpos), ("opos", m.opos)]:
+            simulated = [list(getattr(chunk, name)) for chunk in chunks]
+            self.assertEqual(array.ravel().tolist(), sum(simulated, []), name)
+        self.assertEqual(m.worker_ids[:2], ["Wsim0", "Wsim1"])
+        self.assertTrue((m.answers == MISSING).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
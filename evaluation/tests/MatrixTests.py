@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+from fixtures import flat_survey, random_responses, frequency, empirical_prob, entropy
+from matrix import ResponseMatrix, MISSING, as_matrix
+import evaluation
+
+
+class ResponseMatrixTests(unittest.TestCase):
+
+    def setUp(self):
+        self.survey = flat_survey([2, 3, 4, 5])
+        self.responses = random_responses(self.survey, 50, np.random.RandomState(0))
+
+    def test_round_trip(self):
+        m = ResponseMatrix.from_responses(self.survey, self.responses)
+        self.assertEqual((len(m), m.num_questions(), m.num_options()), (50, 4, 14))
+        self.assertEqual(m.to_responses(), self.responses)
+        self.assertEqual(ResponseMatrix.from_responses(self.survey, m.to_responses()).to_responses(), self.responses)
+
+    def test_quids_and_oids(self):
+        by_id = [{q.quid : o.oid for (q, (o, _, _)) in r.items()} for r in self.responses]
+        m = ResponseMatrix.from_responses(self.survey, by_id)
+        expected = ResponseMatrix.from_responses(self.survey, self.responses)
+        self.assertTrue(np.array_equal(m.answers, expected.answers))
+        self.assertTrue((m.qpos == MISSING).all())
+
+    def test_concatenate_and_take(self):
+        m = ResponseMatrix.from_responses(self.survey, self.responses, worker_ids=range(50),
+                                          assignment_ids=range(50))
+        parts = [m.take(np.arange(0, 20)), m.take(np.arange(20, 50))]
+        joined = ResponseMatrix.concatenate(self.survey, parts)
+        self.assertEqual(joined.to_responses(), self.responses)
+        self.assertEqual(joined.worker_ids, range(50))
+        self.assertEqual(len(ResponseMatrix.concatenate(self.survey, [])), 0)
+        mask = np.arange(50) % 3 == 0
+        self.assertEqual(m.take(mask).to_responses(), self.responses[::3])
+
+    def test_as_matrix(self):
+        m = as_matrix(self.survey, self.responses)
+        self.assertIs(as_matrix(self.survey, m), m)
+
+    def test_statistics(self):
+        m = ResponseMatrix.from_responses(self.survey, self.responses)
+        fmap = frequency(self.survey, self.responses)
+        self.assertEqual(m.to_map(m.frequencies()), fmap)
+        pmap = empirical_prob(fmap)
+        probs = m.to_map(m.probabilities())
+        for q in self.survey.questions:
+            for o in q.options:
+                self.assertAlmostEqual(probs[q][o], pmap[q][o])
+        self.assertAlmostEqual(m.entropy(), entropy(pmap))
+
+    def test_codes(self):
+        m = ResponseMatrix(self.survey, [[1, MISSING, 0, 4]])
+        self.assertEqual(m.codes().tolist(), [[1, MISSING, 5, 13]])
+        self.assertEqual(m.frequencies().tolist(), [0, 1, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1])
+
+
+class StatisticsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.survey = flat_survey([2, 3, 4, 5, 1])
+        self.responses = random_responses(self.survey, 80, np.random.RandomState(2))
+
+    def test_empirical_prob(self):
+        expected = empirical_prob(frequency(self.survey, self.responses))
+        m = ResponseMatrix.from_responses(self.survey, self.responses)
+        for pmap in [evaluation.empirical_prob(evaluation.frequency(self.survey, self.responses)),
+                     evaluation.empirical_prob(m)]:
+            self.assertEqual(set(pmap), set(expected))
+            for q in expected:
+                for o in q.options:
+                    self.assertAlmostEqual(pmap[q][o], expected[q][o])
+        # questions nobody answered
+        empty = evaluation.empirical_prob(evaluation.frequency(self.survey, []))
+        self.assertEqual(set(p for q in empty for p in empty[q].values()), set([0.0]))
+
+    def test_entropy_classification(self):
+        pmap = empirical_prob(frequency(self.survey, self.responses))
+        classified = evaluation.bot_lazy_responses_entropy(self.survey, self.responses, 0.05, None)
+        self.assertEqual([r for (r, _, _) in classified], self.responses)
+        for (response, _, ent) in classified:
+            self.assertAlmostEqual(ent, evaluation.ind_entropy(response, pmap))
+        m = ResponseMatrix.from_responses(self.survey, self.responses)
+        self.assertEqual([(flagged, ent) for (_, flagged, ent) in classified],
+                         [(flagged, ent) for (_, flagged, ent) in evaluation.bot_lazy_responses_entropy(
+                             self.survey, m, 0.05, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from fixtures import flat_survey
+import population
+
+
+class PopulationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.survey = flat_survey([2, 3, 4, 5])
+
+    def test_profiles(self):
+        profiles = population.Profiles.random(self.survey, 6, 0)
+        self.assertEqual(len(profiles), 6)
+        self.assertTrue((profiles.preferred < [2, 3, 4, 5]).all())
+        self.assertTrue((profiles.prob > 1.0 / np.array([2, 3, 4, 5])).all() and (profiles.prob < 1).all())
+        copy = population.Profiles.from_dicts(self.survey, profiles.to_dicts())
+        self.assertTrue(np.array_equal(copy.preferred, profiles.preferred))
+        self.assertTrue(np.allclose(copy.prob, profiles.prob))
+
+    def test_sample(self):
+        profiles = population.Profiles.random(self.survey, 3, 1)
+        (b, h) = population.sample(profiles, 50, 0.3, 2)
+        self.assertEqual((len(b), len(h)), (15, 35))
+        (b2, h2) = population.sample(profiles, 50, 0.3, 2)
+        self.assertTrue(np.array_equal(b.answers, b2.answers) and np.array_equal(h.answers, h2.answers))
+        self.assertTrue((b.answers < [2, 3, 4, 5]).all() and (h.answers >= 0).all())
+        self.assertEqual(b.qpos[0].tolist(), [0, 1, 2, 3])
+        for m in [b, h]:
+            self.assertTrue(np.array_equal(m.opos, m.answers))
+            self.assertFalse(np.shares_memory(m.opos, m.answers))
+
+    def test_preferences(self):
+        # a profile that always chooses its preferred option
+        profiles = population.Profiles(self.survey, [[1, 2, 0, 4]], [[1.0] * 4])
+        h = population.sample_humans(profiles, 20, 3)
+        self.assertTrue((h.answers == [1, 2, 0, 4]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from fixtures import flat_survey
+from matrix import ResponseMatrix, MISSING
+from respondents import RespondentIndex, answer_mask, answered_mask
+
+
+class RespondentIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.survey = flat_survey([2, 3])
+        answers = [[0, 0], [1, 1], [0, 2], [1, MISSING], [0, 1], [1, 0]]
+        self.m = ResponseMatrix(self.survey, answers, worker_ids=["a", "b", "a", "c", "b", "a"],
+                                assignment_ids=["x", "y", "z", "x", "w", "v"])
+        self.index = RespondentIndex(self.m)
+
+    def test_rows(self):
+        self.assertEqual(self.index.num_workers(), 3)
+        self.assertEqual(self.index.rows_for_worker("a").tolist(), [0, 2, 5])
+        self.assertEqual(self.index.rows_for_worker("d").tolist(), [])
+        self.assertEqual(self.index.rows_for_assignment("x").tolist(), [0, 3])
+        self.assertEqual(self.index.repeats().tolist(), [True, True, True, False, True, True])
+
+    def test_dedup(self):
+        self.assertEqual(self.index.dedup().tolist(), [True, True, False, True, False, False])
+        self.assertEqual(self.index.dedup("last").tolist(), [False, False, False, True, True, True])
+        self.assertEqual(self.index.dedup("unique").tolist(), [False, False, False, True, False, False])
+        self.assertRaises(ValueError, self.index.dedup, "most")
+
+    def test_masks(self):
+        q = self.survey.questions[1]
+        self.assertEqual(answer_mask(self.m, q, [q.options[1], 2]).tolist(),
+                         [False, True, True, False, True, False])
+        self.assertEqual(answered_mask(self.m, q.quid).tolist(), [True, True, True, False, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
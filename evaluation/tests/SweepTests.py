@@ -0,0 +1,62 @@
+import os, shutil, tempfile
+import unittest
+import sweep
+
+
+def first_option(survey, bots, nots, option=0):
+    """ flags respondents who chose option at the first question"""
+    return [(isbot, a == option, a) for (isbot, m) in [(True, bots), (False, nots)] for a in m.answers[:, 0].tolist()]
+
+
+class SweepTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cells = sweep.grid(questions=[3], options=[2, 4], clusters=[2], size=[40], percent_bots=[0.25, 0.5])
+        self.run_cell = sweep.run_cell
+
+    def tearDown(self):
+        sweep.run_cell = self.run_cell
+        shutil.rmtree(self.directory, True)
+
+    def test_grid(self):
+        self.assertEqual(len(self.cells), 4)
+        self.assertEqual(self.cells[1], {"questions": 3, "options": 2, "clusters": 2, "size": 40, "percent_bots": 0.5})
+
+    def test_reproducible(self):
+        results = sweep.run(self.cells, first_option, trials=5, seed=1)
+        self.assertEqual(results, sweep.run(self.cells, first_option, trials=5, seed=1, processes=2))
+        self.assertNotEqual(results, sweep.run(self.cells, first_option, trials=5, seed=2))
+        self.assertEqual([cell for (cell, _) in results], self.cells)
+        self.assertTrue(all(len(rs) == 5 for (_, rs) in results))
+
+    def test_resume(self):
+        results = sweep.run(self.cells, first_option, trials=5, seed=1, directory=self.directory)
+        checkpoints = sorted(os.listdir(self.directory))
+        self.assertEqual(len(checkpoints), 4)
+        ran = []
+
+        def run_cell(args):
+            ran.append(args[1])
+            return self.run_cell(args)
+
+        sweep.run_cell = run_cell
+        self.assertEqual(sweep.run(self.cells, first_option, trials=5, seed=1, directory=self.directory), results)
+        self.assertEqual(ran, [])
+        os.remove(os.path.join(self.directory, checkpoints[0]))
+        self.assertEqual(sweep.run(self.cells, first_option, trials=5, seed=1, directory=self.directory), results)
+        self.assertEqual(len(ran), 1)
+        # cells that differ in their classifier parameters are run separately
+        sweep.run([dict(self.cells[0], option=1)], first_option, trials=5, seed=1, directory=self.directory)
+        self.assertEqual(len(ran), 2)
+
+    def test_table(self):
+        results = sweep.run(self.cells, first_option, trials=3, seed=1)
+        rows = sweep.table(results, options=2)
+        self.assertEqual([sorted(set(x for (_, _, x) in row)) for row in rows], [[0.25], [0.5]])
+        self.assertEqual([len(row) for row in rows], [3, 3])
+        self.assertEqual(len(sweep.table(results)[0]), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
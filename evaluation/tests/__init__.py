@@ -0,0 +1,6 @@
+import os, sys
+# the evaluation modules import each other as top level modules; the
+# simulator tests also need the surveyman package from the repository root
+evaluation = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, evaluation)
+sys.path.append(os.path.dirname(evaluation))
@@ -0,0 +1,26 @@
+import unittest
+import MatrixTests
+import BootstrapTests
+import LoadTests
+import CacheTests
+import AggregateTests
+import BotTests
+import CorrelationTests
+import RespondentTests
+import PopulationTests
+import SweepTests
+import BreakoffTests
+
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(MatrixTests.ResponseMatrixTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(MatrixTests.StatisticsTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(BootstrapTests.BootstrapTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(LoadTests.LoadTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(CacheTests.CacheTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(AggregateTests.FrequencyAggregatorTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(BotTests.BotTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(CorrelationTests.CorrelationTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(RespondentTests.RespondentIndexTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(PopulationTests.PopulationTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SweepTests.SweepTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(BreakoffTests.BreakoffTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(LoadTests.SimulatedHitTests))
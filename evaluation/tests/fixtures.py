@@ -0,0 +1,60 @@
+import csv, math
+from objects import *
+
+def flat_survey(option_counts):
+    """ returns a Survey with one radio question per entry of option_counts"""
+    return Survey([Question("q%d" % i, [Option("o%d" % j) for j in range(n)], qtypes["radio"])
+                   for (i, n) in enumerate(option_counts)])
+
+def write_survey_csv(filename, option_counts):
+    """ writes a source csv with one question per entry of option_counts, in
+    the layout make_survey.parse reads"""
+    with open(filename, "w") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(["Block", "Question", "Options"])
+        for (i, n) in enumerate(option_counts):
+            for j in range(n):
+                writer.writerow(["1", "q%d" % i if j == 0 else "", "o%d" % j])
+
+def random_responses(survey, n, rng):
+    """ returns n dict responses answering each question with probability .8"""
+    responses = []
+    for _ in range(n):
+        response = {}
+        order = rng.permutation(len(survey.questions))
+        for (qpos, i) in enumerate(order):
+            q = survey.questions[i]
+            if rng.random_sample() < 0.8:
+                j = rng.randint(len(q.options))
+                response[q] = (q.options[j], qpos, rng.randint(len(q.options)))
+        responses.append(response)
+    return responses
+
+# the dict based statistics that ResponseMatrix replaced
+
+def frequency(survey, responses):
+    freqs = {q : {o : 0 for o in q.options} for q in survey.questions}
+    for response in responses:
+        for q in response.keys():
+            o = response[q][0]
+            freqs[q][o] += 1
+    return freqs
+
+def empirical_prob(fmap):
+    probs = {q : {o : 0 for o in list(fmap[q].keys())} for q in list(fmap.keys())}
+    for q in list(fmap.keys()):
+        total = sum(fmap[q].values())
+        for o in list(fmap[q].keys()):
+            if total == 0:
+                probs[q][o] = 0.0
+            else:
+                probs[q][o] = float(fmap[q][o]) / float(total)
+    return probs
+
+def entropy(pmap):
+    ent = 0.0
+    for q in pmap.keys():
+        for p in pmap[q].values():
+            if p > 0:
+                ent += p * (math.log(p) / math.log(2))
+    return -ent
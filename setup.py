@@ -9,13 +9,14 @@ setup(
     author='Emma Tosch',
     author_email='etosch@cs.umass.edu',
     packages=find_packages(),
-    package_data={'': ['*.json', 'VERSION']},
+    package_data={'': ['*.json', 'VERSION'], 'surveyman': ['schemata/*.json']},
     url='http://surveyman.github.io/SMPy',
     license='CRAPL',
     description='Python front-end to the SurveyMan Language and Runtime',
     long_description=open('README.txt').read(),
     install_requires=[
         "jsonschema == 2.3.0",
-        "pytidylib ==  0.2.3"
+        "pytidylib ==  0.2.3",
+        "numpy >= 1.9"
     ],
 )
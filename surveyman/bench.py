@@ -0,0 +1,195 @@
+"""
+Scaling benchmarks for survey construction, validation and serialization.
+
+Run ``python -m surveyman.bench --help`` for options. Each case builds a synthetic survey of one shape and size in a
+fresh process, then times construction, Survey.validate, Survey.jsonize and jsonValidator.validate_json separately and
+records the peak resident memory of the process. Results are written as JSON, so runs from different releases can be
+compared.
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import Queue
+import resource
+import sys
+import time
+import surveyman.jsonValidator as validator
+import surveyman.survey.__ids__ as ids
+import surveyman.survey.blocks as blocks
+import surveyman.survey.constraints as constraints
+import surveyman.survey.options as options
+import surveyman.survey.questions as questions
+import surveyman.survey.surveys as surveys
+
+__block_size__ = 10
+__depth__ = 8
+__poll_seconds__ = 1.0
+
+
+def make_flat(n):
+    """Top level blocks of ten questions, four options each."""
+    bs = []
+    for start in range(0, n, __block_size__):
+        bs.append(blocks.Block([questions.Question("oneof", "q%d" % i, [options.TextOption(str(a)) for a in range(4)])
+                                for i in range(start, min(n, start + __block_size__))]))
+    return surveys.Survey(bs, [])
+
+
+def make_nested(n):
+    """Top level blocks, each a chain of sub-blocks eight deep with one question per level."""
+    bs = []
+    for start in range(0, n, __depth__):
+        inner = None
+        for i in reversed(range(start, min(n, start + __depth__))):
+            contents = [questions.Question("oneof", "q%d" % i, [options.TextOption(str(a)) for a in range(4)])]
+            if inner is not None:
+                contents.append(inner)
+            inner = blocks.Block(contents)
+        bs.append(inner)
+    return surveys.Survey(bs, [])
+
+
+def make_branching(n):
+    """One question per top level block; each question either goes on to the next block or skips it."""
+    qs = [questions.Question("oneof", "q%d" % i, [options.TextOption("next"), options.TextOption("skip")])
+          for i in range(n)]
+    bs = [blocks.Block([q]) for q in qs]
+    cs = []
+    for i in range(n - 2):
+        c = constraints.Constraint(qs[i])
+        c.add_branch_by_index(1, bs[i + 2])
+        cs.append(c)
+    return surveys.Survey(bs, cs)
+
+
+def make_likert(n):
+    """Wide blocks of a hundred seven-point likert questions."""
+    bs = []
+    for start in range(0, n, 100):
+        bs.append(blocks.Block([questions.Question("likert", "q%d" % i, [options.TextOption(str(a)) for a in range(7)])
+                                for i in range(start, min(n, start + 100))]))
+    return surveys.Survey(bs, [])
+
+
+shapes = {"flat": make_flat, "nested": make_nested, "branching": make_branching, "likert": make_likert}
+
+
+def __peak_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_case(shape, size, json_validation=True):
+    """
+    Builds one survey and times each stage.
+
+    :param shape: One of the keys of shapes
+    :param size: The number of questions
+    :param json_validation: Whether to time validate_json, which is slow for very large surveys
+    :return: A dict of timings in seconds and peak memory in kilobytes
+    """
+    result = {"shape": shape, "size": size}
+    base = __peak_kb()
+    start = time.time()
+    survey = shapes[shape](size)
+    result["construct"] = time.time() - start
+    start = time.time()
+    survey.validate()
+    result["validate"] = time.time() - start
+    start = time.time()
+    output = survey.jsonize()
+    result["jsonize"] = time.time() - start
+    if json_validation:
+        instance = json.loads(output)
+        start = time.time()
+        validator.validate_json(instance)
+        result["validate_json"] = time.time() - start
+    result["peak_kb"] = __peak_kb() - base
+    return result
+
+
+def __run_in_child(queue, shape, size, json_validation, counter_ids):
+    if counter_ids:
+        ids.set_id_strategy(ids.CounterStrategy())
+    queue.put(run_case(shape, size, json_validation))
+
+
+def __collect(queue, proc, timeout):
+    """
+    Waits for a child's result, polling so that a child that dies without reporting, e.g. killed by the OOM killer, or
+    that runs past timeout seconds, is reported as a failure rather than waited on forever.
+    """
+    start = time.time()
+    while True:
+        try:
+            return queue.get(timeout=__poll_seconds__)
+        except Queue.Empty:
+            pass
+        if not proc.is_alive():
+            # the child may have put its result just before exiting
+            try:
+                return queue.get(timeout=__poll_seconds__)
+            except Queue.Empty:
+                proc.join()
+                return {"error": "child process exited with code %s" % proc.exitcode}
+        if timeout is not None and time.time() - start > timeout:
+            proc.terminate()
+            proc.join()
+            return {"error": "timed out after %s seconds" % timeout}
+
+
+def run(shape_names, sizes, json_validation=True, counter_ids=False, timeout=None):
+    """
+    Runs every shape at every size, each in a fresh process so that peak memory is measured per case. A case whose
+    process dies or times out is recorded with an "error" entry instead of timings.
+
+    :param shape_names: A list of keys of shapes
+    :param sizes: A list of question counts
+    :param json_validation: Whether to time validate_json
+    :param counter_ids: Whether to use the counter id strategy instead of uuids
+    :param timeout: The most seconds to wait for each case, or None to wait as long as it runs
+    :return: A list of result dicts
+    """
+    results = []
+    for size in sizes:
+        for shape in shape_names:
+            queue = multiprocessing.Queue()
+            p = multiprocessing.Process(target=__run_in_child, args=(queue, shape, size, json_validation, counter_ids))
+            p.start()
+            result = __collect(queue, p, timeout)
+            p.join()
+            if "error" in result:
+                result.update(shape=shape, size=size)
+            sys.stderr.write("%s\n" % json.dumps(result, sort_keys=True))
+            results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time survey construction, validation and serialization.")
+    parser.add_argument("--shapes", nargs="+", default=sorted(shapes), choices=sorted(shapes))
+    parser.add_argument("--min-exp", type=int, default=2, help="smallest size, as a power of ten (default 2)")
+    parser.add_argument("--max-exp", type=int, default=4, help="largest size, as a power of ten (default 4)")
+    parser.add_argument("--no-json-validation", action="store_true", help="skip timing validate_json")
+    parser.add_argument("--counter-ids", action="store_true", help="use the counter id strategy")
+    parser.add_argument("--timeout", type=float, help="seconds to wait for each case (default no limit)")
+    parser.add_argument("--output", help="file to write the JSON results to (default stdout)")
+    args = parser.parse_args(argv)
+    sizes = [10 ** e for e in range(args.min_exp, args.max_exp + 1)]
+    report = {"python": platform.python_version(),
+              "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "counter_ids": args.counter_ids,
+              "results": run(args.shapes, sizes, not args.no_json_validation, args.counter_ids,
+                                 args.timeout)}
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,110 @@
-import jsonschema
+import hashlib
 import json
+import os
+import pkgutil
 import urllib2
+import jsonschema
+from jsonschema.validators import RefResolver, validator_for
 
 input_schema = "http://surveyman.github.io/Schemata/survey_input.json"
 option_schema = "http://surveyman.github.io/Schemata/survey_option.json"
 question_schema = "http://surveyman.github.io/Schemata/survey_question.json"
 block_schema = "http://surveyman.github.io/Schemata/survey_block.json"
+branch_map_schema = "http://surveyman.github.io/Schemata/survey_branchMap.json"
+
+__schemata__ = [input_schema, option_schema, question_schema, block_schema, branch_map_schema]
+__validators__ = {}
+__bundled_validators__ = {}
+__registry__ = None
+
+
+def __no_remote(uri):
+    raise jsonschema.RefResolutionError("Refusing to fetch %s; only the bundled schemata are available." % uri)
+
+
+def get_registry():
+    """
+    Returns the bundled `JSON Schemata <http://surveyman.github.io/Schemata>`_, keyed by their published URLs. The
+    schemata ship with this package, so no network access is needed. They are loaded once per process, and a validator
+    is compiled for each of them at the same time.
+
+    :return: A dict mapping schema URLs to schema objects
+    """
+    global __registry__
+    if __registry__ is None:
+        registry = {}
+        for url in __schemata__:
+            registry[url] = json.loads(pkgutil.get_data("surveyman", "schemata/" + __filename(url)).decode("utf-8"))
+        for url in __schemata__:
+            __bundled_validators__[url] = __compile(registry[url], registry)
+        __registry__ = registry
+    return __registry__
+
+
+def update_schemata(directory=None):
+    """
+    Downloads the published `JSON Schemata <http://surveyman.github.io/Schemata>`_ and writes them byte for byte over
+    the bundled copies. Run this (or ``make schemata``) before packaging a release; the validators never fetch
+    anything themselves.
+
+    :param directory: Where to write the schemata; defaults to the package's schemata directory.
+    """
+    if directory is None:
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemata")
+    for url in __schemata__:
+        data = urllib2.urlopen(url).read()
+        json.loads(data.decode("utf-8"))
+        with open(os.path.join(directory, __filename(url)), "wb") as f:
+            f.write(data)
+
+
+def __filename(url):
+    return url.rsplit("/", 1)[-1]
+
+
+def __compile(schema, registry):
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    resolver = RefResolver(schema.get("id", ""), schema, store=registry, cache_remote=False,
+                           handlers={"http": __no_remote, "https": __no_remote})
+    return cls(schema, resolver=resolver)
+
+
+def get_bundled_validator(url):
+    """
+    Returns the compiled validator for one of the bundled schemata. These are built once, when the registry is loaded.
+
+    :param url: The published URL of a bundled schema
+    :return: A jsonschema validator instance
+    """
+    registry = get_registry()
+    if url not in __bundled_validators__:
+        raise ValueError("Unknown schema %s; bundled schemata are %s." % (url, ", ".join(sorted(registry))))
+    return __bundled_validators__[url]
+
+
+def get_validator(schema):
+    """
+    Returns a compiled validator for a caller-supplied schema. Validators are cached for the life of the process, keyed
+    by a hash of the schema contents, so equal schemata share one validator. References are resolved against the
+    bundled schemata only.
+
+    :param schema: A schema object
+    :return: A jsonschema validator instance
+    """
+    key = hashlib.sha1(json.dumps(schema, sort_keys=True).encode("utf-8")).hexdigest()
+    if key not in __validators__:
+        __validators__[key] = __compile(schema, get_registry())
+    return __validators__[key]
+
+
+def __validator(schema, url):
+    if url:
+        return get_bundled_validator(schema)
+    elif isinstance(schema, dict):
+        return get_validator(schema)
+    else:
+        return get_validator(json.loads(schema))
 
 
 def validate_json(instance, schema=input_schema, url=True):
@@ -14,21 +113,20 @@ def validate_json(instance, schema=input_schema, url=True):
 
     :param instance: A JSON object
     :param schema: The target schema.
-    :param url: external source
+    :param url: If True, schema is the URL of one of the bundled schemata; otherwise it is the schema itself.
     """
-    if url:
-        if len(schema) == 1:
-            schemata = [schema]
-        else:
-            schemata = schema
-        for s in schema:
-            try:
-                this_schema = urllib2.urlopen(schema).read()
-                break
-            except urllib2.URLError:
-                print "add logging"
-        if not this_schema:
-            raise ValueError("Schema never initialized.")
-    else:
-        this_schema = schema
-    jsonschema.validate(instance, json.loads(this_schema))
+    __validator(schema, url).validate(instance)
+
+
+def validate_many(instances, schema=input_schema, url=True):
+    """
+    Validates each of the input JSON objects against the same schema. The schema is looked up and compiled once for
+    the whole batch. Raises a ValidationError for the first instance that does not validate.
+
+    :param instances: An iterable of JSON objects
+    :param schema: The target schema.
+    :param url: If True, schema is the URL of one of the bundled schemata; otherwise it is the schema itself.
+    """
+    validator = __validator(schema, url)
+    for instance in instances:
+        validator.validate(instance)
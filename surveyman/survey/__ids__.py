@@ -1,6 +1,98 @@
+import os
+import threading
 import uuid
 
 
+class UUIDStrategy:
+    """
+    Draws each id from uuid4. This is the default id strategy.
+    """
+
+    def next_id(self):
+        """Returns a new 32 hex digit id"""
+        return uuid.uuid4().hex
+
+    def reserve(self, n):
+        """Returns a list of n new 32 hex digit ids"""
+        return [uuid.uuid4().hex for _ in range(n)]
+
+    def new_namespace(self):
+        """uuid ids have no namespace"""
+        pass
+
+
+class CounterStrategy:
+    """
+    Builds ids from a random 64-bit namespace followed by a 64-bit counter. The ids have the same 32 hex digit format as
+    uuid ids, but cost a counter increment rather than a call to the OS random source.
+
+    Every survey gets its own namespace: components are built before the survey that holds them, so creating a Survey
+    closes the namespace its components were drawn from, and the components of the next survey are drawn from a fresh
+    one (see new_namespace). Namespaces are random, so ids from different surveys do not collide, just as uuid ids do
+    not. A new namespace is also drawn when the process id changes, so forked workers do not repeat their parent's ids.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.__reset()
+
+    def __reset(self):
+        self.namespace = uuid.uuid4().hex[:16]
+        self.pid = os.getpid()
+        self.counter = 0
+
+    def new_namespace(self):
+        """Starts a fresh random namespace and resets the counter. Called for every new Survey."""
+        with self.lock:
+            self.__reset()
+
+    def __advance(self, n):
+        """Reserves n counter values, returning the namespace and the first value; both are read under the lock, after
+        a fork has been noticed"""
+        with self.lock:
+            if os.getpid() != self.pid:
+                self.__reset()
+            start = self.counter
+            self.counter += n
+            return self.namespace, start
+
+    def next_id(self):
+        """Returns a new 32 hex digit id"""
+        return "%s%016x" % self.__advance(1)
+
+    def reserve(self, n):
+        """Reserves a contiguous range of n ids at once and returns them as a list"""
+        (namespace, start) = self.__advance(n)
+        return ["%s%016x" % (namespace, i) for i in range(start, start + n)]
+
+__strategy__ = UUIDStrategy()
+
+
+def set_id_strategy(strategy):
+    """
+    Sets the strategy used by every IdGenerator in the process. A strategy provides next_id() and reserve(n), and
+    optionally new_namespace().
+
+    :param strategy: A UUIDStrategy, CounterStrategy, or an object with the same methods
+    :return: The strategy that was previously in use
+    """
+    global __strategy__
+    previous = __strategy__
+    __strategy__ = strategy
+    return previous
+
+
+def new_namespace():
+    """Asks the current strategy to draw the ids that follow from a fresh namespace, if it uses namespaces"""
+    if hasattr(__strategy__, "new_namespace"):
+        __strategy__.new_namespace()
+
+
+def get_id_strategy():
+    """Returns the strategy currently used by every IdGenerator"""
+    return __strategy__
+
+
 class IdGenerator:
     """
     Generates ids for survey components; component prefixes are passed as arguments
@@ -12,4 +104,11 @@ class IdGenerator:
 
     def generateID(self):
         """Generates a new component id with the appropriate prefix"""
-        return self.prefix + str(uuid.uuid4().hex)
\ No newline at end of file
+        self.numAssigned += 1
+        return self.prefix + __strategy__.next_id()
+
+    def reserveIDs(self, n):
+        """Generates n new component ids at once, for code that builds large surveys and assigns ids itself"""
+        self.numAssigned += n
+        prefix = self.prefix
+        return [prefix + i for i in __strategy__.reserve(n)]
@@ -0,0 +1,91 @@
+from collections import namedtuple
+from compiled import CompiledSurvey
+
+"""
+Static analysis of the paths respondents can take through a survey. A path is the sequence of top level blocks a
+respondent sees, from the first block to the end of the survey; every question in a block (including its sub-blocks) is
+answered before moving on. All quantities are computed by dynamic programming over the branch graph of the compiled
+survey, visited in reverse topological order, so the cost is linear in the size of the survey rather than in the number
+of paths. Breakoff is not modeled: every path runs to the end of the survey.
+"""
+
+PathStatistics = namedtuple("PathStatistics", ["num_paths", "min_length", "max_length", "expected_length"])
+"""
+The number of distinct paths through a survey and the minimum, maximum and expected number of questions answered.
+"""
+
+
+def __compiled(survey):
+    return survey if isinstance(survey, CompiledSurvey) else survey.compile()
+
+
+def block_lengths(survey):
+    """
+    Returns the number of questions answered in each top level block, including its sub-blocks.
+
+    :param survey: A Survey or CompiledSurvey
+    :return: A list indexed by top level position
+    """
+    compiled = __compiled(survey)
+    lengths = [0] * compiled.end
+    for b in compiled.question_block:
+        lengths[compiled.block_top[b]] += 1
+    return lengths
+
+
+def __transitions(compiled, position, probabilities):
+    """
+    Returns (probability, destination) pairs for leaving the top level block at position. Options that do not branch
+    lead to the next block. Probabilities are normalized over the exit question's options; options missing from
+    probabilities are weighted 1/m, where m is the number of options.
+    """
+    q = compiled.block_exit[compiled.top_blocks[position]]
+    if q == -1:
+        return [(1.0, position + 1)]
+    opts = compiled.question_options(q)
+    if len(opts) == 0:
+        return [(1.0, position + 1)]
+    weights = [probabilities.get(compiled.option_ids[o], 1.0 / len(opts)) for o in opts]
+    total = float(sum(weights))
+    if total <= 0:
+        raise ValueError("Option probabilities for question %s sum to %f" % (compiled.question_ids[q], total))
+    return [(w / total, compiled.option_dst[o] if compiled.option_dst[o] != -1 else position + 1)
+            for (w, o) in zip(weights, opts)]
+
+
+def path_statistics(survey, probabilities=None):
+    """
+    Computes the number of distinct respondent paths through the survey, and the minimum, maximum and expected number
+    of questions answered along them.
+
+    :param survey: A Survey or CompiledSurvey
+    :param probabilities: Optional dict mapping option ids to the probability of choosing that option. Only options of
+        questions that decide where a block branches are used. By default each option is equally likely.
+    :return: PathStatistics
+    """
+    compiled = __compiled(survey)
+    probabilities = probabilities or {}
+    lengths = block_lengths(compiled)
+    end = compiled.end
+    paths = [0] * (end + 1)
+    shortest = [0] * (end + 1)
+    longest = [0] * (end + 1)
+    expected = [0.0] * (end + 1)
+    paths[end] = 1
+    for p in reversed(compiled.topological_order):
+        successors = compiled.successors(p)
+        paths[p] = sum(paths[s] for s in successors)
+        shortest[p] = lengths[p] + min(shortest[s] for s in successors)
+        longest[p] = lengths[p] + max(longest[s] for s in successors)
+        expected[p] = lengths[p] + sum(w * expected[s] for (w, s) in __transitions(compiled, p, probabilities))
+    return PathStatistics(paths[0], shortest[0], longest[0], expected[0])
+
+
+def count_paths(survey):
+    """
+    Returns the number of distinct paths through the survey's top level blocks.
+
+    :param survey: A Survey or CompiledSurvey
+    :return: An int
+    """
+    return path_statistics(survey).num_paths
@@ -1,4 +1,5 @@
 import json
+import itertools
 from __ids__ import *
 import questions
 import survey_exceptions as se
@@ -7,6 +8,7 @@ import constraints
 NEXT = "NEXT"
 
 __blockGen__ = IdGenerator("b_")
+__stamps__ = itertools.count(1)
 __branch_one__ = "branch-one"
 __branch_all__ = "branch-all"
 __branch_none__ = "branch-none"
@@ -27,9 +29,20 @@ branch maps. This block cannot contain any sub-blocks.
 """
 
 
+def next_stamp():
+    """
+    Returns a new modification stamp. Stamps increase across the whole process, so a stamp recorded at validation time
+    is only ever seen again if the object has not been edited since.
+
+    :return: An int
+    """
+    return next(__stamps__)
+
+
 def get_farthest_ancestor(block):
     """
-    Returns the topmost block for the input.
+    Returns the topmost block for the input. Each block caches its topmost ancestor, so this does not walk the parent
+    pointers.
 
     :param block: A block, which may be the sub-block of some other block.
     :return: A Block
@@ -37,10 +50,7 @@ def get_farthest_ancestor(block):
 
     assert isinstance(block, Block), type(block)
 
-    if block.parent is None:
-        return block
-    else:
-        return get_farthest_ancestor(block.parent)
+    return block.ancestor
 
 
 def get_all_subblocks(block):
@@ -85,6 +95,8 @@ class Block:
         self.contents = contents
         self.blockId = __blockGen__.generateID()
         self.randomize = randomize
+        self.ancestor = self
+        self.stamp = next_stamp()
         self.__subblock_ids()
         self.__label_questions()
         self.parent = None
@@ -102,6 +114,7 @@ class Block:
                     c.blockId = self.blockId + "." + c.blockId
                     # set parent pointer
                     c.parent = self
+                    c.__set_ancestor(self.ancestor)
 
     def __label_questions(self):
         """
@@ -114,6 +127,29 @@ class Block:
                 if isinstance(q, questions.Question):
                     q.block = self
 
+    def __set_ancestor(self, ancestor):
+        """
+        Updates the cached topmost ancestor of this block and all of its descendants.
+
+        :param ancestor: The new topmost block
+        """
+        stack = [self]
+        while stack:
+            b = stack.pop()
+            b.ancestor = ancestor
+            stack.extend(b.get_subblocks())
+
+    def mark_dirty(self):
+        """
+        Gives this block and every block enclosing it a new modification stamp, so that the next call to
+        Survey.validate re-checks them.
+        """
+        b = self
+        stamp = next_stamp()
+        while b is not None:
+            b.stamp = stamp
+            b = b.parent
+
     def __ensure_no_cycles(self, block):
         farthest_ancestor = get_farthest_ancestor(self)
         all_blocks = get_all_subblocks(farthest_ancestor)
@@ -129,6 +165,7 @@ class Block:
         """
         question.block = self
         self.contents.append(question)
+        self.mark_dirty()
 
     def add_subblock(self, subblock):
         """
@@ -140,7 +177,9 @@ class Block:
         self.__ensure_no_cycles(subblock)
         subblock.parent = self
         subblock.blockId = self.blockId + "." + subblock.blockId
+        subblock.__set_ancestor(self.ancestor)
         self.contents.append(subblock)
+        self.mark_dirty()
 
     def get_subblocks(self):
         """
@@ -233,11 +272,11 @@ class Block:
     def __hash__(self):
         return self.blockId.__hash__()
 
-    def jsonize(self):
+    def to_dict(self):
         """
-        Returns the JSON representation of the block
+        Returns the block, its questions and its sub-blocks as a dictionary, ready to be encoded as JSON.
 
-        :return: A JSON object according to the `Block Schema <http://surveyman.github.io/Schemata/survey_block.json>`_
+        :return: A dict according to the `Block Schema <http://surveyman.github.io/Schemata/survey_block.json>`_
         """
         __id__ = "id"
         __questions__ = "questions"
@@ -246,14 +285,22 @@ class Block:
         output = {__id__: self.blockId, __questions__: [], __randomize__: self.randomize, __subblocks__: []}
         for thing in self.contents:
             if isinstance(thing, questions.Question):
-                output[__questions__].append(json.loads(thing.jsonize()))
+                output[__questions__].append(thing.to_dict())
             elif isinstance(thing, Block):
-                output[__subblocks__].append(json.loads(thing.jsonize()))
+                output[__subblocks__].append(thing.to_dict())
             else:
                 raise se.UnknownContentsException("Block %s has contents %s. Only %s and %s are permitted." %
                                                   (self.blockId, type(thing), questions.Question.__class__,
                                                    Block.__class__))
-        return json.dumps(output)
+        return output
+
+    def jsonize(self):
+        """
+        Returns the JSON representation of the block
+
+        :return: A JSON object according to the `Block Schema <http://surveyman.github.io/Schemata/survey_block.json>`_
+        """
+        return json.dumps(self.to_dict())
 
 
 class NEXTBLOCK(Block):
@@ -0,0 +1,360 @@
+from array import array
+from collections import deque
+import blocks
+import questions
+import options
+import survey_exceptions as se
+
+"""
+A CompiledSurvey is a flat, integer-indexed snapshot of a Survey. Blocks, questions and options are numbered in the
+order a depth-first walk of the survey meets them, and every relationship between them is stored as an array of those
+numbers. Analyses that only need the structure of the survey can run against the snapshot without walking the object
+graph, and without being affected by later edits to it.
+
+Relationships with a variable number of members are stored in compressed sparse row (CSR) form: the members of row i
+are ``members[ptr[i]:ptr[i+1]]``. The arrays are built as ``array`` objects and frozen into tuples, so neither the
+attributes nor their contents can be changed.
+"""
+
+NEXT = -2
+"""Option target for options that branch to the NEXT block."""
+
+NONE = -1
+"""Option target for options that do not branch."""
+
+
+class CompiledSurvey(object):
+    """
+    An immutable, integer-indexed representation of a survey and its branch graph.
+    Attributes cannot be reassigned, and every array is a tuple.
+
+    Blocks (numbered in depth-first order):
+
+    - block_ids, block_randomize, block_policy (one of the branch types in :mod:`blocks`)
+    - block_parent: the enclosing block, or -1 for top level blocks
+    - block_top: the top level position of the block's topmost ancestor
+    - block_child_ptr, block_children: CSR list of each block's direct sub-blocks
+    - block_question_ptr, block_questions: CSR list of each block's direct questions
+    - block_exit: the question whose answer decides where the block branches to, or -1
+    - top_blocks: the block number at each top level position
+
+    Questions and options:
+
+    - question_ids, question_texts, question_types, question_shuffle, question_breakoff, question_freetext
+    - question_block: the block directly containing each question
+    - question_branching: 1 if the question has a branch map
+    - question_option_ptr: CSR offsets into the option arrays
+    - option_ids, option_texts, option_question
+    - option_target: the block an option branches to, NEXT, or NONE
+
+    Branch graph, over top level positions 0..len(top_blocks)-1, with ``end`` = len(top_blocks) standing for the end of
+    the survey:
+
+    - edge_ptr, edge_dst: CSR adjacency list of the positions each top level block can be followed by
+    - option_dst: the position an option branches to with NEXT resolved, or -1 for options that do not branch
+    - topological_order: the top level positions in an order that respects every edge
+    """
+
+    __slots__ = ("survey_id", "breakoff", "block_ids", "block_randomize", "block_policy", "block_parent", "block_top",
+                 "block_child_ptr", "block_children", "block_question_ptr", "block_questions", "block_exit",
+                 "top_blocks", "question_ids", "question_texts", "question_types", "question_shuffle",
+                 "question_breakoff", "question_freetext", "question_block", "question_branching",
+                 "question_option_ptr", "option_ids", "option_texts", "option_question", "option_target", "end",
+                 "edge_ptr", "edge_dst", "option_dst", "topological_order")
+
+    def __init__(self, **fields):
+        """
+        Creates a CompiledSurvey from its arrays. Use Survey.compile rather than calling this directly.
+
+        :param fields: A value for each of the slots of this class; arrays are copied into tuples.
+        """
+        for name in self.__slots__:
+            value = fields[name]
+            object.__setattr__(self, name, tuple(value) if isinstance(value, array) else value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledSurvey is immutable")
+
+    def num_blocks(self):
+        """Returns the total number of blocks, including sub-blocks"""
+        return len(self.block_ids)
+
+    def num_questions(self):
+        """Returns the total number of questions"""
+        return len(self.question_ids)
+
+    def num_options(self):
+        """Returns the total number of options"""
+        return len(self.option_ids)
+
+    def successors(self, position):
+        """
+        Returns the top level positions that can follow the top level block at position; ``end`` marks the end of the
+        survey.
+
+        :param position: A top level position
+        :return: An array of positions
+        """
+        return self.edge_dst[self.edge_ptr[position]:self.edge_ptr[position + 1]]
+
+    def question_options(self, question):
+        """
+        Returns the option numbers of a question.
+
+        :param question: A question number
+        :return: A range of option numbers
+        """
+        return range(self.question_option_ptr[question], self.question_option_ptr[question + 1])
+
+    def subtree_questions(self, block):
+        """
+        Returns the question numbers of a block and all of its sub-blocks, in depth-first order.
+
+        :param block: A block number
+        :return: A list of question numbers
+        """
+        retval = []
+        stack = [block]
+        while stack:
+            b = stack.pop()
+            retval.extend(self.block_questions[self.block_question_ptr[b]:self.block_question_ptr[b + 1]])
+            stack.extend(reversed(self.block_children[self.block_child_ptr[b]:self.block_child_ptr[b + 1]]))
+        return retval
+
+    def validate(self):
+        """
+        Checks that every branch targets a top level block that comes after the branch question's topmost enclosing
+        block. Block branch policies are checked when the survey is compiled.
+        An InvalidBranchException is thrown if this is violated.
+        """
+        for (o, target) in enumerate(self.option_target):
+            if target < 0:
+                continue
+            q = self.option_question[o]
+            if self.block_parent[target] != -1:
+                raise se.InvalidBranchException("Branch target \n\t %s \n not found in the survey top level blocks."
+                                                % self.block_ids[target])
+            if self.block_top[self.question_block[q]] >= self.block_top[target]:
+                raise se.InvalidBranchException("Question " + self.question_texts[q] + " does not branch forward")
+
+    def block_to_dict(self, block):
+        """
+        Returns a block as a dictionary, equal to what Block.to_dict returns for the original block.
+
+        :param block: A block number
+        :return: A dict according to the `Block Schema <http://surveyman.github.io/Schemata/survey_block.json>`_
+        """
+        return {"id": self.block_ids[block],
+                "questions": [self.question_to_dict(q) for q in
+                              self.block_questions[self.block_question_ptr[block]:self.block_question_ptr[block + 1]]],
+                "randomize": bool(self.block_randomize[block]),
+                "subblocks": [self.block_to_dict(b) for b in
+                              self.block_children[self.block_child_ptr[block]:self.block_child_ptr[block + 1]]]}
+
+    def question_to_dict(self, question):
+        """
+        Returns a question as a dictionary, equal to what Question.to_dict returns for the original question.
+
+        :param question: A question number
+        :return: A dict according to the `Question Schema <http://surveyman.github.io/Schemata/survey_question.json>`_
+        """
+        qtype = self.question_types[question]
+        output = {"id": self.question_ids[question], "qtext": self.question_texts[question],
+                  "permitBreakoff": bool(self.question_breakoff[question])}
+        if qtype == questions.__instruction__:
+            return output
+        if qtype == questions.__freetext__:
+            if self.question_freetext[question] is not None:
+                output["freetext"] = self.question_freetext[question]
+            return output
+        opts = self.question_options(question)
+        output["options"] = [{"id": self.option_ids[o], "otext": self.option_texts[o]} for o in opts]
+        output["randomize"] = bool(self.question_shuffle[question])
+        output["ordered"] = qtype == questions.__likert__
+        output["exclusive"] = qtype in [questions.__likert__, questions.__oneof__]
+        if self.question_branching[question]:
+            output["branchMap"] = {self.option_ids[o]: blocks.NEXT if self.option_target[o] == NEXT
+                                   else self.block_ids[self.option_target[o]]
+                                   for o in opts if self.option_target[o] != NONE}
+        return output
+
+    def to_dict(self):
+        """
+        Returns the survey as a dictionary, equal to what Survey.to_dict returns for the original survey.
+
+        :return: A dict according to the `Survey Schema <http://surveyman.github.io/Schemata/survey_input.json>`_
+        """
+        return {"survey": [self.block_to_dict(b) for b in self.top_blocks],
+                "breakoff": self.breakoff,
+                "correlation": {},
+                "otherValues": {}}
+
+
+def __option_pairs(question):
+    """Returns the (id, text) pairs of a question's options, without building OptionTable views."""
+    if isinstance(question.options, options.OptionTable):
+        return [(question.options.get_id(i), t) for (i, t) in enumerate(question.options.texts)]
+    return [(o.opId, o.opText) for o in question.options]
+
+
+def __block_policy(branching, num_questions, subblock_policies, branch_targets):
+    """
+    Returns the branch policy of a block, following the same rules as Block.valid_branch_number.
+
+    :param branching: The number of direct questions that branch
+    :param num_questions: The number of direct questions
+    :param subblock_policies: The policies of the direct sub-blocks
+    :param branch_targets: The lists of targets of each direct branch question
+    :return: A branch policy
+    """
+    if branching == 1:
+        if blocks.__branch_one__ in subblock_policies:
+            raise se.InvalidBranchException("Branch-one block cannot contain a branch-one subblock")
+        return blocks.__branch_one__
+    elif branching == num_questions and branching != 0:
+        if any(targets != branch_targets[0] for targets in branch_targets):
+            raise se.InvalidBranchException("Block branches to different destinations")
+        if len(subblock_policies) != 0:
+            raise se.InvalidBranchException("Branch-all block cannot contain subblocks")
+        return blocks.__branch_all__
+    elif branching != 0:
+        raise se.InvalidBranchException("Block contains too many branch questions")
+    elif subblock_policies.count(blocks.__branch_one__) > 1:
+        raise se.InvalidBranchException("Block has too many branch-one subblocks")
+    return blocks.__branch_none__
+
+
+def compile_survey(survey):
+    """
+    Builds the CompiledSurvey for a survey. Compiling checks the branch policy of every block, and then the branch
+    targets (see CompiledSurvey.validate).
+
+    :param survey: A Survey
+    :return: A CompiledSurvey
+    """
+    # number the blocks depth-first, keeping each block's sub-blocks contiguous with it
+    block_objs, block_parent, block_top = [], array("i"), array("i")
+    for (position, top) in enumerate(survey.blockList):
+        stack = [(top, -1)]
+        while stack:
+            (b, parent) = stack.pop()
+            block_parent.append(parent)
+            block_top.append(position)
+            block_objs.append(b)
+            me = len(block_objs) - 1
+            stack.extend((sb, me) for sb in reversed(b.get_subblocks()))
+    block_numbers = {id(b): i for (i, b) in enumerate(block_objs)}
+
+    block_child_ptr, block_children = array("i", [0]), array("i")
+    block_question_ptr, block_questions = array("i", [0]), array("i")
+    question_objs = []
+    question_block = array("i")
+    for (i, b) in enumerate(block_objs):
+        block_children.extend(block_numbers[id(sb)] for sb in b.get_subblocks())
+        block_child_ptr.append(len(block_children))
+        for q in b.get_questions():
+            block_questions.append(len(question_objs))
+            question_objs.append(q)
+            question_block.append(i)
+        block_question_ptr.append(len(block_questions))
+
+    question_option_ptr = array("i", [0])
+    option_ids, option_texts, option_question, option_target = [], [], array("i"), array("i")
+    question_freetext, question_branching = [], array("b")
+    for (qi, q) in enumerate(question_objs):
+        pairs = __option_pairs(q)
+        targets = [NONE] * len(pairs)
+        if q.branch_map is not None:
+            positions = {op_id: i for (i, (op_id, _)) in enumerate(pairs)}
+            for (o, target) in q.branch_map.constraintMap:
+                if target is blocks.NEXTBLOCK:
+                    targets[positions[o.opId]] = NEXT
+                elif id(target) in block_numbers:
+                    targets[positions[o.opId]] = block_numbers[id(target)]
+                else:
+                    raise se.InvalidBranchException("Branch target \n\t %s \n not found in the survey." % target)
+        for (op_id, op_text) in pairs:
+            option_ids.append(op_id)
+            option_texts.append(op_text)
+            option_question.append(qi)
+        option_target.extend(targets)
+        question_option_ptr.append(len(option_ids))
+        question_branching.append(q.branch_map is not None)
+        question_freetext.append(questions.get_freetext_value(q))
+
+    # branch policies and exit questions, children before parents
+    block_policy = [None] * len(block_objs)
+    block_exit = array("i", [-1] * len(block_objs))
+    for b in reversed(range(len(block_objs))):
+        direct = block_questions[block_question_ptr[b]:block_question_ptr[b + 1]]
+        children = block_children[block_child_ptr[b]:block_child_ptr[b + 1]]
+        branch_qs = [q for q in direct if question_objs[q].branching]
+        try:
+            block_policy[b] = __block_policy(len(branch_qs), len(direct), [block_policy[c] for c in children],
+                                             [list(option_target[question_option_ptr[q]:question_option_ptr[q + 1]])
+                                              for q in branch_qs])
+        except se.InvalidBranchException as e:
+            raise se.InvalidBranchException("Block %s: %s" % (block_objs[b].blockId, e.args[0]))
+        if branch_qs:
+            block_exit[b] = branch_qs[0]
+        else:
+            # the last sub-block that branches decides where this block goes
+            for c in children:
+                if block_exit[c] != -1:
+                    block_exit[b] = block_exit[c]
+
+    # the branch graph over top level positions
+    top_blocks = array("i", (i for i in range(len(block_objs)) if block_parent[i] == -1))
+    end = len(top_blocks)
+    option_dst = array("i", [-1] * len(option_ids))
+    for (o, target) in enumerate(option_target):
+        if target == NEXT:
+            option_dst[o] = block_top[question_block[option_question[o]]] + 1
+        elif target != NONE:
+            option_dst[o] = block_top[target]
+    edge_ptr, edge_dst = array("i", [0]), array("i")
+    for (position, b) in enumerate(top_blocks):
+        q = block_exit[b]
+        if q == -1:
+            dsts = [position + 1]
+        else:
+            dsts = sorted(set(option_dst[o] if option_dst[o] != -1 else position + 1
+                              for o in range(question_option_ptr[q], question_option_ptr[q + 1])))
+        edge_dst.extend(dsts)
+        edge_ptr.append(len(edge_dst))
+
+    # Kahn's algorithm; the end of the survey is not part of the order
+    indegree = [0] * (end + 1)
+    for d in edge_dst:
+        indegree[d] += 1
+    ready = deque(p for p in range(end) if indegree[p] == 0)
+    topological_order = array("i")
+    while ready:
+        p = ready.popleft()
+        topological_order.append(p)
+        for d in edge_dst[edge_ptr[p]:edge_ptr[p + 1]]:
+            indegree[d] -= 1
+            if indegree[d] == 0 and d != end:
+                ready.append(d)
+    if len(topological_order) != end:
+        raise se.CycleException("Survey %s branches in a cycle" % survey.surveyID)
+
+    compiled = CompiledSurvey(
+        survey_id=survey.surveyID, breakoff=survey.hasBreakoff,
+        block_ids=tuple(b.blockId for b in block_objs),
+        block_randomize=array("b", (b.randomize for b in block_objs)),
+        block_policy=tuple(block_policy), block_parent=block_parent, block_top=block_top,
+        block_child_ptr=block_child_ptr, block_children=block_children,
+        block_question_ptr=block_question_ptr, block_questions=block_questions, block_exit=block_exit,
+        top_blocks=top_blocks,
+        question_ids=tuple(q.qId for q in question_objs), question_texts=tuple(q.qText for q in question_objs),
+        question_types=tuple(q.qType for q in question_objs),
+        question_shuffle=array("b", (q.shuffle for q in question_objs)),
+        question_breakoff=array("b", (q.breakoff for q in question_objs)),
+        question_freetext=tuple(question_freetext), question_block=question_block,
+        question_branching=question_branching, question_option_ptr=question_option_ptr,
+        option_ids=tuple(option_ids), option_texts=tuple(option_texts), option_question=option_question,
+        option_target=option_target, end=end, edge_ptr=edge_ptr, edge_dst=edge_dst, option_dst=option_dst,
+        topological_order=topological_order)
+    compiled.validate()
+    return compiled
@@ -12,13 +12,15 @@ choice of branch target to runtime.
 """
 
 
-class Constraint:
+class Constraint(object):
     """
     The Constraint object defines a mapping of a question's options to blocks
     in the survey. This is also referred to as branching.
     A branch question has an associated Constraint known as its branch map.
     """
 
+    __slots__ = ("cid", "question", "constraintMap", "stamp")
+
     def __init__(self, question):
         """
         Constructs a Constraint object with a unique id.
@@ -36,6 +38,16 @@ class Constraint:
         self.constraintMap = []
         for o in self.question.options:
             self.constraintMap.append((o, blocks.NEXTBLOCK))
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """
+        Gives this constraint and the blocks enclosing its question a new modification stamp, so that the next call to
+        Survey.validate re-checks them.
+        """
+        self.stamp = blocks.next_stamp()
+        if self.question.has_block():
+            self.question.block.mark_dirty()
 
     def add_branch_by_index(self, opIndex, block):
         """
@@ -47,6 +59,7 @@ class Constraint:
         """
         # throws index out of bounds exception
         self.constraintMap[opIndex] = (self.question.options[opIndex], block)
+        self.mark_dirty()
 
     def add_branch(self, op, block):
         """
@@ -61,6 +74,7 @@ class Constraint:
         for (i, o) in enumerate(self.question.options):
             if o == op:
                 self.constraintMap[i] = (op, block)
+                self.mark_dirty()
                 return
         raise se.NoSuchOptionException("Question %s does not contain option %s" % (self.question, op))
 
@@ -75,6 +89,7 @@ class Constraint:
         for i in range(len(self.question.options)):
             if self.question.options[i].opText == opText:
                 self.constraintMap[i] = (self.question.options[i], block)
+                self.mark_dirty()
                 return
         raise se.NoSuchOptionException("Question "+self.question.qId+" does not contain option \""+opText+'\"')
 
@@ -95,10 +110,18 @@ class Constraint:
             output = output+"\t"+str((o, b))+"\n"
         return output
 
+    def to_dict(self):
+        """
+        Returns the Constraint as a dictionary mapping option ids to block ids.
+
+        :return: A dict according to the `Constraint Schema <http://surveyman.github.io/Schemata/survey_branchMap.json>`_.
+        """
+        return {o.opId: b.blockId for (o, b) in self.constraintMap}
+
     def jsonize(self):
         """
         Returns the JSON representation of the Constraint
 
         :return: JSON representation according to the `Constraint Schema <http://surveyman.github.io/Schemata/survey_branchMap.json>`_.
         """
-        return json.dumps({o.opId: b.blockId for (o, b) in self.constraintMap})
\ No newline at end of file
+        return json.dumps(self.to_dict())
\ No newline at end of file
@@ -0,0 +1,233 @@
+import numpy as np
+from compiled import CompiledSurvey
+import questions
+
+"""
+Generates concrete survey instances: the order in which one respondent is shown the questions, and the order of each
+question's options. Instances follow the SurveyMan randomization rules:
+
+- Questions within a block are shuffled. A block's own questions come before its sub-blocks.
+- Floating blocks (randomize=True) trade places with the other floating blocks at the same level. Top level blocks that
+  branch, or that are branched to, never float, so every branch still points forward.
+- The options of a question that permits shuffling are shuffled. Ordered (likert) options keep their order, but may be
+  presented in reverse.
+
+Every question appears in an instance; branching decides at runtime which of them a respondent actually reaches.
+Instances are written into flat integer arrays, in chunks, instead of object graphs. A whole chunk is drawn at once:
+each shuffle is an argsort of a block of random keys, one row per instance.
+"""
+
+
+class InstanceChunk(object):
+    """
+    A chunk of consecutive instances.
+
+    - question_order holds num_questions question numbers per instance, in presentation order.
+    - top_order holds num_top block numbers per instance: the top level block presented at each top level position.
+      Blocks that branch or are branched to are always at their own position.
+    - option_order holds num_options entries per instance. For question q, the entries at
+      ``question_option_ptr[q]:question_option_ptr[q+1]`` of an instance are the local indices of q's options, in
+      presentation order.
+
+    All three are flat int32 numpy arrays.
+    """
+
+    __slots__ = ("start", "count", "num_questions", "num_options", "num_top", "question_order", "option_order",
+                 "top_order")
+
+    def __init__(self, start, count, num_questions, num_options, question_order, option_order, num_top=0,
+                 top_order=None):
+        self.start = start
+        self.count = count
+        self.num_questions = num_questions
+        self.num_options = num_options
+        self.num_top = num_top
+        self.question_order = question_order
+        self.option_order = option_order
+        self.top_order = np.zeros(0, np.int32) if top_order is None else top_order
+
+    def get_question_order(self, i):
+        """
+        Returns the question order of the i-th instance in this chunk.
+
+        :param i: An index into the chunk
+        :return: An array of question numbers
+        """
+        return self.question_order[i * self.num_questions:(i + 1) * self.num_questions]
+
+    def get_option_order(self, i):
+        """
+        Returns the option orders of the i-th instance in this chunk, laid out like the compiled survey's options.
+
+        :param i: An index into the chunk
+        :return: An array of local option indices
+        """
+        return self.option_order[i * self.num_options:(i + 1) * self.num_options]
+
+    def get_top_order(self, i):
+        """
+        Returns the top level block presented at each top level position in the i-th instance in this chunk.
+
+        :param i: An index into the chunk
+        :return: An array of block numbers
+        """
+        return self.top_order[i * self.num_top:(i + 1) * self.num_top]
+
+
+class InstanceGenerator(object):
+    """
+    Produces seeded, reproducible streams of survey instances. The instances drawn for a seed do not depend on the
+    chunk size.
+    """
+
+    def __init__(self, survey, seed=None):
+        """
+        Prepares the randomization plan for a survey.
+
+        :param survey: A Survey or CompiledSurvey
+        :param seed: Seed for the random number generator
+        """
+        compiled = survey if isinstance(survey, CompiledSurvey) else survey.compile()
+        self.compiled = compiled
+        self.rng = np.random.RandomState()
+        self.seed(seed)
+        c = compiled
+        nb = c.num_blocks()
+        self.block_questions = [np.array(c.block_questions[c.block_question_ptr[b]:c.block_question_ptr[b + 1]],
+                                         np.int32) for b in range(nb)]
+        self.block_children = [np.array(c.block_children[c.block_child_ptr[b]:c.block_child_ptr[b + 1]], np.int32)
+                               for b in range(nb)]
+        self.top_blocks = np.array(c.top_blocks, np.int32)
+        # blocks in preorder, so that a block is laid out before its children
+        self.preorder = []
+        stack = list(reversed(c.top_blocks))
+        while stack:
+            b = stack.pop()
+            self.preorder.append(b)
+            stack.extend(reversed(self.block_children[b].tolist()))
+        self.subtree_size = np.zeros(nb, np.int64)
+        for b in reversed(self.preorder):
+            self.subtree_size[b] = len(self.block_questions[b]) + self.subtree_size[self.block_children[b]].sum()
+        # every shuffle reads its own columns of one row of random keys per instance
+        self.num_keys = 0
+        # top level blocks that branch or are branched to keep their positions
+        pinned = set(c.option_target[o] for o in range(c.num_options()) if c.option_target[o] >= 0)
+        pinned.update(c.top_blocks[p] for p in range(c.end) if c.block_exit[c.top_blocks[p]] != -1)
+        self.top_slots = self.__slots([i for (i, b) in enumerate(c.top_blocks)
+                                       if c.block_randomize[b] and b not in pinned])
+        self.question_keys = [self.__keys(len(qs)) for qs in self.block_questions]
+        self.child_slots = [self.__slots([i for (i, sb) in enumerate(children) if c.block_randomize[sb]])
+                            for children in self.block_children]
+        # (offset, size, reversible, key columns) for each question whose options may move
+        self.option_groups = []
+        for q in range(c.num_questions()):
+            lo, hi = c.question_option_ptr[q], c.question_option_ptr[q + 1]
+            if c.question_shuffle[q] and hi - lo > 1:
+                reversible = c.question_types[q] == questions.__likert__
+                self.option_groups.append((lo, hi - lo, reversible, self.__keys(1, 1) if reversible else self.__keys(hi - lo)))
+        self.identity = np.array([i for q in range(c.num_questions())
+                                  for i in range(c.question_option_ptr[q + 1] - c.question_option_ptr[q])], np.int32)
+
+    def seed(self, seed=None):
+        """
+        Reseeds the random number generator.
+
+        :param seed: An int of any size, or None to seed from the operating system
+        """
+        if seed is not None:
+            seed, words = abs(seed), []
+            while True:
+                words.append(seed & 0xffffffff)
+                seed >>= 32
+                if not seed:
+                    break
+            seed = np.array(words, np.uint32)
+        self.rng.seed(seed)
+
+    def __keys(self, size, least=2):
+        """Reserves size columns of random keys, if there are at least least of them."""
+        if size < least:
+            return None
+        cols = slice(self.num_keys, self.num_keys + size)
+        self.num_keys += size
+        return cols
+
+    def __slots(self, slots):
+        """Pairs the slots of a floating set with their key columns."""
+        cols = self.__keys(len(slots))
+        return None if cols is None else (np.array(slots, np.intp), cols)
+
+    @staticmethod
+    def __float(order, slots, keys):
+        """Shuffles the columns of order at the given slots among themselves, row by row."""
+        if slots is not None:
+            (idx, cols) = slots
+            rows = np.arange(len(order))[:, None]
+            order[:, idx] = order[rows, idx[np.argsort(keys[:, cols], axis=1)]]
+
+    def __question_order(self, keys, question_order, top_order):
+        """Writes the question and top level block orders of a chunk, given its random keys."""
+        count = len(keys)
+        rows = np.arange(count)[:, None]
+        top_order[:] = self.top_blocks
+        self.__float(top_order, self.top_slots, keys)
+        # the position of each block's first question, per instance
+        offset = np.zeros((count, len(self.block_questions)), np.int64)
+        sizes = self.subtree_size[top_order]
+        offset[rows, top_order] = np.cumsum(sizes, axis=1) - sizes
+        for b in self.preorder:
+            qs, children, base = self.block_questions[b], self.block_children[b], offset[:, b:b + 1]
+            if len(qs):
+                cols = self.question_keys[b]
+                shuffled = qs[np.argsort(keys[:, cols], axis=1)] if cols is not None else qs
+                question_order[rows, base + np.arange(len(qs))] = shuffled
+            if len(children):
+                order = np.tile(children, (count, 1))
+                self.__float(order, self.child_slots[b], keys)
+                sizes = self.subtree_size[order]
+                offset[rows, order] = base + len(qs) + np.cumsum(sizes, axis=1) - sizes
+
+    def __option_order(self, keys, option_order):
+        """Writes the option orders of a chunk, given its random keys."""
+        option_order[:] = self.identity
+        for (offset, size, reversible, cols) in self.option_groups:
+            if reversible:
+                flip = keys[:, cols.start] < 0.5
+                option_order[flip, offset:offset + size] = np.arange(size - 1, -1, -1)
+            else:
+                option_order[:, offset:offset + size] = np.argsort(keys[:, cols], axis=1)
+
+    def generate(self, n, chunk_size=10000):
+        """
+        Generates n instances, yielding them in chunks of at most chunk_size.
+
+        :param n: The number of instances
+        :param chunk_size: The largest number of instances held in memory at once
+        :return: A generator of InstanceChunks
+        """
+        c = self.compiled
+        nq, no, nt = c.num_questions(), c.num_options(), len(self.top_blocks)
+        for start in range(0, n, chunk_size):
+            count = min(chunk_size, n - start)
+            # keys are drawn row by row, so instance i gets the same row whatever the chunk size
+            keys = self.rng.random_sample((count, self.num_keys))
+            question_order = np.empty((count, nq), np.int32)
+            option_order = np.empty((count, no), np.int32)
+            top_order = np.empty((count, nt), np.int32)
+            self.__question_order(keys, question_order, top_order)
+            self.__option_order(keys, option_order)
+            yield InstanceChunk(start, count, nq, no, question_order.ravel(), option_order.ravel(), c.end,
+                                top_order.ravel())
+
+
+def generate_instances(survey, n, seed=None, chunk_size=10000):
+    """
+    Generates n randomized instances of a survey. See InstanceGenerator.
+
+    :param survey: A Survey or CompiledSurvey
+    :param n: The number of instances
+    :param seed: Seed for the random number generator
+    :param chunk_size: The largest number of instances held in memory at once
+    :return: A generator of InstanceChunks
+    """
+    return InstanceGenerator(survey, seed).generate(n, chunk_size)
@@ -1,10 +1,76 @@
 import json
+import multiprocessing
 from abc import ABCMeta
+from collections import OrderedDict
 from tidylib import tidy_fragment
 import __ids__
 from surveyman.survey.survey_exceptions import HTMLValidationException
 
 __opGen__ = __ids__.IdGenerator("comp_")
+__html_cache__ = OrderedDict()
+__html_cache_size__ = 4096
+
+
+def __tidy_errors(op_html):
+    """
+    Runs tidy over op_html wrapped in a full document and returns its error report. Markup without tags or entities
+    cannot produce errors, so it is not sent to tidy at all.
+
+    :param op_html: The string representation of the option HTML.
+    :return: The errors reported by tidy, as a string
+    """
+    if "<" not in op_html and "&" not in op_html:
+        return ""
+    document, errors = tidy_fragment("<!DOCTYPE html><html><head><title></title><body>%s</body></html>" % op_html)
+    return errors
+
+
+def __cache_errors(op_html, errors):
+    __html_cache__[op_html] = errors
+    if len(__html_cache__) > __html_cache_size__:
+        __html_cache__.popitem(last=False)
+
+
+def html_errors(op_html):
+    """
+    Returns the errors tidy reports for op_html. Results are kept in a least-recently-used cache keyed by the markup,
+    so repeated option text is only validated once.
+
+    :param op_html: The string representation of the option HTML.
+    :return: The errors reported by tidy, as a string; empty if the markup is valid
+    """
+    try:
+        errors = __html_cache__.pop(op_html)
+    except KeyError:
+        errors = __tidy_errors(op_html)
+    __cache_errors(op_html, errors)
+    return errors
+
+
+def validate_html_options(texts, processes=1):
+    """
+    Validates a list of option texts at once and fills the cache used by HTMLOption, so that building options from
+    these texts afterwards does not run tidy again. When processes is greater than one, markup that is not already
+    cached is validated on a pool of that many worker processes.
+
+    :param texts: A list of strings
+    :param processes: The number of worker processes to use
+    :return: A list of booleans, True where the text is valid HTML
+    """
+    pending = list(OrderedDict.fromkeys(t for t in texts if t not in __html_cache__))
+    if processes > 1 and len(pending) > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(__tidy_errors, pending, chunksize=max(1, len(pending) // (4 * processes)))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [__tidy_errors(t) for t in pending]
+    found = dict(zip(pending, results))
+    for (t, errors) in found.items():
+        __cache_errors(t, errors)
+    return [len(found[t] if t in found else html_errors(t)) <= 1 for t in texts]
 
 
 class Option:
@@ -16,17 +82,19 @@ class Option:
     """
 
     __metaclass__ = ABCMeta
+    __slots__ = ("opText", "opId")
 
-    def __init__(self, op_text):
+    def __init__(self, op_text, op_id=None):
         """
         Creates an Option object with a unique id and the specified option text
         :param op_text:  The text to display (may be HTML)
+        :param op_id: An id that has already been generated for this option; a new one is generated by default.
         :return:
         """
         # initialize option text field
         self.opText = op_text
         # generate id for option
-        self.opId = __opGen__.generateID()
+        self.opId = __opGen__.generateID() if op_id is None else op_id
 
     def __eq__(self, other):
         """
@@ -36,13 +104,21 @@ class Option:
         """
         return isinstance(other, Option) and self.opId == other.opId
 
+    def to_dict(self):
+        """
+        Returns the option as a dictionary, ready to be encoded as JSON.
+
+        :return: A dict according to the `Option Schema <http://surveyman.github.io/Schemata/survey_option.json>`_
+        """
+        return {"id": self.opId, "otext": self.opText}
+
     def jsonize(self):
         """
         Returns the JSON representation of the option
 
         :return: A JSON object according to the `Option Schema <http://surveyman.github.io/Schemata/survey_option.json>`_
         """
-        return json.dumps({"id": self.opId, "otext": self.opText})
+        return json.dumps(self.to_dict())
 
     def __str__(self):
         return self.opId+": "+self.opText
@@ -52,13 +128,15 @@ class TextOption(Option):
     """
     This is a strictly text option. It inherits all of its behavior from Option.
     """
-    pass
+    __slots__ = ()
 
 
 class HTMLOption(Option):
     """
     This option contains HTML, which this class validates.
     """
+    __slots__ = ()
+
     def __init__(self, op_html):
         """
         Intializes this option with HTML. The HTML is validated before initializing the option.
@@ -69,10 +147,129 @@ class HTMLOption(Option):
         :return:
         """
 
-        document, errors = tidy_fragment("<!DOCTYPE html><html><head><title></title><body>%s</body></html>" % op_html)
+        errors = html_errors(op_html)
         # python is stupid
         if len(errors) > 1:
             print errors
             raise HTMLValidationException()
         else:
-            Option.__init__(self, op_html)
\ No newline at end of file
+            Option.__init__(self, op_html)
+
+
+class OptionTable(object):
+    """
+    A compact stand-in for a question's list of Options, for questions with very many options such as scales.
+    The option texts are kept in one list and the option ids in one contiguous buffer, instead of one Option object per
+    choice. Indexing or iterating over the table returns TextOption views, which are only built when accessed and which
+    compare equal to each other by id.
+    """
+
+    __slots__ = ("texts", "__ids", "__stride")
+
+    def __init__(self, texts):
+        """
+        Creates an OptionTable holding one option per text, reserving all of their ids at once.
+
+        :param texts: An iterable of option texts
+        """
+        self.texts = list(texts)
+        self.__stride = None
+        self.__ids = bytearray()
+        # reserve ids in chunks, so that they are never all held as separate strings at once
+        for start in range(0, len(self.texts), 4096):
+            ids = __opGen__.reserveIDs(min(4096, len(self.texts) - start))
+            if self.__stride is None:
+                self.__stride = len(ids[0])
+            if any(len(i) != self.__stride for i in ids):
+                raise ValueError("OptionTable ids must all have length %d" % self.__stride)
+            self.__ids.extend("".join(ids))
+
+    def __check_id(self, op_id):
+        if self.__stride is None:
+            self.__stride = len(op_id)
+        elif len(op_id) != self.__stride:
+            raise ValueError("OptionTable ids must all have length %d; got %s" % (self.__stride, op_id))
+
+    def __position(self, index):
+        if index < 0:
+            index += len(self.texts)
+        if not 0 <= index < len(self.texts):
+            raise IndexError("OptionTable index out of range")
+        return index
+
+    def get_id(self, index):
+        """
+        Returns the id of the option at the given index, without building a view.
+
+        :param index: The option's index
+        :return: The option id
+        """
+        index = self.__position(index)
+        return str(self.__ids[index * self.__stride:(index + 1) * self.__stride])
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.texts)))]
+        index = self.__position(index)
+        return TextOption(self.texts[index], op_id=self.get_id(index))
+
+    def __iter__(self):
+        for i in range(len(self.texts)):
+            yield self[i]
+
+    def __contains__(self, o):
+        try:
+            self.index(o)
+            return True
+        except ValueError:
+            return False
+
+    def index(self, o):
+        """
+        Returns the index of the option with the same id as o.
+        Raises a ValueError if the table does not contain o.
+
+        :param o: An Option
+        :return: An int
+        """
+        if isinstance(o, Option) and self.__stride is not None and len(o.opId) == self.__stride:
+            start = self.__ids.find(o.opId)
+            while start != -1:
+                if start % self.__stride == 0:
+                    return start // self.__stride
+                start = self.__ids.find(o.opId, start + 1)
+        raise ValueError("%s is not in the OptionTable" % o)
+
+    def append(self, o):
+        """
+        Adds o to the end of the table, keeping its text and id.
+
+        :param o: An Option
+        """
+        self.__check_id(o.opId)
+        self.texts.append(o.opText)
+        self.__ids.extend(o.opId)
+
+    def insert(self, index, o):
+        """
+        Inserts o at the desired index in the table, keeping its text and id.
+
+        :param index: The target index
+        :param o: An Option
+        """
+        self.__check_id(o.opId)
+        index = max(0, min(index + len(self.texts) if index < 0 else index, len(self.texts)))
+        self.texts.insert(index, o.opText)
+        self.__ids[index * self.__stride:index * self.__stride] = o.opId
+
+    def to_dict(self):
+        """
+        Returns the options as a list of dictionaries, without building any views.
+
+        :return: A list of dicts according to the `Option Schema <http://surveyman.github.io/Schemata/survey_option.json>`_
+        """
+        ids, stride = str(self.__ids), self.__stride
+        return [{"id": ids[i:i + stride], "otext": t} for (i, t) in zip(range(0, len(ids), stride or 1), self.texts)]
@@ -28,11 +28,28 @@ qTypes = [__likert__, __checkbox__, __oneof__, __instruction__, __freetext__]
 """
 
 
-class Question:
+def get_freetext_value(question):
+    """
+    Returns the value of the freetext field in the JSON representation of a question.
+
+    :param question: A Question
+    :return: True, a default string, a regular expression of the form "#{pattern}", or None if there is no value
+    """
+    if (type(question.freetext) is bool and question.freetext) or type(question.freetext) is str:
+        return question.freetext
+    elif type(question.freetext) is type(re.compile("")):
+        return str("#{%s}" % question.freetext.pattern)
+    return None
+
+
+class Question(object):
     """
     Contains the components of a survey question. SurveyMan presents questions one at a time.
     """
 
+    __slots__ = ("qId", "qType", "qText", "shuffle", "branching", "branch_map", "__block", "breakoff", "freetext",
+                 "options")
+
     def __init__(self, qType, qText, options=[], shuffle=True, freetext=None, breakoff=True):
         """
         Creates a Question object with a unique id.
@@ -42,7 +59,8 @@ class Question:
 
         :param qType: One of "likert", "checkbox", "oneof", "freetext", or "instructional"
         :param qText: The text to display
-        :param options: The list of options associated with this question, if applicable.
+        :param options: The list of options associated with this question, if applicable. An OptionTable may be used
+            in place of the list.
         :param shuffle: Boolean to permit shuffling.
         :param freetext: Boolean, regular expression, or default string. Only use this if qType is "freetext"
         :param breakoff: Boolean indicating whether breakoff is permitted at this question.
@@ -61,12 +79,34 @@ class Question:
         self.shuffle = shuffle
         self.branching = False
         self.branch_map = None
-        self.block = blocks.Block(contents=[self])
+        self.__block = None
         self.breakoff = breakoff
         self.freetext = freetext
         self.options = options
         assert (freetext is not True or len(self.options) == 0)
 
+    @property
+    def block(self):
+        """
+        The block containing this question. A question that has not been added to a block gets a block of its own the
+        first time one is needed, e.g. when it is used as a branch target.
+        """
+        if self.__block is None:
+            blocks.Block(contents=[self])
+        return self.__block
+
+    @block.setter
+    def block(self, block):
+        self.__block = block
+
+    def has_block(self):
+        """
+        Returns True if this question has been placed in a block, without creating one.
+
+        :return: Boolean
+        """
+        return self.__block is not None
+
     def add_option(self, o):
         """
         Adds o to the end of the question's option list. If type(o) is 'str', then this function creates an Option with
@@ -125,11 +165,11 @@ class Question:
         return "Question(%s, %s, options=[%s], shuffle=%b, freetext=%s, breakoff=%b)" % (
             self.qType, self.qText, ",".join(self.options), self.shuffle, self.freetext, self.breakoff)
 
-    def jsonize(self):
+    def to_dict(self):
         """
-        Returns JSON representation of the question
+        Returns the question and its options as a dictionary, ready to be encoded as JSON.
 
-        :return: A JSON object according to the `Question Schema <http://surveyman.github.io/Schemata/survey_question.json>`_.
+        :return: A dict according to the `Question Schema <http://surveyman.github.io/Schemata/survey_question.json>`_.
         """
         __id__ = "id"
         __qtext__ = "qtext"
@@ -145,24 +185,34 @@ class Question:
         output = {__id__: self.qId, __qtext__: self.qText, __permitBreakoff__: self.breakoff}
 
         if self.qType is __instruction__:
-            return json.dumps(output)
+            return output
 
         if self.qType is __freetext__:
-            if (type(self.freetext) is bool and self.freetext) or type(self.freetext) is str:
-                output[__freetext_key__] = self.freetext
-            elif type(self.freetext) is type(re.compile("")):
-                output[__freetext_key__] = str("#{%s}" % self.freetext.pattern)
-            return json.dumps(output)
+            freetext = get_freetext_value(self)
+            if freetext is not None:
+                output[__freetext_key__] = freetext
+            return output
 
-        output[__options__] = [json.loads(o.jsonize()) for o in self.options]
+        if isinstance(self.options, options.OptionTable):
+            output[__options__] = self.options.to_dict()
+        else:
+            output[__options__] = [o.to_dict() for o in self.options]
         output[__randomize__] = self.shuffle
         output[__ordered__] = self.qType is __likert__
         output[__exclusive__] = self.qType in [__likert__, __oneof__]
 
         if self.branch_map is not None:
-            output[__branchMap__] = json.loads(self.branch_map.jsonize())
+            output[__branchMap__] = self.branch_map.to_dict()
+
+        return output
+
+    def jsonize(self):
+        """
+        Returns JSON representation of the question
 
-        return json.dumps(output)
+        :return: A JSON object according to the `Question Schema <http://surveyman.github.io/Schemata/survey_question.json>`_.
+        """
+        return json.dumps(self.to_dict())
 
 
 class Instruction(Question):
@@ -170,6 +220,8 @@ class Instruction(Question):
     Instructional convenience class
     """
 
+    __slots__ = ()
+
     def __init__(self, qText):
         Question.__init__(self, __instruction__, qText)
 
@@ -179,6 +231,8 @@ class FreeText(Question):
     Freetext convenience class
     """
 
+    __slots__ = ()
+
     def __init__(self, qText, regex=None, default=None):
         """
         Convenient initialization of a Freetext question. Freetext questions cannot have both regular expressions and
@@ -208,6 +262,8 @@ class RadioButtonQuestion(Question):
     """ Convenience class for radio button questions.
     """
 
+    __slots__ = ()
+
     def __init__(self, qText, options=[]):
         Question.__init__(self, __oneof__, qText, options, shuffle=True, freetext=False, breakoff=True)
 
@@ -0,0 +1,381 @@
+import bisect
+import csv
+import hashlib
+import json
+import multiprocessing
+import random
+from array import array
+import blocks
+from compiled import CompiledSurvey
+from instances import InstanceGenerator
+
+"""
+Simulates respondents taking a survey the way the SurveyMan runtime presents it. Each respondent is shown a randomized
+instance (see :mod:`instances`): floating blocks, shuffled questions and shuffled options. Top level blocks are
+presented in order; when a block is done, the respondent moves to the block its branch question sends them to, or to
+the next block. In a branch-one block, the branch question decides; in a branch-all block, the last branch question
+answered decides. Options that branch to NEXT, or that do not branch, lead to the next block. At any question that
+permits breakoff (in a survey that permits it), the respondent may quit.
+
+How respondents answer is up to a respondent model (see Respondent). Results are written into flat integer arrays, in
+chunks, and can be written out as HIT results with write_hits, along with the survey's source csv with write_csv.
+"""
+
+MISSING = -1
+"""Entry for questions a respondent did not answer."""
+
+
+class Respondent(object):
+    """
+    The base respondent model: answers uniformly at random, and breaks off with probability breakoff at every question
+    where breakoff is permitted. Models override choose and breaks_off; prepare is called once with the compiled survey
+    before any respondent is simulated.
+    """
+
+    def __init__(self, breakoff=0.0):
+        self.breakoff = breakoff
+
+    def prepare(self, compiled):
+        pass
+
+    def breaks_off(self, question, qpos, rng):
+        """
+        Decides whether to quit instead of answering a question.
+
+        :param question: The question number
+        :param qpos: The number of questions shown so far
+        :param rng: A random.Random
+        :return: True to quit
+        """
+        return self.breakoff > 0 and rng.random() < self.breakoff
+
+    def choose(self, question, shown, rng):
+        """
+        Chooses an option of a question.
+
+        :param question: The question number
+        :param shown: The local indices of the question's options, in presentation order
+        :param rng: A random.Random
+        :return: The position in shown of the chosen option
+        """
+        return int(rng.random() * len(shown))
+
+
+class PositionRespondent(Respondent):
+    """
+    A lazy respondent who always chooses the option presented at the same position, counting from the end for negative
+    positions.
+    """
+
+    def __init__(self, position=0, breakoff=0.0):
+        Respondent.__init__(self, breakoff)
+        self.position = position
+
+    def choose(self, question, shown, rng):
+        if self.position < 0:
+            return max(len(shown) + self.position, 0)
+        return min(self.position, len(shown) - 1)
+
+
+class ProfileRespondent(Respondent):
+    """
+    A respondent who chooses options by content: each option is chosen with probability proportional to its weight.
+    Options missing from weights have weight default.
+    """
+
+    def __init__(self, weights, default=1.0, breakoff=0.0):
+        Respondent.__init__(self, breakoff)
+        self.weights = weights
+        self.default = default
+        self.cumulative = None
+
+    def prepare(self, compiled):
+        self.cumulative = []
+        for q in range(compiled.num_questions()):
+            total, sums = 0.0, []
+            for o in compiled.question_options(q):
+                total += self.weights.get(compiled.option_ids[o], self.default)
+                sums.append(total)
+            self.cumulative.append(sums)
+
+    def choose(self, question, shown, rng):
+        sums = self.cumulative[question]
+        local = bisect.bisect_right(sums, rng.random() * sums[-1])
+        return list(shown).index(min(local, len(sums) - 1))
+
+
+class ResponseChunk(object):
+    """
+    A chunk of consecutive simulated respondents. answers, qpos and opos hold num_questions entries per respondent,
+    indexed by question number: the local index of the chosen option, the position the question was shown at, and the
+    position the chosen option was shown at, or MISSING for questions the respondent did not answer. model holds the
+    index of each respondent's model, and broke_off whether they quit before the end of the survey.
+    """
+
+    __slots__ = ("start", "count", "num_questions", "answers", "qpos", "opos", "model", "broke_off")
+
+    def __init__(self, start, count, num_questions, answers, qpos, opos, model, broke_off):
+        self.start = start
+        self.count = count
+        self.num_questions = num_questions
+        self.answers = answers
+        self.qpos = qpos
+        self.opos = opos
+        self.model = model
+        self.broke_off = broke_off
+
+    def get_answers(self, i):
+        """
+        Returns the answers of the i-th respondent in this chunk.
+
+        :param i: An index into the chunk
+        :return: (answers, qpos, opos) arrays indexed by question number
+        """
+        lo, hi = i * self.num_questions, (i + 1) * self.num_questions
+        return self.answers[lo:hi], self.qpos[lo:hi], self.opos[lo:hi]
+
+
+def chunk_seed(seed, index):
+    """Derives the seed of one random stream of a simulation from the simulation's seed"""
+    return int(hashlib.sha256("%d:%d" % (seed, index)).hexdigest(), 16)
+
+
+class Simulator(object):
+    """
+    Simulates respondents in seeded, reproducible chunks: the chunk starting at a given respondent depends only on the
+    seed, the chunk size and the chunk's index, so chunks can be simulated in any order or process.
+    """
+
+    def __init__(self, survey, models, seed=None):
+        """
+        Prepares a survey and its respondent models.
+
+        :param survey: A Survey or CompiledSurvey
+        :param models: A Respondent, or a list of (weight, Respondent) pairs that respondents are drawn from
+        :param seed: An int seed for the random number generators
+        """
+        c = survey if isinstance(survey, CompiledSurvey) else survey.compile()
+        self.compiled = c
+        if isinstance(models, Respondent):
+            models = [(1.0, models)]
+        self.models = [m for (_, m) in models]
+        total, self.model_weights = 0.0, []
+        for (w, _) in models:
+            total += w
+            self.model_weights.append(total)
+        for m in self.models:
+            m.prepare(c)
+        self.seed = random.SystemRandom().getrandbits(64) if seed is None else seed
+        self.instances = InstanceGenerator(c)
+        self.top_lengths = [len(c.subtree_questions(b)) if c.block_parent[b] == -1 else 0
+                            for b in range(c.num_blocks())]
+        self.may_break_off = [bool(c.breakoff and c.question_breakoff[q]) for q in range(c.num_questions())]
+        self.exits = [c.block_exit[b] for b in range(c.num_blocks())]
+        self.branch_all = [p == blocks.__branch_all__ for p in c.block_policy]
+
+    def __respond(self, model, instances, i, rng, answers, qpos, opos):
+        """Simulates one respondent on the i-th instance of a chunk, writing into the output arrays at their row."""
+        c = self.compiled
+        nq, no = c.num_questions(), c.num_options()
+        question_order, option_order = instances.question_order, instances.option_order
+        option_ptr, option_dst, branching = c.question_option_ptr, c.option_dst, c.question_branching
+        row, qbase, obase = len(answers) - nq, i * nq, i * no
+        tops = instances.get_top_order(i)
+        starts = [0]
+        for b in tops:
+            starts.append(starts[-1] + self.top_lengths[b])
+        shown = 0
+        position = 0
+        while position < c.end:
+            b = tops[position]
+            exit_q, branch_all = self.exits[b], self.branch_all[b]
+            dst = -1
+            for k in range(starts[position], starts[position + 1]):
+                q = question_order[qbase + k]
+                if self.may_break_off[q] and model.breaks_off(q, shown, rng):
+                    return True
+                lo, hi = option_ptr[q], option_ptr[q + 1]
+                if hi > lo:
+                    order = option_order[obase + lo:obase + hi]
+                    p = model.choose(q, order, rng)
+                    o = order[p]
+                    answers[row + q], qpos[row + q], opos[row + q] = o, shown, p
+                    if branching[q] and (branch_all or q == exit_q):
+                        dst = option_dst[lo + o]
+                shown += 1
+            position = dst if dst != -1 else position + 1
+        return False
+
+    def chunk(self, index, chunk_size, n):
+        """
+        Simulates the index-th chunk of at most chunk_size respondents, out of n.
+
+        :param index: The chunk number
+        :param chunk_size: The number of respondents per chunk
+        :param n: The total number of respondents
+        :return: A ResponseChunk
+        """
+        start = index * chunk_size
+        count = min(chunk_size, n - start)
+        nq = self.compiled.num_questions()
+        self.instances.seed(chunk_seed(self.seed, 2 * index))
+        rng = random.Random(chunk_seed(self.seed, 2 * index + 1))
+        instances = next(self.instances.generate(count, count))
+        # the respondents below read one entry at a time, which is much faster from lists than from numpy arrays
+        instances.question_order = instances.question_order.tolist()
+        instances.option_order = instances.option_order.tolist()
+        instances.top_order = instances.top_order.tolist()
+        answers, qpos, opos = array("i"), array("i"), array("i")
+        model, broke_off = array("i"), array("b")
+        blank = array("i", [MISSING] * nq)
+        for i in range(count):
+            m = bisect.bisect_right(self.model_weights, rng.random() * self.model_weights[-1])
+            m = min(m, len(self.models) - 1)
+            answers.extend(blank)
+            qpos.extend(blank)
+            opos.extend(blank)
+            model.append(m)
+            broke_off.append(self.__respond(self.models[m], instances, i, rng, answers, qpos, opos))
+        return ResponseChunk(start, count, nq, answers, qpos, opos, model, broke_off)
+
+
+__worker__ = {}
+
+
+def __init_worker(simulator):
+    __worker__["simulator"] = simulator
+
+
+def __chunk_in_worker(args):
+    (index, chunk_size, n) = args
+    return __worker__["simulator"].chunk(index, chunk_size, n)
+
+
+def simulate(survey, models, n, seed=None, chunk_size=10000, processes=1):
+    """
+    Simulates n respondents taking a survey. See Simulator.
+
+    :param survey: A Survey or CompiledSurvey
+    :param models: A Respondent, or a list of (weight, Respondent) pairs
+    :param n: The number of respondents
+    :param seed: An int seed; the responses depend on it and on chunk_size, but not on processes
+    :param chunk_size: The largest number of respondents held in memory at once, per process
+    :param processes: The number of worker processes; below 1 means one per CPU
+    :return: A generator of ResponseChunks, in order
+    """
+    simulator = Simulator(survey, models, seed)
+    tasks = [(index, chunk_size, n) for index in range((n + chunk_size - 1) // chunk_size)]
+    if processes < 1:
+        processes = multiprocessing.cpu_count()
+    if processes == 1 or len(tasks) < 2:
+        for (index, size, total) in tasks:
+            yield simulator.chunk(index, size, total)
+        return
+    # workers are forked with the simulator, so it is not pickled
+    pool = multiprocessing.Pool(processes, __init_worker, (simulator,))
+    try:
+        for chunk in pool.imap(__chunk_in_worker, tasks):
+            yield chunk
+    finally:
+        pool.close()
+        pool.join()
+
+
+hit_headers = ["HitId", "HitTitle", "Annotation", "AssignmentId", "WorkerId", "Status", "AcceptTime", "SubmitTime"]
+
+csv_headers = ["Block", "Question", "Options"]
+"""The columns of the source csv written by write_csv."""
+
+
+def component_id(row, column):
+    """Returns the id the runtime gives the cell at a row and (1-indexed) column of a source csv"""
+    return "comp_%d_%d" % (row, column)
+
+
+def __block_labels(c):
+    """Returns the dotted SurveyMan csv name of every block, e.g. 2.1 for the first sub-block of the second block"""
+    labels = [None] * c.num_blocks()
+    for (position, b) in enumerate(c.top_blocks):
+        labels[b] = str(position + 1)
+    # blocks are numbered depth first, so parents are labelled before their children
+    for b in range(c.num_blocks()):
+        children = c.block_children[c.block_child_ptr[b]:c.block_child_ptr[b + 1]]
+        for (k, child) in enumerate(children):
+            labels[child] = "%s.%d" % (labels[b], k + 1)
+    return labels
+
+
+def source_rows(survey):
+    """
+    Numbers the rows of the source csv written by write_csv. Rows count from 1, as in component ids, so the header is
+    row 1. Each question takes one row per option, and one row if it has none.
+
+    :param survey: A Survey or CompiledSurvey
+    :return: (question_rows, option_rows) lists: the first row of each question, and the row of each option
+    """
+    c = survey if isinstance(survey, CompiledSurvey) else survey.compile()
+    question_rows, option_rows, row = [], [], 2
+    for q in range(c.num_questions()):
+        question_rows.append(row)
+        n = len(c.question_options(q))
+        option_rows.extend(range(row, row + n))
+        row += max(n, 1)
+    return question_rows, option_rows
+
+
+def write_csv(survey, fp):
+    """
+    Writes a survey's questions and options as a SurveyMan source csv, in question number order. This is the csv that
+    the component ids in write_hits refer to. Branching and block randomization are not written.
+
+    :param survey: A Survey or CompiledSurvey
+    :param fp: A file to write to
+    """
+    c = survey if isinstance(survey, CompiledSurvey) else survey.compile()
+    labels = __block_labels(c)
+    writer = csv.writer(fp)
+    writer.writerow(csv_headers)
+    for q in range(c.num_questions()):
+        block = labels[c.question_block[q]]
+        # a row with an empty question continues the question above, so every question needs text
+        text = c.question_texts[q] or c.question_ids[q]
+        options = [c.option_texts[o] for o in c.question_options(q)] or [""]
+        for (k, option) in enumerate(options):
+            writer.writerow([block, text if k == 0 else "", option])
+
+
+def write_hits(survey, chunks, fp, hit_id="simulated"):
+    """
+    Writes simulated responses as a HIT results csv: the HIT columns, followed by one column per question. Answer cells
+    hold the answer as the runtime submits it, {"quid": ..., "oid": ..., "qpos": ..., "opos": ...}; questions that were
+    not answered are left empty. Each respondent gets its own assignment and worker id.
+
+    Like the runtime's, the quids and oids are component ids of the survey's source csv: the one write_csv writes. The
+    results can be read back with that csv by the evaluation loader.
+
+    :param survey: The Survey or CompiledSurvey the responses were simulated for
+    :param chunks: ResponseChunks, e.g. from simulate
+    :param fp: A file to write to
+    :param hit_id: The HitId of every row
+    """
+    c = survey if isinstance(survey, CompiledSurvey) else survey.compile()
+    nq = c.num_questions()
+    (question_rows, option_rows) = source_rows(c)
+    question_column, option_column = csv_headers.index("Question") + 1, csv_headers.index("Options") + 1
+    quids = [component_id(row, question_column) for row in question_rows]
+    oids = [component_id(row, option_column) for row in option_rows]
+    writer = csv.writer(fp)
+    writer.writerow(hit_headers + quids)
+    for chunk in chunks:
+        for i in range(chunk.count):
+            (answers, qpos, opos) = chunk.get_answers(i)
+            name = "sim%d" % (chunk.start + i)
+            row = [hit_id, c.survey_id, "", "A" + name, "W" + name, "Submitted", "", ""]
+            for q in range(nq):
+                if answers[q] == MISSING:
+                    row.append("")
+                else:
+                    oid = oids[c.question_option_ptr[q] + answers[q]]
+                    row.append(json.dumps({"quid": quids[q], "oid": oid, "qpos": qpos[q], "opos": opos[q]},
+                                          sort_keys=True))
+            writer.writerow(row)
@@ -2,6 +2,7 @@ __author__ = "mmcmahon13"
 
 import json
 from .blocks import get_farthest_ancestor, NEXTBLOCK, NEXT
+from .compiled import compile_survey
 from __ids__ import *
 from .survey_exceptions import *
 
@@ -27,12 +28,61 @@ class Survey:
         """
         # generate ID
         self.surveyID = __surveyGen__.generateID()
+        # the survey's components were drawn from the current namespace; the next survey's come from a new one
+        new_namespace()
         # survey is a list of blocks, which hold questions and subblocks
         # at least one block with all the questions in it
         self.blockList = blocklist
         # list of branching constraints
         self.constraints = constraints
         self.hasBreakoff = breakoff
+        # maps id(block) to the block's position in the top level block list
+        self.__positions = {}
+        # the blocks the positions were computed for, in order, and a counter bumped whenever the block list was found
+        # to have been modified directly, which may reorder or replace blocks
+        self.__indexed = []
+        self.__order_version = 0
+        # maps id(block) and id(constraint) to the stamp they had when they last passed validation
+        self.__valid_blocks = {}
+        self.__valid_constraints = {}
+        self.__index_blocks(0)
+
+    def __index_blocks(self, start):
+        """
+        Records the top level positions of the blocks in the block list, starting at index start.
+
+        :param start: The first index whose position needs updating
+        """
+        del self.__indexed[start:]
+        for i in range(start, len(self.blockList)):
+            self.__positions[id(self.blockList[i])] = i
+            self.__indexed.append(self.blockList[i])
+
+    def __sync_positions(self):
+        """Rebuilds the position index if the block list was modified directly, e.g. reordered or a block replaced."""
+        if len(self.__indexed) != len(self.blockList) or \
+                any(a is not b for (a, b) in zip(self.__indexed, self.blockList)):
+            self.__positions = {}
+            self.__index_blocks(0)
+            self.__order_version += 1
+
+    def get_block_position(self, block):
+        """
+        Returns the position of a top level block in the survey's block list.
+        Raises a NoSuchBlockException if the block is not at the top level of this survey.
+
+        :param block: A top level block
+        :return: An int
+        """
+        self.__sync_positions()
+        return self.__position(block)
+
+    def __position(self, block):
+        """Returns the position of a top level block, assuming the position index is up to date."""
+        try:
+            return self.__positions[id(block)]
+        except KeyError:
+            raise NoSuchBlockException("Block %s not in survey block list." % block)
 
     def add_block(self, block):
         """
@@ -40,7 +90,9 @@ class Survey:
 
         :param block: The block to add
         """
+        # a direct modification made before this is still caught by the next sync, since only the new position is indexed
         self.blockList.append(block)
+        self.__index_blocks(len(self.blockList) - 1)
 
     def add_block_by_index(self, block, index):
         """
@@ -50,7 +102,11 @@ class Survey:
         :param block: The block to add to the top level of the survey
         :param index: The index at which the block should be added
         """
+        self.__sync_positions()
         self.blockList.insert(index, block)
+        # inserting keeps the relative order of the other blocks, so only the positions after index change, and
+        # branches that were valid stay valid
+        self.__index_blocks(0 if index < 0 else min(index, len(self.blockList) - 1))
 
     def validate(self):
         """
@@ -60,29 +116,56 @@ class Survey:
         -all branch questions branch to top-level blocks in the survey's blocklist
         -all branches branch forward
         An exception is thrown if any of these conditions are violated
+
+        Only blocks and constraints that have been edited since they last passed validation are checked again. If the
+        block list was modified directly rather than through add_block or add_block_by_index, every constraint is
+        checked again.
         """
+        self.__sync_positions()
         # check that all blocks are either branch none, branch one, or branch all
         # change so that it checks subblocks for branching also?
         for b in self.blockList:
-            b.valid_branch_number()
+            if self.__valid_blocks.get(id(b)) != b.stamp:
+                b.valid_branch_number()
+                self.__valid_blocks[id(b)] = b.stamp
+
+        dirty = [c for c in self.constraints
+                 if self.__valid_constraints.get(id(c)) !=
+                 (c.stamp, id(get_farthest_ancestor(c.question.block)), self.__order_version)]
 
         # check that all branches branch to top level blocks in the survey
-        for c in self.constraints:
+        for c in dirty:
             for (_, block) in c.constraintMap:
-                if block != NEXTBLOCK and block not in self.blockList:
-                    raise InvalidBranchException(
-                        "Branch target \n\t %s \n not found in the survey \n %s." % (block, self))
+                if block is not NEXTBLOCK:
+                    try:
+                        self.__position(block)
+                    except NoSuchBlockException:
+                        raise InvalidBranchException(
+                            "Branch target \n\t %s \n not found in the survey \n %s." % (block, self))
 
         # check that all branches branch forward
-        for c in self.constraints:
+        for c in dirty:
             branch_question = c.question
             # print branchQuestion.block
             topmost_enclosing_block = get_farthest_ancestor(branch_question.block)
+            try:
+                source = self.__position(topmost_enclosing_block)
+            except NoSuchBlockException:
+                raise InvalidBranchException("Block %s not in survey block list." % topmost_enclosing_block)
             for block in c.get_blocks():
-                if topmost_enclosing_block not in self.blockList:
-                    raise InvalidBranchException("Block %s not in survey block list." % topmost_enclosing_block)
-                if block != NEXTBLOCK and self.blockList.index(topmost_enclosing_block) >= self.blockList.index(block):
+                if block is not NEXTBLOCK and source >= self.__position(block):
                     raise InvalidBranchException("Question " + branch_question.qText + " does not branch forward")
+            self.__valid_constraints[id(c)] = (c.stamp, id(topmost_enclosing_block), self.__order_version)
+
+    def compile(self):
+        """
+        Validates the survey and returns an immutable, integer-indexed snapshot of it, including its branch graph.
+        Later edits to the survey do not affect the snapshot.
+
+        :return: A CompiledSurvey
+        """
+        self.validate()
+        return compile_survey(self)
 
     def __str__(self):
         # include some visualization of current branch/block structure?
@@ -91,11 +174,12 @@ class Survey:
             output = output + str(b) + "\n"
         return output
 
-    def jsonize(self):
+    def to_dict(self):
         """
-        Returns the JSON representation of the survey. This is validated against
+        Validates the survey and returns it as a tree of dictionaries and lists. Nothing is encoded until the caller
+        asks for it, so the whole survey is serialized in a single pass.
 
-        :return: JSON object according to the `Survey Schema <http://surveyman.github.io/Schemata/survey_input.json>`_
+        :return: A dict according to the `Survey Schema <http://surveyman.github.io/Schemata/survey_input.json>`_
         """
         self.validate()
         __survey__ = "survey"
@@ -103,9 +187,24 @@ class Survey:
         __correlation__ = "correlation"
         __otherValues__ = "otherValues"
 
-        output = {__survey__: [json.loads(b.jsonize()) for b in self.blockList],
-                  __breakoff__: self.hasBreakoff,
-                  __correlation__: {},
-                  __otherValues__: {}}
+        return {__survey__: [b.to_dict() for b in self.blockList],
+                __breakoff__: self.hasBreakoff,
+                __correlation__: {},
+                __otherValues__: {}}
+
+    def jsonize(self):
+        """
+        Returns the JSON representation of the survey. This is validated against
 
-        return json.dumps(output)
\ No newline at end of file
+        :return: JSON object according to the `Survey Schema <http://surveyman.github.io/Schemata/survey_input.json>`_
+        """
+        return json.dumps(self.to_dict())
+
+    def dump(self, fp):
+        """
+        Writes the JSON representation of the survey to a file-like object. The output is written in chunks as it is
+        encoded, rather than being built up as one string first.
+
+        :param fp: A file-like object supporting ``write``
+        """
+        json.dump(self.to_dict(), fp)
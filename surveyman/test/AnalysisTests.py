@@ -0,0 +1,66 @@
+__author__ = 'etosch'
+
+import unittest
+import surveyman.examples.example_survey as example
+import surveyman.examples.subblock_example as sub
+import surveyman.survey.analysis as analysis
+import surveyman.survey.blocks as blocks
+import surveyman.survey.constraints as constraints
+import surveyman.survey.options as options
+import surveyman.survey.questions as questions
+import surveyman.survey.surveys as surveys
+
+
+def make_skip_chain(n):
+    """Builds n blocks; the question in each one either goes on to the next block or skips it."""
+    qs = [questions.Question("oneof", str(i), [options.TextOption("next"), options.TextOption("skip")])
+          for i in range(n)]
+    bs = [blocks.Block([q]) for q in qs]
+    cs = []
+    for i in range(n - 2):
+        c = constraints.Constraint(qs[i])
+        c.add_branch_by_index(1, bs[i + 2])
+        cs.append(c)
+    return surveys.Survey(bs, cs)
+
+
+class PathAnalysisTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ex = example.create_survey()
+
+    def test_block_lengths(self):
+        self.assertEqual(analysis.block_lengths(self.ex), [9, 1, 7])
+        self.assertEqual(analysis.block_lengths(sub.create_survey()), [7, 2, 1, 1, 4])
+
+    def test_path_statistics(self):
+        stats = analysis.path_statistics(self.ex)
+        self.assertEqual(stats.num_paths, 2)
+        self.assertEqual(stats.min_length, 16)
+        self.assertEqual(stats.max_length, 17)
+        self.assertAlmostEqual(stats.expected_length, 16 + 1.0 / 3)
+        us = self.ex.constraints[0].question.options[0]
+        # the other two options default to 1/3 each before normalizing
+        self.assertAlmostEqual(analysis.path_statistics(self.ex, {us.opId: 1.0}).expected_length, 16.6)
+        compiled = self.ex.compile()
+        probs = {compiled.option_ids[o]: 0.0 for o in compiled.question_options(compiled.block_exit[0])}
+        probs[us.opId] = 1.0
+        self.assertAlmostEqual(analysis.path_statistics(compiled, probs).expected_length, 17)
+
+    def test_no_branching(self):
+        stats = analysis.path_statistics(sub.create_survey())
+        self.assertEqual(stats, (1, 15, 15, 15))
+
+    def test_many_paths(self):
+        # paths through a skip chain follow the Fibonacci numbers
+        fib = [1, 1]
+        for _ in range(200):
+            fib.append(fib[-1] + fib[-2])
+        stats = analysis.path_statistics(make_skip_chain(200))
+        self.assertEqual(stats.num_paths, fib[199])
+        self.assertEqual(stats.max_length, 200)
+        self.assertEqual(stats.min_length, 101)
+
+
+if __name__ == '__main__':
+    unittest.main()
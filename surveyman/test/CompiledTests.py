@@ -0,0 +1,62 @@
+__author__ = 'etosch'
+
+import operator
+import unittest
+import surveyman.examples.SimpleSurvey as simple
+import surveyman.examples.example_survey as example
+import surveyman.examples.subblock_example as sub
+import surveyman.examples.BackwardsBranching as backwards
+import surveyman.examples.TwoBranchesOneBlock as twob1b
+import surveyman.survey.blocks as blocks
+from surveyman.survey.survey_exceptions import *
+
+
+class CompiledSurveyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ex1 = simple.create_survey()
+        self.ex2 = example.create_survey()
+        self.ex3 = sub.create_survey()
+
+    def test_to_dict(self):
+        for ex in [self.ex1, self.ex2, self.ex3]:
+            self.assertEqual(ex.compile().to_dict(), ex.to_dict())
+
+    def test_counts(self):
+        c = self.ex3.compile()
+        self.assertEqual(c.num_blocks(), 9)
+        self.assertEqual(c.num_questions(), 15)
+        self.assertEqual(list(c.block_parent[:4]), [-1, 0, 0, -1])
+        self.assertEqual(len(c.subtree_questions(c.top_blocks[0])), 7)
+        self.assertEqual(set(c.block_policy), {blocks.__branch_none__})
+
+    def test_branch_graph(self):
+        c = self.ex2.compile()
+        self.assertEqual(c.end, 3)
+        self.assertEqual(list(c.successors(0)), [1, 2])
+        self.assertEqual(list(c.successors(1)), [2])
+        self.assertEqual(list(c.successors(2)), [3])
+        self.assertEqual(list(c.topological_order), [0, 1, 2])
+        self.assertEqual(c.block_policy[c.top_blocks[0]], blocks.__branch_one__)
+        q = c.block_exit[c.top_blocks[0]]
+        self.assertEqual(c.question_texts[q], "In which country do you live?")
+        self.assertEqual([c.option_dst[o] for o in c.question_options(q)], [1, 2, 2])
+
+    def test_next_resolution(self):
+        c = self.ex1.compile()
+        q = c.block_exit[c.top_blocks[0]]
+        self.assertEqual([c.option_dst[o] for o in c.question_options(q)], [1, 1, 1])
+
+    def test_invalid(self):
+        self.assertRaises(InvalidBranchException, backwards.create_survey().compile)
+        self.assertRaises(InvalidBranchException, twob1b.create_survey().compile)
+
+    def test_immutable(self):
+        c = self.ex1.compile()
+        self.assertRaises(AttributeError, setattr, c, "end", 0)
+        for arr in [c.option_dst, c.block_questions, c.top_blocks]:
+            self.assertRaises(TypeError, operator.setitem, arr, 0, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
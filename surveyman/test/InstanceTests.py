@@ -0,0 +1,77 @@
+__author__ = 'etosch'
+
+import unittest
+import surveyman.examples.example_survey as example
+import surveyman.examples.subblock_example as sub
+import surveyman.survey.blocks as blocks
+import surveyman.survey.instances as instances
+import surveyman.survey.options as options
+import surveyman.survey.questions as questions
+import surveyman.survey.surveys as surveys
+
+
+class InstanceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ex = example.create_survey()
+        self.compiled = self.ex.compile()
+        likert = questions.Question("likert", "How much?", [options.TextOption(str(a)) for a in range(5)])
+        floating = [blocks.Block([questions.Question("oneof", str(i), [options.TextOption("a")])], randomize=True)
+                    for i in range(4)]
+        self.floating = surveys.Survey([blocks.Block([likert])] + floating, []).compile()
+
+    def test_question_order(self):
+        c = self.compiled
+        for chunk in instances.generate_instances(c, 50, seed=1, chunk_size=20):
+            for i in range(chunk.count):
+                order = list(chunk.get_question_order(i))
+                self.assertEqual(sorted(order), range(c.num_questions()))
+                # the branch block is pinned first, and each top level block is contiguous
+                self.assertEqual(sorted(order[:9]), range(9))
+                self.assertEqual(order[9], 9)
+
+    def test_option_order(self):
+        c = self.floating
+        seen = set()
+        for chunk in instances.generate_instances(c, 50, seed=2):
+            for i in range(chunk.count):
+                opts = list(chunk.get_option_order(i))
+                likert = opts[c.question_option_ptr[0]:c.question_option_ptr[1]]
+                self.assertIn(likert, [range(5), range(4, -1, -1)])
+                seen.add(tuple(chunk.get_question_order(i)[1:]))
+        self.assertGreater(len(seen), 1)
+
+    def test_reproducible(self):
+        a = list(instances.generate_instances(self.compiled, 30, seed=3, chunk_size=7))
+        b = list(instances.generate_instances(self.ex, 30, seed=3, chunk_size=30))
+        self.assertEqual(sum([list(ch.question_order) for ch in a], []), list(b[0].question_order))
+        self.assertEqual(sum([list(ch.option_order) for ch in a], []), list(b[0].option_order))
+        self.assertEqual([ch.start for ch in a], [0, 7, 14, 21, 28])
+
+    def test_subblocks(self):
+        c = sub.create_survey().compile()
+        chunk = next(instances.generate_instances(c, 1, seed=4))
+        order = list(chunk.get_question_order(0))
+        self.assertEqual(sorted(order[:7]), sorted(c.subtree_questions(c.top_blocks[0])))
+
+    def test_block_layout(self):
+        for c in [self.floating, sub.create_survey().compile()]:
+            chunk = next(instances.generate_instances(c, 100, seed=5))
+            for i in range(chunk.count):
+                order = list(chunk.get_question_order(i))
+                start = 0
+                for b in chunk.get_top_order(i):
+                    subtree = c.subtree_questions(b)
+                    self.assertEqual(sorted(order[start:start + len(subtree)]), sorted(subtree))
+                    start += len(subtree)
+                for b in range(c.num_blocks()):
+                    # each block's subtree is contiguous, and starts with the block's own questions
+                    positions = sorted(order.index(q) for q in c.subtree_questions(b))
+                    self.assertEqual(positions, range(positions[0], positions[0] + len(positions)))
+                    own = c.block_questions[c.block_question_ptr[b]:c.block_question_ptr[b + 1]]
+                    self.assertEqual(sorted(order[positions[0]:positions[0] + len(own)]), sorted(own))
+            self.assertEqual(sorted(set(chunk.top_order)), sorted(set(c.top_blocks)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+__author__ = 'etosch'
+
+import csv
+import json
+import unittest
+from StringIO import StringIO
+import surveyman.examples.example_survey as example
+import surveyman.examples.subblock_example as sub_example
+import surveyman.survey.blocks as blocks
+import surveyman.survey.constraints as constraints
+import surveyman.survey.options as options
+import surveyman.survey.questions as questions
+import surveyman.survey.simulator as simulator
+import surveyman.survey.surveys as surveys
+
+
+class SimulatorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ex = example.create_survey()
+        self.compiled = self.ex.compile()
+        # a branch-all block: both questions send option 0 to the last block, past the middle one
+        q1 = questions.Question("oneof", "q1", [options.Option(str(i)) for i in range(2)])
+        q2 = questions.Question("oneof", "q2", [options.Option(str(i)) for i in range(2)])
+        middle = blocks.Block([questions.Question("oneof", "q3", [options.Option("a"), options.Option("b")])])
+        last = blocks.Block([questions.Question("oneof", "q4", [options.Option("a"), options.Option("b")])])
+        branches = []
+        for q in [q1, q2]:
+            branch = constraints.Constraint(q)
+            branch.add_branch_by_index(0, last)
+            branches.append(branch)
+        self.branch_all = surveys.Survey([blocks.Block([q1, q2]), middle, last], branches).compile()
+
+    def responses(self, chunks):
+        return [chunk.get_answers(i) for chunk in chunks for i in range(chunk.count)]
+
+    def test_branch_one(self):
+        c = self.compiled
+        q = c.block_exit[c.top_blocks[0]]
+        skipped = c.subtree_questions(c.top_blocks[1])
+        for (answers, qpos, opos) in self.responses(simulator.simulate(c, simulator.Respondent(), 200, seed=1)):
+            dst = c.option_dst[c.question_option_ptr[q] + answers[q]]
+            self.assertEqual(answers[skipped[0]] != simulator.MISSING, dst == 1)
+            shown = sorted(p for p in qpos if p != simulator.MISSING)
+            self.assertEqual(shown, range(len(shown)))
+
+    def test_branch_all(self):
+        c = self.branch_all
+        for (answers, qpos, opos) in self.responses(simulator.simulate(c, simulator.Respondent(), 200, seed=2)):
+            last = 0 if qpos[0] > qpos[1] else 1
+            self.assertEqual(answers[2] == simulator.MISSING, answers[last] == 0)
+            self.assertNotEqual(answers[3], simulator.MISSING)
+
+    def test_position_respondent(self):
+        chunks = simulator.simulate(self.compiled, simulator.PositionRespondent(-1), 50, seed=3)
+        for (answers, qpos, opos) in self.responses(chunks):
+            for q in range(self.compiled.num_questions()):
+                if answers[q] != simulator.MISSING:
+                    self.assertEqual(opos[q], len(self.compiled.question_options(q)) - 1)
+
+    def test_breakoff(self):
+        quitter = simulator.Respondent(breakoff=0.2)
+        chunks = list(simulator.simulate(self.compiled, quitter, 200, seed=4))
+        self.assertGreater(sum(sum(chunk.broke_off) for chunk in chunks), 0)
+        self.ex.hasBreakoff = False
+        chunks = simulator.simulate(self.ex.compile(), quitter, 200, seed=4)
+        self.assertEqual(sum(sum(chunk.broke_off) for chunk in chunks), 0)
+
+    def test_reproducible(self):
+        models = [(0.8, simulator.Respondent()), (0.2, simulator.PositionRespondent(0))]
+        a = list(simulator.simulate(self.compiled, models, 100, seed=5, chunk_size=30))
+        b = list(simulator.simulate(self.compiled, models, 100, seed=5, chunk_size=30, processes=2))
+        self.assertEqual([list(chunk.answers) for chunk in a], [list(chunk.answers) for chunk in b])
+        self.assertEqual([list(chunk.model) for chunk in a], [list(chunk.model) for chunk in b])
+        self.assertEqual([chunk.start for chunk in a], [0, 30, 60, 90])
+
+    def test_write_hits(self):
+        c = self.compiled
+        out = StringIO()
+        simulator.write_hits(c, simulator.simulate(c, simulator.Respondent(), 10, seed=6), out)
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 11)
+        (question_rows, option_rows) = simulator.source_rows(c)
+        self.assertEqual(rows[0][len(simulator.hit_headers):], ["comp_%d_2" % r for r in question_rows])
+        answer = json.loads(rows[1][len(simulator.hit_headers)])
+        self.assertEqual(answer["quid"], "comp_%d_2" % question_rows[0])
+        self.assertIn(answer["oid"], ["comp_%d_3" % option_rows[o] for o in c.question_options(0)])
+
+    def test_write_csv(self):
+        c = self.compiled
+        out = StringIO()
+        simulator.write_csv(c, out)
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        (question_rows, option_rows) = simulator.source_rows(c)
+        # rows count from 1
+        rows = [None] + rows
+        self.assertEqual(rows[1], simulator.csv_headers)
+        self.assertEqual(len(rows), question_rows[-1] + max(len(c.question_options(c.num_questions() - 1)), 1))
+        for q in range(c.num_questions()):
+            self.assertEqual(rows[question_rows[q]][1], c.question_texts[q] or c.question_ids[q])
+            for o in c.question_options(q):
+                self.assertEqual(rows[option_rows[o]][2], c.option_texts[o])
+                self.assertEqual(rows[option_rows[o]][1] != "", option_rows[o] == question_rows[q])
+        self.assertEqual(rows[question_rows[0]][0], "1")
+        sub = sub_example.create_survey().compile()
+        out = StringIO()
+        simulator.write_csv(sub, out)
+        self.assertIn("1.1", [row[0] for row in csv.reader(StringIO(out.getvalue()))])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,14 @@
 __author__ = 'etosch'
 
 import json
+import jsonschema
+import os
+import time
+import StringIO
 import unittest
 import re
 import surveyman.jsonValidator as validator
+import surveyman.bench as bench
 import surveyman.examples.SimpleSurvey as simple
 import surveyman.examples.example_survey as example
 import surveyman.examples.subblock_example as sub
@@ -12,6 +17,7 @@ import surveyman.survey.surveys as surveys
 import surveyman.survey.blocks as blocks
 import surveyman.survey.options as options
 import surveyman.survey.constraints as constraints
+import surveyman.survey.__ids__ as ids
 from surveyman.survey.questions import __instruction__, __likert__, __checkbox__, __freetext__
 from surveyman.survey.blocks import __branch_none__
 
@@ -38,6 +44,111 @@ class SurveyTests(unittest.TestCase):
         for ex in [self.s, self.ex1, self.ex2, self.ex3]:
             validator.validate_json(json.loads(ex.jsonize()))
 
+    def test_incremental_validate(self):
+        self.ex1.validate()
+        q = self.ex1.constraints[0].question
+        b0 = blocks.Block([questions.Question(__instruction__, "")])
+        self.ex1.add_block_by_index(b0, 0)
+        self.assertEqual(self.ex1.get_block_position(b0), 0)
+        self.assertEqual(self.ex1.get_block_position(self.ex1.blockList[-1]), 2)
+        self.ex1.validate()
+        self.ex1.constraints[0].add_branch_by_index(1, b0)
+        self.assertRaises(surveys.InvalidBranchException, self.ex1.validate)
+        self.ex1.constraints[0].add_branch_by_index(1, self.ex1.blockList[-1])
+        self.ex1.validate()
+        # moving the branch question into the last block makes its branch point backwards
+        self.ex1.blockList[-1].add_question(q)
+        self.assertRaises(surveys.InvalidBranchException, self.ex1.validate)
+
+    def test_validate_after_direct_edit(self):
+        self.ex2.validate()
+        blockList = self.ex2.blockList
+        # the first block branches to the other two; swapping puts it after one of its targets
+        blockList[0], blockList[2] = blockList[2], blockList[0]
+        self.assertRaises(surveys.InvalidBranchException, self.ex2.validate)
+        blockList[0], blockList[2] = blockList[2], blockList[0]
+        self.ex2.validate()
+        # replacing a branch target leaves the branch pointing outside the survey
+        blockList[2] = blocks.Block([questions.Question(__instruction__, "")])
+        self.assertRaises(surveys.InvalidBranchException, self.ex2.validate)
+
+    def test_validate_many(self):
+        validator.validate_many([ex.to_dict() for ex in [self.s, self.ex1, self.ex2, self.ex3]])
+        self.assertRaises(jsonschema.ValidationError, validator.validate_many, [self.ex1.to_dict(), {"breakoff": True}])
+        self.assertRaises(ValueError, validator.validate_json, {}, schema="http://example.com/schema.json")
+
+    def test_bundled_validators(self):
+        bundled = validator.get_bundled_validator(validator.input_schema)
+        hashed = len(validator.__validators__)
+        validator.validate_json(self.ex1.to_dict())
+        self.assertIs(validator.get_bundled_validator(validator.input_schema), bundled)
+        self.assertEqual(len(validator.__validators__), hashed)
+        schema = {"type": "object", "required": ["breakoff"]}
+        self.assertIs(validator.get_validator(dict(schema)), validator.get_validator(schema))
+        validator.validate_json({"breakoff": True}, schema=json.dumps(schema), url=False)
+        self.assertRaises(jsonschema.ValidationError, validator.validate_json, {}, schema=schema, url=False)
+
+    def test_to_dict(self):
+        for ex in [self.s, self.ex1, self.ex2, self.ex3]:
+            self.assertEqual(ex.to_dict(), json.loads(ex.jsonize()))
+
+    def test_dump(self):
+        for ex in [self.s, self.ex1, self.ex2, self.ex3]:
+            fp = StringIO.StringIO()
+            ex.dump(fp)
+            self.assertEqual(json.loads(fp.getvalue()), ex.to_dict())
+
+
+class IdTests(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = ids.set_id_strategy(ids.CounterStrategy())
+
+    def tearDown(self):
+        ids.set_id_strategy(self.previous)
+
+    def test_counter_ids(self):
+        survey = example.create_survey()
+        validator.validate_json(survey.to_dict())
+        qids = [q.qId for b in survey.blockList for q in b.get_questions()]
+        self.assertEqual(len(set(qids)), len(qids))
+        for qid in qids:
+            self.assertTrue(re.match("^q_[0-9a-f]{32}$", qid), qid)
+        other = example.create_survey()
+        self.assertNotEqual(other.blockList[0].get_questions()[0].qId, qids[0])
+
+    def test_survey_namespaces(self):
+        namespace = lambda component_id: component_id.split("_")[-1][:16]
+        first, second = example.create_survey(), example.create_survey()
+        for survey in [first, second]:
+            qids = [q.qId for b in survey.blockList for q in b.get_questions()]
+            self.assertEqual(len(set(namespace(qid) for qid in qids)), 1)
+        self.assertNotEqual(namespace(first.blockList[0].get_questions()[0].qId),
+                            namespace(second.blockList[0].get_questions()[0].qId))
+
+    def test_fork(self):
+        gen = ids.IdGenerator("comp_")
+        gen.generateID()
+        (read, write) = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            os.write(write, gen.generateID() + " " + gen.reserveIDs(1)[0])
+            os._exit(0)
+        os.close(write)
+        child = os.read(read, 1024).split()
+        os.close(read)
+        os.waitpid(pid, 0)
+        parent = [gen.generateID(), gen.reserveIDs(1)[0]]
+        self.assertEqual(len(set(parent + child)), 4)
+        self.assertNotEqual(child[0][5:21], parent[0][5:21])
+
+    def test_reserve(self):
+        gen = ids.IdGenerator("comp_")
+        reserved = gen.reserveIDs(100)
+        self.assertEqual(len(set(reserved + [gen.generateID()])), 101)
+        self.assertEqual(gen.numAssigned, 101)
+
 
 class QuestionTests(unittest.TestCase):
 
@@ -51,6 +162,17 @@ class QuestionTests(unittest.TestCase):
     def test_question_types(self):
         self.assertRaises(surveys.NoSuchQuestionTypeException, questions.Question, "rank", "blah")
 
+    def test_lazy_block(self):
+        ct = blocks.__blockGen__.numAssigned
+        q = questions.Question(__likert__, "", [])
+        self.assertFalse(q.has_block())
+        self.assertEqual(ct, blocks.__blockGen__.numAssigned)
+        b = blocks.Block([q])
+        self.assertIs(q.block, b)
+        standalone = self.q2.block
+        self.assertEqual(standalone.contents, [self.q2])
+        self.assertIs(self.q2.block, standalone)
+
     def test_add_option(self):
         self.q1.add_option("")
         self.assertEqual(len(self.q1.options), 5)
@@ -86,6 +208,31 @@ class OptionTests(unittest.TestCase):
     def test_html_parse_error(self):
         self.assertRaises(surveys.HTMLValidationException, options.HTMLOption, "<a>asdf")
 
+    def test_validate_html_options(self):
+        texts = ["<a>asdf", "plain text", "<b>bold</b>", "plain text", "&amp;"]
+        self.assertEqual(options.validate_html_options(texts), [False, True, True, True, True])
+        self.assertEqual(options.validate_html_options(texts + ["<i>x</i>", "<p>"], processes=2),
+                         [False, True, True, True, True, True, False])
+        self.assertEqual(options.html_errors("plain text"), "")
+
+    def test_option_table(self):
+        table = options.OptionTable(str(x) for x in range(1950, 1996))
+        self.assertEqual(len(table), 46)
+        self.assertEqual(table[0], table[0])
+        self.assertEqual(table[-1].opText, "1995")
+        self.assertEqual(table.index(table[10]), 10)
+        self.assertNotIn(self.text_opt, table)
+        table.insert(1, self.text_opt)
+        table.append(self.html_opt)
+        self.assertEqual(table.index(self.text_opt), 1)
+        self.assertEqual(table[1].opText, "some text")
+        self.assertEqual(table[2].opText, "1951")
+        self.assertEqual(table[-1], self.html_opt)
+        self.assertEqual(table.to_dict(), [o.to_dict() for o in table])
+        q = questions.Question(__likert__, "", table)
+        constraints.Constraint(q).add_branch(table[3], blocks.Block([]))
+        validator.validate_json(q.to_dict(), schema=validator.question_schema)
+
     def test_jsonize(self):
         json1 = json.loads(self.text_opt.jsonize())
         validator.validate_json(json1, schema=validator.option_schema)
@@ -122,6 +269,10 @@ class BlockTests(unittest.TestCase):
         sb2 = blocks.Block([sb1])
         sb3 = blocks.Block([sb2])
         self.assertEqual(surveys.get_farthest_ancestor(sb1), sb3)
+        sb4 = blocks.Block([])
+        sb4.add_subblock(sb3)
+        self.assertEqual(surveys.get_farthest_ancestor(sb1), sb4)
+        self.assertEqual(surveys.get_farthest_ancestor(sb3), sb4)
 
     def test_get_all_blocks(self):
         sb1 = blocks.Block([questions.FreeText("")])
@@ -188,4 +339,27 @@ class ConstraintTests(unittest.TestCase):
         json1 = self.outer_block_1.jsonize()
         json2 = self.outer_block_2.jsonize()
         validator.validate_json(json.loads(json1), schema=validator.block_schema)
-        validator.validate_json(json.loads(json2), schema=validator.block_schema)
\ No newline at end of file
+        validator.validate_json(json.loads(json2), schema=validator.block_schema)
+
+
+class BenchTests(unittest.TestCase):
+
+    def test_shapes(self):
+        for shape in bench.shapes:
+            result = bench.run_case(shape, 30)
+            for stage in ["construct", "validate", "jsonize", "validate_json", "peak_kb"]:
+                self.assertIn(stage, result)
+            self.assertEqual(len(bench.shapes[shape](30).compile().question_ids), 30)
+
+    def test_failed_child(self):
+        # the children are forked, so they see the patched shapes
+        bench.shapes["crash"] = lambda n: os._exit(3)
+        bench.shapes["hang"] = lambda n: time.sleep(60)
+        try:
+            crashed = bench.run(["crash"], [10])[0]
+            self.assertIn("code 3", crashed["error"])
+            self.assertEqual((crashed["shape"], crashed["size"]), ("crash", 10))
+            hung = bench.run(["hang"], [10], timeout=0.5)[0]
+            self.assertIn("timed out", hung["error"])
+        finally:
+            del bench.shapes["crash"], bench.shapes["hang"]
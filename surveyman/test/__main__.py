@@ -3,6 +3,10 @@ import unittest
 import BlockTests
 import ConstraintTests
 import SurveyTests
+import CompiledTests
+import AnalysisTests
+import InstanceTests
+import SimulatorTests
 import surveyman.examples.SimpleSurvey as simple
 import surveyman.examples.example_survey as example
 import surveyman.examples.subblock_example as sub
@@ -11,11 +15,17 @@ import json
 
 unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(BlockTests.BlockTests))
 unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(ConstraintTests.ConstraintTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SurveyTests.IdTests))
 unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SurveyTests.OptionTests))
 unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SurveyTests.QuestionTests))
 unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SurveyTests.BlockTests))
 unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SurveyTests.ConstraintTests))
 unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SurveyTests.SurveyTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SurveyTests.BenchTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(CompiledTests.CompiledSurveyTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(AnalysisTests.PathAnalysisTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(InstanceTests.InstanceTests))
+unittest.TextTestRunner(verbosity=2).run(unittest.TestLoader().loadTestsFromTestCase(SimulatorTests.SimulatorTests))
 
 # dump surveys to json
 ex1 = simple.create_survey()